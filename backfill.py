@@ -0,0 +1,97 @@
+"""
+Todoist AI Summary - Backfill entry point
+Regenerates the summaries of past weeks, in parallel or with one OpenAI
+Batch API job
+"""
+
+import sys
+import time
+import logging
+import argparse
+from datetime import date
+from dotenv import load_dotenv
+
+from main import get_week_ranges, get_weeks_between, export_metrics
+from src.metrics import reset_metrics
+
+
+def main():
+    """Backfill entry point"""
+    parser = argparse.ArgumentParser(description="Regenerate past weekly summaries")
+    parser.add_argument(
+        '--from', dest='from_date', type=date.fromisoformat, metavar='YYYY-MM-DD',
+        help="First day of the range to regenerate (with --to)"
+    )
+    parser.add_argument(
+        '--to', dest='to_date', type=date.fromisoformat, metavar='YYYY-MM-DD',
+        help="Last day of the range to regenerate (default: today)"
+    )
+    parser.add_argument(
+        '--weeks', type=int, default=52,
+        help="Without --from: number of weeks to regenerate, ending with last week"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=4,
+        help="Maximum parallel OpenAI calls"
+    )
+    parser.add_argument(
+        '--stored-history', action='store_true',
+        help="Use the summaries stored before the backfill as history, so all weeks run in parallel"
+    )
+    parser.add_argument(
+        '--batch', action='store_true',
+        help="Submit one OpenAI Batch API job instead (half price, results within 24h)"
+    )
+    parser.add_argument(
+        '--poll-interval', type=float, default=60,
+        help="With --batch: seconds between two batch status checks"
+    )
+    parser.add_argument(
+        '--resume', metavar='BATCH_ID',
+        help="Wait for and collect a batch submitted by an interrupted run"
+    )
+    args = parser.parse_args()
+    
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("backfill")
+    
+    if args.from_date:
+        to_date = args.to_date or date.today()
+        if args.from_date > to_date:
+            parser.error(f"--from {args.from_date} is after --to {to_date}")
+        weeks = get_weeks_between(args.from_date, to_date)
+    else:
+        if args.weeks < 1:
+            parser.error("--weeks must be at least 1")
+        weeks = get_week_ranges(args.weeks)
+    
+    reset_metrics()
+    try:
+        start = time.perf_counter()
+        if args.batch or args.resume:
+            from src.backfill import BatchBackfill
+            backfill = BatchBackfill()
+            if args.resume:
+                counts = backfill.resume(args.resume, args.poll_interval)
+            else:
+                counts = backfill.run(weeks, args.poll_interval)
+        else:
+            from src.backfill import ParallelBackfill
+            logger.info(f"Regenerating {len(weeks)} weeks, {weeks[0][0]} to {weeks[-1][1]}")
+            backfill = ParallelBackfill(workers=args.workers, stored_history=args.stored_history)
+            counts = backfill.run(weeks)
+        logger.info(f"✓ Backfill done in {time.perf_counter() - start:.1f}s: "
+                    f"{counts['saved']} weeks saved, {counts['failed']} failed")
+        export_metrics(logger, 'failed' if counts['failed'] else 'success')
+    except Exception as e:
+        logger.error(f"❌ Backfill failed: {str(e)}", exc_info=True)
+        export_metrics(logger, 'failed')
+        sys.exit(1)
+    
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Todoist AI Summary - Batch entry point
+Runs the weekly pipeline for several users (one .env file per user)
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any
+from dotenv import load_dotenv
+
+
+def find_tenant_configs(paths: List[str]) -> Dict[str, Path]:
+    """
+    Resolve the tenant configuration files to run
+    
+    Args:
+        paths: .env files, or directories containing one .env file per
+            tenant (*.env) or one sub-directory per tenant (<name>/.env)
+    
+    Returns:
+        Dict tenant name -> .env file
+    """
+    configs = {}
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_file():
+            tenant = path.parent.resolve().name if path.name == '.env' else path.stem
+            configs[tenant] = path
+        elif path.is_dir():
+            for env_file in sorted(path.glob("*.env")):
+                configs[env_file.stem] = env_file
+            for env_file in sorted(path.glob("*/.env")):
+                configs[env_file.parent.name] = env_file
+        else:
+            raise FileNotFoundError(f"Tenant configuration not found: {path}")
+    return configs
+
+
+def load_tenant_env(tenant: str, env_file: str, base_env: Dict[str, str]) -> None:
+    """
+    Replace the process environment with base_env plus the tenant .env file
+    
+    DATA_DIR is never inherited from base_env (the operator's shell): only
+    the tenant's own .env can set it, otherwise tenants would share one
+    mirror, task store, cache and archive.
+    """
+    os.environ.clear()
+    os.environ.update({key: value for key, value in base_env.items() if key != 'DATA_DIR'})
+    load_dotenv(env_file, override=True)
+    os.environ.setdefault('DATA_DIR', str(Path("data") / "tenants" / tenant))
+
+
+def run_tenant(tenant: str, env_file: str, base_env: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Run the pipeline for one tenant inside a worker process
+    
+    The worker environment is reset to base_env before loading the tenant
+    .env file, so nothing leaks between tenants sharing a worker. Unless the
+    tenant sets DATA_DIR, its summaries, mirror and task store live in
+    data/tenants/<tenant>.
+    
+    Returns:
+        Result dict with status, task count, duration and error
+    """
+    from main import run_pipeline, run_status, export_metrics
+    from src.i18n import get_i18n, reset_i18n
+    from src.metrics import reset_metrics
+    
+    load_tenant_env(tenant, env_file, base_env)
+    reset_i18n()
+    reset_metrics()
+    
+    # One log file per tenant, no console output from workers
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+    log_dir = Path("logs") / "tenants" / tenant
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / f"execution_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger = logging.getLogger("main")
+    
+    result = {
+        'tenant': tenant,
+        'status': 'ok',
+        'tasks': 0,
+        'duration_s': 0.0,
+        'error': None,
+        'log_file': str(log_file)
+    }
+    start = time.perf_counter()
+    try:
+        result['tasks'] = run_pipeline(logger, get_i18n())
+        status = run_status(result['tasks'])
+        if status != 'success':
+            result['status'] = status
+    except Exception as e:
+        logger.error(f"❌ {str(e)}", exc_info=True)
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {str(e)}"
+    finally:
+        result['duration_s'] = round(time.perf_counter() - start, 3)
+        export_metrics(logger, 'success' if result['status'] == 'ok' else result['status'])
+        root_logger.removeHandler(handler)
+        handler.close()
+    return result
+
+
+def send_bulk(configs: Dict[str, Path], base_env: Dict[str, str], logger: logging.Logger) -> Dict[str, Dict[str, int]]:
+    """
+    Deliver the emails queued by the tenants, grouped per SMTP account
+    
+    Tenants sending from the same server and address share one
+    authenticated connection, instead of one connection per tenant and
+    recipient. Emails that still fail stay in the tenant outbox, with one
+    more failed attempt recorded (including when the connection itself
+    cannot be opened).
+    
+    Returns:
+        Dict tenant -> counts of emails sent, queued and dropped
+    """
+    from src.email_sender import EmailSender
+    
+    groups: Dict[tuple, List[tuple]] = {}
+    for tenant, env_file in configs.items():
+        load_tenant_env(tenant, str(env_file), base_env)
+        if not os.getenv('EMAIL_SEND', False):
+            continue
+        try:
+            sender = EmailSender()
+        except ValueError as e:
+            logger.error(f"  {tenant}: {str(e)}")
+            continue
+        if sender.outbox.due():
+            groups.setdefault(sender.connection_key, []).append((tenant, sender))
+    os.environ.clear()
+    os.environ.update(base_env)
+    
+    deliveries = {}
+    for (server, port, email_from, _), members in groups.items():
+        logger.info(f"Sending emails of {len(members)} tenants via {server}:{port} as {email_from}")
+        try:
+            with members[0][1].connect() as connection:
+                for tenant, sender in members:
+                    deliveries[tenant] = sender.flush_outbox(server=connection)
+        except Exception as e:
+            # Tenants not flushed yet: each due email counts as a failed attempt
+            logger.error(f"  SMTP connection to {server}:{port} failed: {str(e)}")
+            for tenant, sender in members:
+                if tenant not in deliveries:
+                    deliveries[tenant] = sender.fail_outbox(f"{type(e).__name__}: {str(e)}")
+    return deliveries
+
+
+def write_report(results: List[Dict[str, Any]], total_duration: float) -> Path:
+    """Write the batch report as JSON and return its path"""
+    report_dir = Path("logs")
+    report_dir.mkdir(exist_ok=True)
+    report_file = report_dir / f"batch_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(),
+            'duration_s': round(total_duration, 3),
+            'tenants': len(results),
+            'failed': sum(1 for r in results if r['status'] == 'failed'),
+            'results': results
+        }, f, ensure_ascii=False, indent=2)
+    return report_file
+
+
+def main():
+    """Batch entry point"""
+    parser = argparse.ArgumentParser(description="Run Todoist AI Summary for several users")
+    parser.add_argument(
+        'configs', nargs='+',
+        help="Tenant .env files, or directories of *.env files / <tenant>/.env"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=min(4, os.cpu_count() or 1),
+        help="Maximum number of tenants processed in parallel"
+    )
+    parser.add_argument(
+        '--bulk-email', action='store_true',
+        help="Queue the tenants' emails and send them at the end, one SMTP connection per account"
+    )
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("batch")
+    
+    configs = find_tenant_configs(args.configs)
+    if not configs:
+        logger.warning("No tenant configuration found")
+        return
+    
+    workers = max(1, min(args.workers, len(configs)))
+    logger.info(f"Running {len(configs)} tenants with {workers} workers")
+    
+    # Spawned workers start from a clean interpreter (no inherited state)
+    base_env = dict(os.environ)
+    if args.bulk_email:
+        base_env['EMAIL_DELIVERY'] = 'queue'
+    context = multiprocessing.get_context('spawn')
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(run_tenant, tenant, str(env_file), base_env): tenant
+            for tenant, env_file in configs.items()
+        }
+        for future in as_completed(futures):
+            tenant = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Worker crashed before it could report
+                result = {'tenant': tenant, 'status': 'failed', 'tasks': 0,
+                          'duration_s': 0.0, 'error': f"{type(e).__name__}: {str(e)}",
+                          'log_file': None}
+            results.append(result)
+            logger.info(f"  {result['tenant']}: {result['status']} "
+                        f"({result['tasks']} tasks, {result['duration_s']:.1f}s)"
+                        + (f" - {result['error']}" if result['error'] else ""))
+    
+    if args.bulk_email:
+        deliveries = send_bulk(configs, base_env, logger)
+        for result in results:
+            result['emails'] = deliveries.get(result['tenant'])
+    
+    total_duration = time.perf_counter() - start
+    results.sort(key=lambda r: r['tenant'])
+    report_file = write_report(results, total_duration)
+    
+    failed = [r for r in results if r['status'] in ('failed', 'email_dropped')]
+    logger.info(f"Batch done in {total_duration:.1f}s: {len(results) - len(failed)} ok, "
+                f"{len(failed)} failed. Report: {report_file}")
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+End-to-end pipeline benchmark against local stand-ins
+
+Starts fake Todoist, OpenAI and SMTP services (see fake_services.py) with a
+synthetic account, then runs the pipeline stages in the same order as
+main.run_pipeline and reports, per stage: latency, requests sent to each
+service, and peak Python memory (tracemalloc).
+
+Each account size is run twice on a fresh data directory: "cold" (empty
+mirror, task store and LLM cache) then "warm" (second run of the same week).
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --accounts 10:10 1000:100 --llm-latency 0.2
+    python benchmarks/bench_pipeline.py --json logs/bench_pipeline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeServices  # noqa: E402
+
+# tasks:projects
+DEFAULT_ACCOUNTS = ['10:10', '1000:100', '10000:300', '100000:1000']
+
+
+class StageRecorder:
+    """Times stages and attributes service requests and peak memory to them"""
+    
+    def __init__(self, services: FakeServices, trace_memory: bool = True):
+        self.services = services
+        self.trace_memory = trace_memory
+        self.stages: List[Dict[str, Any]] = []
+    
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        before = self.services.stats()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+            if self.trace_memory:
+                tracemalloc.stop()
+            after = self.services.stats()
+            self.stages.append({
+                'stage': name,
+                'duration_s': round(duration, 4),
+                'peak_mb': round(peak / 1024 / 1024, 2),
+                'requests': {
+                    key: after.get(key, 0) - before.get(key, 0)
+                    for key in sorted(after)
+                    if after.get(key, 0) - before.get(key, 0)
+                }
+            })
+
+
+def run_pipeline_stages(recorder: StageRecorder, week: Tuple) -> int:
+    """The stages of main.run_pipeline, recorded one by one"""
+    from src.i18n import reset_i18n
+    from src.todoist_client import TodoistClient
+    from src.summarizer import WeeklySummarizer
+    from src.storage import StorageManager
+    from src.email_sender import EmailSender
+    
+    reset_i18n()
+    start_date, end_date = week
+    
+    def fetch_and_organize():
+        todoist = TodoistClient()
+        return todoist.organize_tasks_by_category(todoist.iter_completed_tasks(start_date, end_date))
+    
+    organized_tasks = recorder.run('fetch+organize', fetch_and_organize)
+    task_count = sum(len(tasks) for sp in organized_tasks.values() for tasks in sp.values())
+    
+    storage = StorageManager()
+    previous_summaries = recorder.run(
+        'history', storage.load_previous_summaries, weeks=4, before=start_date
+    )
+    summary = recorder.run(
+        'summarize', WeeklySummarizer().generate_summary,
+        organized_tasks=organized_tasks,
+        week_start=start_date,
+        week_end=end_date,
+        previous_summaries=previous_summaries
+    )
+    recorder.run(
+        'save', storage.save_summary,
+        summary=summary,
+        organized_tasks=organized_tasks,
+        week_start=start_date,
+        week_end=end_date
+    )
+    recorder.run(
+        'email', EmailSender().send_summary,
+        summary=summary,
+        week_start=start_date,
+        week_end=end_date
+    )
+    return task_count
+
+
+def bench_account(tasks: int, projects: int, args) -> List[Dict[str, Any]]:
+    """Cold and warm runs for one synthetic account size"""
+    from main import get_week_range
+    week = get_week_range()
+    base_env = dict(os.environ)
+    data_dir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    results = []
+    try:
+        with FakeServices(tasks, projects, week[0], llm_latency=args.llm_latency) as services:
+            os.environ.update(services.environment())
+            os.environ['DATA_DIR'] = str(data_dir)
+            for run in ('cold', 'warm'):
+                recorder = StageRecorder(services, trace_memory=not args.no_memory)
+                start = time.perf_counter()
+                task_count = run_pipeline_stages(recorder, week)
+                results.append({
+                    'tasks': tasks,
+                    'projects': projects,
+                    'run': run,
+                    'tasks_in_week': task_count,
+                    'total_s': round(time.perf_counter() - start, 4),
+                    'stages': recorder.stages
+                })
+    finally:
+        os.environ.clear()
+        os.environ.update(base_env)
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Print one table per account size and run"""
+    for result in results:
+        print(f"\n{result['tasks']} tasks / {result['projects']} projects - {result['run']} run "
+              f"({result['total_s']:.2f}s total)")
+        print(f"  {'stage':<16}{'latency':>10}{'peak MB':>10}   requests")
+        for stage in result['stages']:
+            requests = ", ".join(f"{key}={count}" for key, count in stage['requests'].items()) or "-"
+            print(f"  {stage['stage']:<16}{stage['duration_s']:>9.3f}s{stage['peak_mb']:>10.1f}   {requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark (local stand-ins)")
+    parser.add_argument('--accounts', nargs='+', default=DEFAULT_ACCOUNTS,
+                        help="Synthetic account sizes as tasks:projects")
+    parser.add_argument('--llm-latency', type=float, default=0.05,
+                        help="Simulated OpenAI response time per call, in seconds")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip tracemalloc (faster, no peak memory)")
+    parser.add_argument('--json', type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    # Import cost is measured by bench_startup.py, keep it out of the stages
+    import openai  # noqa: F401
+    import requests  # noqa: F401
+    import smtplib  # noqa: F401
+    
+    results = []
+    for account in args.accounts:
+        tasks, projects = (int(value) for value in account.split(':'))
+        results.extend(bench_account(tasks, projects, args))
+        print_results(results[-2:])
+    
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
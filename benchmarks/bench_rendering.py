@@ -0,0 +1,141 @@
+"""
+Rendering micro-benchmark
+
+Renders the prompt, the Markdown file and the HTML email body for synthetic
+weeks of 1k, 10k and 100k tasks, and prints the time per task: with linear
+rendering it stays flat as the week grows.
+
+Then converts large summaries using the whole Markdown syntax (lists,
+emphasis, links, code) and adversarial ones (unclosed delimiters, brackets,
+backticks) to HTML, and prints the time per KB, which must stay flat too.
+
+Usage:
+    python benchmarks/bench_rendering.py [--sizes 1000 10000 100000]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+os.environ['LLM_CACHE'] = 'False'
+
+from src.summarizer import WeeklySummarizer  # noqa: E402
+from src.storage import StorageManager  # noqa: E402
+from src.rendering import markdown_to_html  # noqa: E402
+from src.task_model import Task  # noqa: E402
+
+
+def synthetic_week(task_count: int, categories: int = 4, subprojects: int = 10):
+    """Organized tasks spread over categories and subprojects"""
+    week_start = date(2024, 1, 1)
+    organized = {}
+    for i in range(task_count):
+        category = f"Category {i % categories}"
+        subproject = f"Subproject {(i // categories) % subprojects}" if i % 5 else None
+        completed = datetime(2024, 1, 1) + timedelta(seconds=(i * 37) % (7 * 86400))
+        organized.setdefault(category, {}).setdefault(subproject, []).append(Task(
+            str(i),
+            f"Task number {i} with a reasonably descriptive title",
+            completed.isoformat() + 'Z',
+            section_name=f"Section {i % 3}" if i % 2 else None
+        ))
+    return organized, week_start, week_start + timedelta(days=6)
+
+
+def synthetic_summary(paragraphs: int) -> str:
+    """Summary Markdown with headings and multi-line paragraphs"""
+    parts = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"## Category {i // 10}")
+        parts.append(f"### Subproject {i}\nFirst line of paragraph {i}.\nSecond line.")
+    return "\n\n".join(parts)
+
+
+def rich_summary(paragraphs: int) -> str:
+    """Summary Markdown with every construct the email converter handles"""
+    parts = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"## Category {i // 10}")
+        parts.append(
+            f"### Subproject {i}\n"
+            f"Shipped **feature {i}** and *refactored* the `parser_{i}` module, see "
+            f"[the notes](https://example.com/notes/{i}?a=1&b=2).\n\n"
+            f"- Fixed _bug_ #{i} in <legacy> code\n"
+            f"  - nested **detail** with ***emphasis***\n"
+            f"- Reviewed snake_case_name handling\n\n"
+            f"1. First step\n2. Second step\n\n"
+            f"> Quote {i}\n\n```\ncode line {i} < 3\n```"
+        )
+    return "\n\n".join(parts)
+
+
+ADVERSARIAL_LINES = {
+    'unclosed emphasis': "**a _b *c " * 20,
+    'brackets': "[[[ ]( " * 20,
+    'backticks': "` x " * 20,
+}
+
+
+def bench_markdown_to_html(sizes) -> None:
+    """Time per KB of Markdown converted to HTML, for growing inputs"""
+    print(f"\n{'summary KB':>10} {'rich':>10} " + " ".join(f"{name:>18}" for name in ADVERSARIAL_LINES)
+          + "   (µs per KB)")
+    for size in sizes:
+        inputs = [rich_summary(size // 10)] + [
+            "\n".join([line] * (size // 10)) + "\n" + line * (size // 100)
+            for line in ADVERSARIAL_LINES.values()
+        ]
+        kilobytes = len(inputs[0]) / 1024
+        per_kb = [timed(markdown_to_html, text) / (len(text) / 1024) * 1e6 for text in inputs]
+        print(f"{kilobytes:>10.0f} {per_kb[0]:>10.1f} " + " ".join(f"{value:>18.1f}" for value in per_kb[1:]))
+
+
+def timed(func, *args) -> float:
+    """Best of three runs, in seconds"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendering micro-benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    summarizer = WeeklySummarizer()
+    # Large enough that the prompt is rendered in full, without condensing
+    summarizer.budget.input_budget = 10 ** 9
+    storage = StorageManager(Path(tempfile.mkdtemp()))
+
+    print(f"{'tasks':>8} {'prompt':>10} {'markdown':>10} {'email':>10}   (µs per task)")
+    for size in args.sizes:
+        organized, week_start, week_end = synthetic_week(size)
+        stats = storage._calculate_stats(organized)
+        summary = synthetic_summary(size // 10)
+
+        prompt = timed(summarizer._build_prompt, organized, week_start, week_end, [])
+        markdown = timed(storage._generate_markdown, summary, organized, week_start, week_end, stats)
+        email = timed(markdown_to_html, summary)
+
+        print(f"{size:>8} {prompt / size * 1e6:>10.2f} {markdown / size * 1e6:>10.2f} "
+              f"{email / size * 1e6:>10.2f}")
+
+    bench_markdown_to_html(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
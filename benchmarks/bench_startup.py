@@ -0,0 +1,114 @@
+"""
+Startup benchmark
+
+Imports main.py in fresh interpreters with `python -X importtime` and
+reports the cumulative import time of the entry point, the slowest modules,
+and whether any pipeline-stage dependency was loaded at startup. Exits with
+status 1 if the median exceeds --max-ms or a heavy module leaked into the
+startup imports, so it can guard cold-start time in CI or before deploying.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--max-ms 150] [--module main]
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded by pipeline stages only, never by `import main`
+HEAVY_MODULES = (
+    'openai',
+    'requests',
+    'urllib3',
+    'smtplib',
+    'email.mime',
+    'asyncio',
+    'sqlite3',
+    'tiktoken',
+    'src.todoist_client',
+    'src.summarizer',
+    'src.email_sender',
+)
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """
+    Run code in a fresh interpreter with -X importtime
+
+    Returns:
+        Cumulative import time in µs per imported module
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup (import time) benchmark")
+    parser.add_argument('--module', default='main', help="Entry point module to import")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="Fail if the median import time exceeds this")
+    parser.add_argument('--top', type=int, default=10, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    # First run warms the bytecode and filesystem caches; modules loaded by
+    # the bare interpreter (site, .pth hooks) are not the entry point's cost
+    interpreter_modules = set(import_times("pass"))
+    import_times(f"import {args.module}")
+    totals: List[int] = []
+    times: Dict[str, int] = {}
+    for _ in range(args.runs):
+        times = import_times(f"import {args.module}")
+        totals.append(times[args.module])
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"import {args.module}: median {median_ms:.1f} ms, "
+          f"min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms "
+          f"({args.runs} runs)")
+
+    print("\nSlowest imports, cumulative (last run):")
+    others = {
+        name: us for name, us in times.items()
+        if name != args.module and name not in interpreter_modules
+    }
+    for name, us in sorted(others.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    leaked = sorted(
+        name for name in times
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+    failed = False
+    if leaked:
+        roots = sorted({name.split('.')[0] if not name.startswith('src.') else name for name in leaked})
+        print(f"\n❌ Heavy modules imported at startup: {', '.join(roots)}")
+        failed = True
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\n❌ Median import time {median_ms:.1f} ms exceeds {args.max_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("\n✓ Startup within limits")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
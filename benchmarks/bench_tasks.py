@@ -0,0 +1,156 @@
+"""
+Task representation benchmark
+
+Builds multi-year histories of completed tasks (1, 3 and 5 years at 100
+tasks a day by default), stores them in a CompletedTaskStore and compares
+the Task objects the pipeline uses with the plain dicts it used before:
+
+- memory held by the whole history once loaded (tracemalloc)
+- load throughput: reading the day files back from the store (Task pays
+  for parsing each timestamp here, once)
+- pass throughput: grouping tasks by week and formatting their completion
+  time, as the task store and the Markdown rendering do (dicts parse the
+  timestamp string on every use, Task carries it parsed)
+
+Usage:
+    python benchmarks/bench_tasks.py [--years 1 3 5] [--per-day 100]
+"""
+
+import gc
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.task_model import Task  # noqa: E402
+from src.task_store import CompletedTaskStore  # noqa: E402
+
+PROJECTS = 40
+SECTIONS_PER_PROJECT = 5
+DISPLAY_FORMAT = "%m/%d at %I:%M %p"
+
+
+def synthetic_history(first_day: date, days: int, per_day: int):
+    """Tasks spread over the days, projects and sections of an account"""
+    tasks = []
+    for day_index in range(days):
+        day = first_day + timedelta(days=day_index)
+        for i in range(per_day):
+            n = day_index * per_day + i
+            project = n % PROJECTS
+            section = (n // PROJECTS) % SECTIONS_PER_PROJECT
+            completed = datetime(day.year, day.month, day.day) + timedelta(seconds=(n * 613) % 86400)
+            tasks.append(Task(
+                str(10 ** 9 + n),
+                f"Task number {n} with a reasonably descriptive title",
+                completed.strftime('%Y-%m-%dT%H:%M:%S.000000Z'),
+                str(2 * 10 ** 9 + project),
+                str(3 * 10 ** 9 + project * SECTIONS_PER_PROJECT + section) if section else None,
+                f"Work/Project {project}",
+                f"Section {section}" if section else None
+            ))
+    return tasks
+
+
+def load_dicts(store: CompletedTaskStore, start: date, end: date):
+    """Previous representation: the day files' dicts, as is"""
+    tasks = []
+    day = start
+    while day <= end:
+        with open(store._day_file(day), 'r', encoding='utf-8') as f:
+            tasks.extend(json.load(f))
+        day += timedelta(days=1)
+    return tasks
+
+
+def load_tasks(store: CompletedTaskStore, start: date, end: date):
+    """Current representation: Task objects from the store"""
+    return list(store.read_days(start, end))
+
+
+def pass_dicts(tasks) -> int:
+    """Group by week and format completion times, parsing each time"""
+    weeks = {}
+    for task in tasks:
+        day = datetime.fromisoformat(task['completed_at'].replace('Z', '+00:00')).date()
+        weeks.setdefault(day - timedelta(days=day.weekday()), []).append(task)
+    lines = 0
+    for week_tasks in weeks.values():
+        for task in week_tasks:
+            completed = datetime.fromisoformat(task['completed_at'].replace('Z', '+00:00'))
+            lines += len(f"- {task['content']} - ✓ {completed.strftime(DISPLAY_FORMAT)}")
+    return lines
+
+
+def pass_tasks(tasks) -> int:
+    """Same pass over Task objects, using the parsed completion time"""
+    weeks = {}
+    for task in tasks:
+        day = task.completed.date()
+        weeks.setdefault(day - timedelta(days=day.weekday()), []).append(task)
+    lines = 0
+    for week_tasks in weeks.values():
+        for task in week_tasks:
+            lines += len(f"- {task.content} - ✓ {task.completed.strftime(DISPLAY_FORMAT)}")
+    return lines
+
+
+def retained_mb(load, *args) -> float:
+    """Memory still allocated by load's result, in MB"""
+    gc.collect()
+    tracemalloc.start()
+    result = load(*args)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024 / 1024
+
+
+def timed(func, *args) -> float:
+    """Best of three runs, in seconds"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task representation benchmark")
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 5])
+    parser.add_argument('--per-day', type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"{'years':>5} {'tasks':>9}   {'memory MB':>17}   {'load k tasks/s':>17}   {'pass k tasks/s':>17}")
+    print(f"{'':>5} {'':>9}   {'dict':>8} {'Task':>8}   {'dict':>8} {'Task':>8}   {'dict':>8} {'Task':>8}")
+    for years in args.years:
+        days = 365 * years
+        first_day = date(2020, 1, 1)
+        last_day = first_day + timedelta(days=days - 1)
+        store = CompletedTaskStore(Path(tempfile.mkdtemp()))
+        store.write_days(synthetic_history(first_day, days, args.per_day), first_day, last_day)
+        count = days * args.per_day
+
+        memory = [retained_mb(load, store, first_day, last_day) for load in (load_dicts, load_tasks)]
+        load = [count / timed(load, store, first_day, last_day) / 1000 for load in (load_dicts, load_tasks)]
+        dicts = load_dicts(store, first_day, last_day)
+        tasks = load_tasks(store, first_day, last_day)
+        passes = [count / timed(pass_dicts, dicts) / 1000, count / timed(pass_tasks, tasks) / 1000]
+        del dicts, tasks
+
+        print(f"{years:>5} {count:>9}   {memory[0]:>8.1f} {memory[1]:>8.1f}   "
+              f"{load[0]:>8.0f} {load[1]:>8.0f}   {passes[0]:>8.0f} {passes[1]:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
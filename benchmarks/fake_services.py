@@ -0,0 +1,583 @@
+"""
+Local stand-ins for the services used by the pipeline
+
+- Todoist: Sync API v9 (/sync, /completed/get_all) and REST v2
+  (/projects, /sections, with ETags and 304 answers to If-None-Match),
+  serving a synthetic account
+- OpenAI: /v1/chat/completions, answering with one paragraph per category
+  (streamed as server-sent events when the request sets stream), and the
+  Batch API (/v1/files upload, /v1/batches, /v1/files/<id>/content)
+- SMTP: a sink accepting EHLO, AUTH, MAIL, RCPT and DATA (no TLS)
+
+All of them run in a child process so that they do not share the GIL or the
+memory accounting of the pipeline being measured. GET /__stats on the HTTP
+server returns the number of requests per endpoint and of emails received.
+
+The Todoist endpoints can enforce a fixed-window rate limit (todoist_limit
+requests per todoist_window seconds): responses carry X-RateLimit-Remaining
+and X-RateLimit-Reset, and requests over the limit get a 429 with
+Retry-After, counted as todoist_429.
+"""
+
+import re
+import json
+import math
+import hashlib
+import email.policy
+import time
+import base64
+import random
+import bisect
+import threading
+import socketserver
+import multiprocessing
+from datetime import date, datetime, timedelta
+from email.parser import BytesParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+CATEGORIES = ('Work', 'Perso', 'Tinker')
+
+
+class SyntheticAccount:
+    """
+    A Todoist account with projects, sections and completed tasks
+    
+    Projects are spread over the categories: the first ones are the bare
+    category projects, the others are "<Category>/Subproject N". Tasks are
+    completed during the week starting at week_start (or the given number
+    of weeks, for backfills), a fifth of them in a section.
+    """
+    
+    SECTIONS_PER_PROJECT = 2
+    
+    def __init__(self, tasks: int, projects: int, week_start: date, seed: int = 0, weeks: int = 1):
+        rng = random.Random(seed)
+        projects = max(projects, len(CATEGORIES))
+        
+        self.projects = []
+        for i in range(projects):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            name = category if i < len(CATEGORIES) else f"{category}/Subproject {i}"
+            self.projects.append({'id': f"p{i}", 'name': name})
+        
+        self.sections = [
+            {'id': f"s{i}-{j}", 'project_id': f"p{i}", 'name': f"Section {j}"}
+            for i in range(projects)
+            for j in range(self.SECTIONS_PER_PROJECT)
+        ]
+        self.sections_by_project: Dict[str, List[Dict[str, Any]]] = {}
+        for section in self.sections:
+            self.sections_by_project.setdefault(section['project_id'], []).append(section)
+        
+        start = datetime.combine(week_start, datetime.min.time())
+        self.items = []
+        for i in range(tasks):
+            project = rng.randrange(projects)
+            completed = start + timedelta(seconds=rng.randrange(weeks * 7 * 86400))
+            self.items.append({
+                'id': str(i),
+                'task_id': str(i),
+                'content': f"Synthetic task {i} in project {project}",
+                'completed_at': completed.strftime('%Y-%m-%dT%H:%M:%S.000000Z'),
+                'project_id': f"p{project}",
+                'section_id': f"s{project}-{i % self.SECTIONS_PER_PROJECT}" if i % 5 == 0 else None
+            })
+        self.items.sort(key=lambda item: item['completed_at'])
+        self._completed_keys = [item['completed_at'] for item in self.items]
+    
+    def completed_between(self, since: str, until: str) -> List[Dict[str, Any]]:
+        """Items completed in [since, until) (ISO strings, minute precision)"""
+        low = bisect.bisect_left(self._completed_keys, since)
+        high = bisect.bisect_left(self._completed_keys, until)
+        return self.items[low:high]
+
+
+class Stats:
+    """Thread-safe request counters"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+    
+    def hit(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+    
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+def fake_summary(prompt: str) -> str:
+    """One short paragraph per "## Category" heading of the expected structure"""
+    categories = list(dict.fromkeys(re.findall(r'^## (.+)$', prompt, flags=re.MULTILINE)))
+    return "\n\n".join(
+        f"## {category}\n\nI completed the planned tasks for {category}."
+        for category in categories or ['Summary']
+    )
+
+
+def fake_completion(request: Dict[str, Any]) -> Dict[str, Any]:
+    """chat.completion object answering a request with fake_summary"""
+    content = fake_summary(request['messages'][-1]['content'])
+    prompt_tokens = sum(len(m['content']) for m in request['messages']) // 4
+    completion_tokens = len(content) // 4
+    return {
+        'id': 'chatcmpl-bench',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model'),
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {'role': 'assistant', 'content': content}
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, bytes]:
+    """Fields of a multipart/form-data body (file uploads)"""
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body
+    )
+    return {
+        part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+        for part in message.iter_parts()
+    }
+
+
+class BatchStore:
+    """
+    Files and batches of the Batch API stand-in
+    
+    A batch is answered as soon as it is created, but reported in_progress
+    until batch_delay seconds have passed, so clients have to poll.
+    """
+    
+    def __init__(self, batch_delay: float):
+        self._lock = threading.Lock()
+        self.batch_delay = batch_delay
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+    
+    def add_file(self, content: bytes, purpose: str) -> Dict[str, Any]:
+        with self._lock:
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = content
+        return {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                'filename': f"{file_id}.jsonl", 'purpose': purpose, 'status': 'processed'}
+    
+    def create(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        lines = [json.loads(line) for line in self.files[params['input_file_id']].splitlines() if line.strip()]
+        output = "".join(
+            json.dumps({
+                'id': f"batch_req_{i}",
+                'custom_id': line['custom_id'],
+                'response': {'status_code': 200, 'request_id': f"req_{i}", 'body': fake_completion(line['body'])},
+                'error': None
+            }) + "\n"
+            for i, line in enumerate(lines)
+        )
+        output_file = self.add_file(output.encode('utf-8'), 'batch_output')
+        with self._lock:
+            batch_id = f"batch_{len(self.batches) + 1}"
+            self.batches[batch_id] = {
+                'id': batch_id,
+                'object': 'batch',
+                'endpoint': params['endpoint'],
+                'input_file_id': params['input_file_id'],
+                'completion_window': params['completion_window'],
+                'created_at': int(time.time()),
+                'metadata': params.get('metadata'),
+                'ready_at': time.time() + self.batch_delay,
+                'output_file_id': output_file['id'],
+                'total': len(lines)
+            }
+        return self.get(batch_id)
+    
+    def get(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        done = time.time() >= batch['ready_at']
+        public = {key: value for key, value in batch.items() if key not in ('ready_at', 'output_file_id', 'total')}
+        public.update({
+            'status': 'completed' if done else 'in_progress',
+            'output_file_id': batch['output_file_id'] if done else None,
+            'error_file_id': None,
+            'request_counts': {'completed': batch['total'] if done else 0, 'failed': 0, 'total': batch['total']}
+        })
+        return public
+
+
+class FixedWindowLimit:
+    """Todoist-style quota: limit requests per window of seconds"""
+    
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._count = 0
+    
+    def take(self) -> Dict[str, str]:
+        """
+        Count one request; returns the rate limit headers to send, with
+        Retry-After when the request is over the limit
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._count = 0
+            reset = self.window - (now - self._window_start)
+            if self._count >= self.limit:
+                return {'Retry-After': str(math.ceil(reset)), 'X-RateLimit-Remaining': '0',
+                        'X-RateLimit-Reset': f"{reset:.3f}"}
+            self._count += 1
+            return {'X-RateLimit-Remaining': str(self.limit - self._count),
+                    'X-RateLimit-Reset': f"{reset:.3f}"}
+
+
+def make_http_handler(
+    account: SyntheticAccount,
+    stats: Stats,
+    llm_latency: float,
+    batch_delay: float = 0.0,
+    todoist_limit: Optional[FixedWindowLimit] = None
+):
+    """HTTP handler class serving the Todoist and OpenAI stand-ins"""
+    batches = BatchStore(batch_delay)
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def log_message(self, *args):
+            pass
+        
+        def _send_json(self, payload: Any, status: int = 200, headers: Dict[str, str] = None) -> None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or self.rate_headers).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def _send_stream(self, model: str, content: str, usage: Optional[Dict[str, int]]) -> None:
+            """Server-sent events, one chunk per word, then the usage chunk"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            
+            def event(choices: List[Dict[str, Any]], chunk_usage=None) -> None:
+                payload = {'id': 'chatcmpl-bench', 'object': 'chat.completion.chunk',
+                           'created': int(time.time()), 'model': model,
+                           'choices': choices, 'usage': chunk_usage}
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            
+            for word in re.findall(r'\S+\s*', content):
+                event([{'index': 0, 'delta': {'content': word}, 'finish_reason': None}])
+            event([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+            if usage is not None:
+                event([], usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+        
+        def _send_cacheable(self, payload: Any, name: str) -> None:
+            """JSON with an ETag, or 304 if the client already has it"""
+            body = json.dumps(payload).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                stats.hit(f'{name}_304')
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                for header, value in self.rate_headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                return
+            stats.hit(name)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            for header, value in self.rate_headers.items():
+                self.send_header(header, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        rate_headers: Dict[str, str] = {}
+        
+        def _throttled(self, path: str) -> bool:
+            """Apply the Todoist rate limit; True if a 429 was sent"""
+            self.rate_headers = {}
+            if todoist_limit is None or not (path.startswith('/sync/') or path.startswith('/rest/')):
+                return False
+            self.rate_headers = todoist_limit.take()
+            if 'Retry-After' not in self.rate_headers:
+                return False
+            stats.hit('todoist_429')
+            self._send_json({'error': 'Too many requests'}, status=429)
+            return True
+        
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get('Content-Length', 0))
+            return self.rfile.read(length) if length else b''
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            
+            if url.path == '/__stats':
+                return self._send_json(stats.snapshot())
+            if self._throttled(url.path):
+                return
+            
+            if url.path == '/sync/v9/completed/get_all':
+                stats.hit('todoist_completed')
+                items = account.completed_between(params['since'], params['until'])
+                offset = int(params.get('offset', 0))
+                limit = int(params.get('limit', 30))
+                return self._send_json({'items': items[offset:offset + limit]})
+            
+            batch_match = re.fullmatch(r'/v1/batches/([\w-]+)', url.path)
+            if batch_match:
+                batch = batches.get(batch_match.group(1))
+                return self._send_json(batch) if batch else self._send_json({'error': 'not found'}, status=404)
+            
+            file_match = re.fullmatch(r'/v1/files/([\w-]+)/content', url.path)
+            if file_match and file_match.group(1) in batches.files:
+                content = batches.files[file_match.group(1)]
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+            
+            if url.path == '/rest/v2/projects':
+                return self._send_cacheable(account.projects, 'todoist_rest_projects')
+            
+            if url.path == '/rest/v2/sections':
+                return self._send_cacheable(account.sections_by_project.get(params.get('project_id'), []),
+                                            'todoist_rest_sections')
+            
+            self._send_json({'error': 'not found'}, status=404)
+        
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self._read_body()
+            if self._throttled(url.path):
+                return
+            
+            if url.path == '/sync/v9/sync':
+                stats.hit('todoist_sync')
+                form = {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+                if form.get('sync_token', '*') != '*':
+                    # Nothing changed since the previous read
+                    return self._send_json({'sync_token': 'bench', 'full_sync': False,
+                                            'projects': [], 'sections': []})
+                return self._send_json({'sync_token': 'bench', 'full_sync': True,
+                                        'projects': account.projects, 'sections': account.sections})
+            
+            if url.path == '/v1/chat/completions':
+                stats.hit('openai_chat')
+                request = json.loads(body or b'{}')
+                response = fake_completion(request)
+                time.sleep(llm_latency)
+                if request.get('stream'):
+                    include_usage = (request.get('stream_options') or {}).get('include_usage')
+                    return self._send_stream(request.get('model'), response['choices'][0]['message']['content'],
+                                             response['usage'] if include_usage else None)
+                return self._send_json(response)
+            
+            if url.path == '/v1/files':
+                stats.hit('openai_files')
+                fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+                return self._send_json(batches.add_file(fields['file'], fields.get('purpose', b'').decode()))
+            
+            if url.path == '/v1/batches':
+                stats.hit('openai_batches')
+                return self._send_json(batches.create(json.loads(body or b'{}')))
+            
+            self._send_json({'error': 'not found'}, status=404)
+    
+    return Handler
+
+
+def make_smtp_handler(stats: Stats):
+    """SMTP handler class that accepts and discards every message"""
+    
+    class Handler(socketserver.StreamRequestHandler):
+        
+        def reply(self, line: str) -> None:
+            self.wfile.write(f"{line}\r\n".encode('ascii'))
+        
+        def handle(self):
+            self.reply("220 bench SMTP sink")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode('utf-8', 'replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                
+                if verb == 'EHLO':
+                    self.reply("250-bench")
+                    self.reply("250-AUTH PLAIN LOGIN")
+                    self.reply("250 8BITMIME")
+                elif verb == 'HELO':
+                    self.reply("250 bench")
+                elif verb == 'AUTH':
+                    mechanism = command.split(' ')[1].upper() if ' ' in command else ''
+                    if mechanism == 'LOGIN':
+                        for prompt in ("Username:", "Password:"):
+                            self.reply(f"334 {base64.b64encode(prompt.encode()).decode()}")
+                            self.rfile.readline()
+                    self.reply("235 Authentication successful")
+                elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                    self.reply("250 OK")
+                elif verb == 'DATA':
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                        pass
+                    stats.hit('smtp_messages')
+                    self.reply("250 OK: queued")
+                elif verb == 'QUIT':
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+    
+    return Handler
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _serve(spec: Dict[str, Any], ready: multiprocessing.Queue, stop: multiprocessing.Event) -> None:
+    """Child process: build the account, start both servers, report their ports"""
+    account = SyntheticAccount(
+        tasks=spec['tasks'],
+        projects=spec['projects'],
+        week_start=date.fromisoformat(spec['week_start']),
+        seed=spec.get('seed', 0),
+        weeks=spec.get('weeks', 1)
+    )
+    stats = Stats()
+    todoist_limit = None
+    if spec.get('todoist_limit'):
+        todoist_limit = FixedWindowLimit(spec['todoist_limit'], spec.get('todoist_window', 60.0))
+    
+    http_server = ThreadingHTTPServer(
+        ('127.0.0.1', 0),
+        make_http_handler(account, stats, spec.get('llm_latency', 0.0), spec.get('batch_delay', 0.0),
+                          todoist_limit)
+    )
+    http_server.daemon_threads = True
+    smtp_server = _ThreadingTCPServer(('127.0.0.1', 0), make_smtp_handler(stats))
+    for server in (http_server, smtp_server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    ready.put((http_server.server_port, smtp_server.server_address[1]))
+    stop.wait()
+    http_server.shutdown()
+    smtp_server.shutdown()
+
+
+class FakeServices:
+    """
+    Runs the stand-ins in a child process
+    
+    Usage:
+        with FakeServices(tasks=1000, projects=50, week_start=start) as services:
+            os.environ.update(services.environment())
+            ...
+            services.stats()
+    """
+    
+    def __init__(
+        self,
+        tasks: int,
+        projects: int,
+        week_start: date,
+        llm_latency: float = 0.0,
+        seed: int = 0,
+        weeks: int = 1,
+        batch_delay: float = 0.0,
+        todoist_limit: Optional[int] = None,
+        todoist_window: float = 60.0
+    ):
+        self.spec = {
+            'tasks': tasks,
+            'projects': projects,
+            'week_start': week_start.isoformat(),
+            'llm_latency': llm_latency,
+            'seed': seed,
+            'weeks': weeks,
+            'batch_delay': batch_delay,
+            'todoist_limit': todoist_limit,
+            'todoist_window': todoist_window
+        }
+        self.http_port: Optional[int] = None
+        self.smtp_port: Optional[int] = None
+        self._process = None
+        self._stop = None
+    
+    def __enter__(self) -> 'FakeServices':
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        self._stop = context.Event()
+        self._process = context.Process(target=_serve, args=(self.spec, ready, self._stop), daemon=True)
+        self._process.start()
+        # Generating 100k tasks takes a few seconds
+        self.http_port, self.smtp_port = ready.get(timeout=120)
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.http_port}"
+    
+    def environment(self) -> Dict[str, str]:
+        """Environment variables pointing the pipeline at the stand-ins"""
+        return {
+            'TODOIST_API_TOKEN': 'bench',
+            'TODOIST_SYNC_URL': f"{self.base_url}/sync/v9",
+            'TODOIST_REST_URL': f"{self.base_url}/rest/v2",
+            'WORK_PREFIX': 'Work',
+            'PERSONAL_PREFIX': 'Perso',
+            'TINKER_PREFIX': 'Tinker',
+            'OPENAI_API_KEY': 'bench',
+            'OPENAI_BASE_URL': f"{self.base_url}/v1",
+            'SMTP_SERVER': '127.0.0.1',
+            'SMTP_PORT': str(self.smtp_port),
+            'SMTP_STARTTLS': 'False',
+            'SMTP_PASSWORD': 'bench',
+            'EMAIL_FROM': 'bench@example.com',
+            'EMAIL_TO': 'bench@example.com'
+        }
+    
+    def stats(self) -> Dict[str, int]:
+        """Requests per endpoint and emails received so far"""
+        import urllib.request
+        with urllib.request.urlopen(f"{self.base_url}/__stats", timeout=10) as response:
+            return json.loads(response.read())
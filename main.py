@@ -4,23 +4,24 @@ Generates weekly summaries of completed Todoist tasks
 """
 
 import sys
+import time
 import logging
+import argparse
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 import os
 
-from src.todoist_client import TodoistClient
-from src.summarizer import WeeklySummarizer
-from src.storage import StorageManager
-from src.email_sender import EmailSender
-from src.i18n import get_i18n
+# Pipeline stages (Todoist/requests, OpenAI, SMTP) are imported where they
+# run, so runs that stop early never pay for loading them
+from src.i18n import get_i18n, I18n
+from src.metrics import get_metrics, reset_metrics
 
 
-def setup_logging():
+def setup_logging(log_dir: Path = Path("logs")):
     """Configure logging system"""
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
+    log_dir.mkdir(parents=True, exist_ok=True)
     
     log_file = log_dir / f"execution_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
     
@@ -35,9 +36,15 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
-def get_week_range():
-    """Return start and end dates of past week (Monday-Sunday)"""
-    today = datetime.now().date()
+def get_week_range(reference: date = None):
+    """
+    Return start and end dates of past week (Monday-Sunday)
+    
+    Args:
+        reference: Day the run happens (default: today); backfills pass
+            earlier days to get earlier weeks
+    """
+    today = reference or datetime.now().date()
     # Sunday = 6, we want to go back to previous Monday
     days_since_monday = (today.weekday() + 1) % 7
     if days_since_monday == 0:  # If it's Sunday
@@ -49,52 +56,143 @@ def get_week_range():
     return start_date, end_date
 
 
-def main():
-    """Main function"""
-    # Load environment variables
-    load_dotenv()
+def get_week_ranges(weeks: int, reference: date = None) -> List[Tuple[date, date]]:
+    """The last N weeks as returned by get_week_range, oldest first"""
+    today = reference or datetime.now().date()
+    return [get_week_range(today - timedelta(weeks=i)) for i in range(weeks - 1, -1, -1)]
+
+
+def get_weeks_between(first_day: date, last_day: date) -> List[Tuple[date, date]]:
+    """Weeks (as returned by get_week_range) containing first_day to last_day, oldest first"""
+    # get_week_range(day + 1) is the week containing day
+    weeks = [get_week_range(first_day + timedelta(days=1))]
+    while weeks[-1][1] < last_day:
+        start_date = weeks[-1][0] + timedelta(weeks=1)
+        weeks.append((start_date, start_date + timedelta(days=6)))
+    return weeks
+
+
+def export_metrics(logger: logging.Logger, status: str) -> None:
+    """Write the run's Prometheus textfile and JSON report (never fails the run)"""
+    try:
+        get_metrics().export(status)
+    except Exception as e:
+        logger.warning(f"Unable to write metrics: {str(e)}")
+
+
+# Exit code of a run whose email is queued for retry (EX_TEMPFAIL)
+EXIT_EMAIL_QUEUED = 75
+
+
+def log_delivery(logger: logging.Logger, i18n: I18n, delivery: Dict[str, int]) -> None:
+    """
+    Log the outcome of EmailSender.send_summary and record it for the run
+    status (see run_status)
+    """
+    # With EMAIL_DELIVERY=queue, queuing is the expected outcome
+    bulk = os.getenv('EMAIL_DELIVERY', 'direct').lower() == 'queue'
+    queued = 0 if bulk else delivery['queued']
+    if delivery['sent'] and not queued and not delivery['dropped']:
+        logger.info(f"✓ {i18n.t('log_email_sent')}")
+    if queued:
+        logger.warning(i18n.t('log_email_queued', count=queued))
+    if delivery['dropped']:
+        logger.error(i18n.t('log_email_dropped', count=delivery['dropped']))
     
-    # Setup logging
-    logger = setup_logging()
+    if delivery['dropped']:
+        get_metrics().annotate(email='dropped')
+    elif queued:
+        get_metrics().annotate(email='queued')
+
+
+def run_status(task_count: int) -> str:
+    """
+    Status exported for a run that completed: email_dropped or
+    email_queued when the summary was not delivered, else success or
+    no_tasks
+    """
+    email = get_metrics().info.get('email')
+    if email is not None:
+        return f"email_{email}"
+    return 'success' if task_count else 'no_tasks'
+
+
+def retry_outbox(logger: logging.Logger) -> None:
+    """
+    Retry the emails left in the outbox by previous runs
     
-    # Get i18n instance
-    i18n = get_i18n()
+    Runs that send a summary already do it on the same connection; this
+    covers the runs that have nothing to send. In queue mode, the outbox is
+    flushed by batch.py --bulk-email instead.
+    """
+    if not os.getenv('EMAIL_SEND', False) or os.getenv('EMAIL_DELIVERY', 'direct').lower() == 'queue':
+        return
+    from src.outbox import Outbox
+    if not Outbox().due():
+        return
+    from src.email_sender import EmailSender
+    delivery = EmailSender().flush_outbox()
+    logger.info(f"Outbox: {delivery['sent']} sent, {delivery['queued']} still queued, "
+                f"{delivery['dropped']} dropped")
+
+
+def run_pipeline(logger: logging.Logger, i18n: I18n) -> int:
+    """
+    Run the fetch → organize → summarize → save → email pipeline for the
+    identity configured in the current environment
     
-    logger.info("=" * 80)
-    logger.info(i18n.t('log_startup'))
-    logger.info("=" * 80)
+    Returns:
+        Number of completed tasks summarized (0 if there was nothing to do)
+    """
+    metrics = get_metrics()
     
-    try:
-        # Get week range
-        start_date, end_date = get_week_range()
-        logger.info(i18n.t('log_period', start=start_date, end=end_date))
-        
-        # 1. Fetch tasks from Todoist
-        logger.info(i18n.t('log_step', step=1, total=5, action=i18n.t('log_connecting_todoist')))
-        todoist = TodoistClient()
-        completed_tasks = todoist.get_completed_tasks(start_date, end_date)
-        logger.info(f"✓ {i18n.t('log_tasks_found', count=len(completed_tasks))}")
-        
-        if not completed_tasks:
-            logger.warning(i18n.t('log_no_tasks'))
-            return
-        
-        # 2. Organize tasks by category
-        logger.info(i18n.t('log_step', step=2, total=5, action=i18n.t('log_organizing_tasks')))
-        organized_tasks = todoist.organize_tasks_by_category(completed_tasks)
-        
-        for category, subprojects in organized_tasks.items():
-            total = sum(len(tasks) for tasks in subprojects.values())
-            logger.info(f"  - {category}: {total} tasks")
-        
-        # 3. Generate summary with OpenAI
-        logger.info(i18n.t('log_step', step=3, total=5, action=i18n.t('log_generating_summary')))
+    # Get week range
+    start_date, end_date = get_week_range()
+    logger.info(i18n.t('log_period', start=start_date, end=end_date))
+    metrics.annotate(week_start=start_date.isoformat(), week_end=end_date.isoformat())
+    
+    # 1. Fetch tasks from Todoist (streamed page by page)
+    logger.info(i18n.t('log_step', step=1, total=5, action=i18n.t('log_connecting_todoist')))
+    from src.todoist_client import TodoistClient
+    todoist = TodoistClient()
+    completed_tasks = metrics.timed_iter(
+        todoist.iter_completed_tasks(start_date, end_date), 'stage', stage='fetch'
+    )
+    
+    # 2. Organize tasks by category as they arrive (fetch time excluded)
+    logger.info(i18n.t('log_step', step=2, total=5, action=i18n.t('log_organizing_tasks')))
+    organize_start = time.perf_counter()
+    organized_tasks = todoist.organize_tasks_by_category(completed_tasks)
+    metrics.record_span(
+        'stage', time.perf_counter() - organize_start - completed_tasks.elapsed, stage='organize'
+    )
+    task_count = sum(
+        len(tasks) for subprojects in organized_tasks.values() for tasks in subprojects.values()
+    )
+    metrics.annotate(tasks=task_count)
+    logger.info(f"✓ {i18n.t('log_tasks_found', count=task_count)}")
+    
+    if not organized_tasks:
+        logger.warning(i18n.t('log_no_tasks'))
+        retry_outbox(logger)
+        return 0
+    
+    for category, subprojects in organized_tasks.items():
+        total = sum(len(tasks) for tasks in subprojects.values())
+        logger.info(f"  - {category}: {total} tasks")
+    
+    # 3. Generate summary with OpenAI
+    logger.info(i18n.t('log_step', step=3, total=5, action=i18n.t('log_generating_summary')))
+    with metrics.span('stage', stage='summarize'):
+        from src.summarizer import WeeklySummarizer
+        from src.storage import StorageManager
         summarizer = WeeklySummarizer()
         
         # Load context from previous weeks
         storage = StorageManager()
         previous_summaries = storage.load_previous_summaries(
-            weeks=int(os.getenv('WEEKS_OF_CONTEXT', '4'))
+            weeks=int(os.getenv('WEEKS_OF_CONTEXT', '4')),
+            before=start_date
         )
         
         if previous_summaries:
@@ -104,38 +202,233 @@ def main():
             organized_tasks=organized_tasks,
             week_start=start_date,
             week_end=end_date,
-            previous_summaries=previous_summaries
+            previous_summaries=previous_summaries,
+            partial_path=storage.partial_path(start_date, end_date)
         )
-        logger.info(f"✓ {i18n.t('log_summary_generated')}")
-        
-        # 4. Save locally
-        logger.info(i18n.t('log_step', step=4, total=5, action=i18n.t('log_saving_local')))
+    logger.info(f"✓ {i18n.t('log_summary_generated')}")
+    
+    # 4. Save locally
+    logger.info(i18n.t('log_step', step=4, total=5, action=i18n.t('log_saving_local')))
+    with metrics.span('stage', stage='save'):
         storage.save_summary(
             summary=summary,
             organized_tasks=organized_tasks,
             week_start=start_date,
             week_end=end_date
         )
-        logger.info(f"✓ {i18n.t('log_summary_saved')}")
-        
-        # 5. Send email
-        if os.getenv('EMAIL_SEND', False):
-            logger.info(i18n.t('log_step', step=5, total=5, action=i18n.t('log_sending_email')))
+    logger.info(f"✓ {i18n.t('log_summary_saved')}")
+    
+    # 5. Send email
+    if os.getenv('EMAIL_SEND', False):
+        logger.info(i18n.t('log_step', step=5, total=5, action=i18n.t('log_sending_email')))
+        with metrics.span('stage', stage='email'):
+            from src.email_sender import EmailSender
             email_sender = EmailSender()
-            email_sender.send_summary(
+            delivery = email_sender.send_summary(
                 summary=summary,
                 week_start=start_date,
                 week_end=end_date
             )
-            logger.info(f"✓ {i18n.t('log_email_sent')}")
-            
-            logger.info("=" * 80)
-            logger.info(i18n.t('log_script_complete'))
-            logger.info("=" * 80)
+        log_delivery(logger, i18n, delivery)
+        
+        logger.info("=" * 80)
+        logger.info(i18n.t('log_script_complete'))
+        logger.info("=" * 80)
+    
+    return task_count
+
+
+async def run_pipeline_async(logger: logging.Logger, i18n: I18n) -> int:
+    """
+    Async variant of run_pipeline that overlaps independent stages
+    
+    The Todoist fetch, history loading and OpenAI/SMTP client setup run
+    concurrently; the summary is generated with AsyncOpenAI; the local save
+    and the email delivery then run side by side. Blocking libraries
+    (requests, smtplib, file I/O) run in worker threads.
+    
+    Returns:
+        Number of completed tasks summarized (0 if there was nothing to do)
+    """
+    import asyncio
+    metrics = get_metrics()
+    
+    # Get week range
+    start_date, end_date = get_week_range()
+    logger.info(i18n.t('log_period', start=start_date, end=end_date))
+    metrics.annotate(week_start=start_date.isoformat(), week_end=end_date.isoformat())
+    send_email = bool(os.getenv('EMAIL_SEND', False))
+    
+    def fetch_and_organize():
+        # 1. Fetch tasks from Todoist, 2. organize them as they arrive
+        logger.info(i18n.t('log_step', step=1, total=5, action=i18n.t('log_connecting_todoist')))
+        from src.todoist_client import TodoistClient
+        todoist = TodoistClient()
+        completed_tasks = metrics.timed_iter(
+            todoist.iter_completed_tasks(start_date, end_date), 'stage', stage='fetch'
+        )
+        logger.info(i18n.t('log_step', step=2, total=5, action=i18n.t('log_organizing_tasks')))
+        organize_start = time.perf_counter()
+        organized = todoist.organize_tasks_by_category(completed_tasks)
+        metrics.record_span(
+            'stage', time.perf_counter() - organize_start - completed_tasks.elapsed, stage='organize'
+        )
+        return organized
+    
+    def load_history():
+        from src.storage import StorageManager
+        storage = StorageManager()
+        previous = storage.load_previous_summaries(
+            weeks=int(os.getenv('WEEKS_OF_CONTEXT', '4')),
+            before=start_date
+        )
+        return storage, previous
+    
+    def create_summarizer():
+        from src.summarizer import WeeklySummarizer
+        return WeeklySummarizer(use_async=True)
+    
+    def create_email_sender():
+        # A bad SMTP setting must not cost the summary: the error is raised
+        # once the summary is saved, as in the sync pipeline
+        from src.email_sender import EmailSender
+        try:
+            return EmailSender(), None
+        except ValueError as e:
+            return None, e
+    
+    # None of these depend on the Todoist result (module imports included)
+    organized_tasks, (storage, previous_summaries), summarizer, (email_sender, email_error) = await asyncio.gather(
+        asyncio.to_thread(fetch_and_organize),
+        asyncio.to_thread(load_history),
+        asyncio.to_thread(create_summarizer),
+        asyncio.to_thread(create_email_sender) if send_email else asyncio.sleep(0, result=(None, None))
+    )
+    
+    task_count = sum(
+        len(tasks) for subprojects in organized_tasks.values() for tasks in subprojects.values()
+    )
+    metrics.annotate(tasks=task_count)
+    logger.info(f"✓ {i18n.t('log_tasks_found', count=task_count)}")
+    
+    if not organized_tasks:
+        logger.warning(i18n.t('log_no_tasks'))
+        retry_outbox(logger)
+        return 0
+    
+    for category, subprojects in organized_tasks.items():
+        total = sum(len(tasks) for tasks in subprojects.values())
+        logger.info(f"  - {category}: {total} tasks")
+    
+    # 3. Generate summary with AsyncOpenAI
+    logger.info(i18n.t('log_step', step=3, total=5, action=i18n.t('log_generating_summary')))
+    if previous_summaries:
+        logger.info(f"  - {i18n.t('log_context_loaded', count=len(previous_summaries))}")
+    
+    with metrics.span('stage', stage='summarize'):
+        summary = await summarizer.generate_summary_async(
+            organized_tasks=organized_tasks,
+            week_start=start_date,
+            week_end=end_date,
+            previous_summaries=previous_summaries,
+            partial_path=storage.partial_path(start_date, end_date)
+        )
+    logger.info(f"✓ {i18n.t('log_summary_generated')}")
+    
+    def save():
+        with metrics.span('stage', stage='save'):
+            storage.save_summary(
+                summary=summary,
+                organized_tasks=organized_tasks,
+                week_start=start_date,
+                week_end=end_date
+            )
+    
+    def send():
+        with metrics.span('stage', stage='email'):
+            return email_sender.send_summary(
+                summary=summary,
+                week_start=start_date,
+                week_end=end_date
+            )
+    
+    # 4. Save locally while 5. the email is in flight
+    logger.info(i18n.t('log_step', step=4, total=5, action=i18n.t('log_saving_local')))
+    stages = [asyncio.to_thread(save)]
+    if email_sender is not None:
+        logger.info(i18n.t('log_step', step=5, total=5, action=i18n.t('log_sending_email')))
+        stages.append(asyncio.to_thread(send))
+    _, *delivery = await asyncio.gather(*stages)
+    logger.info(f"✓ {i18n.t('log_summary_saved')}")
+    if email_error is not None:
+        raise email_error
+    
+    if email_sender is not None:
+        log_delivery(logger, i18n, delivery[0])
+        
+        logger.info("=" * 80)
+        logger.info(i18n.t('log_script_complete'))
+        logger.info("=" * 80)
+    
+    return task_count
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate the weekly Todoist summary")
+    parser.add_argument(
+        '--async', dest='use_async', action='store_true',
+        help="Run the pipeline with overlapped I/O stages (asyncio)"
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help="Always call OpenAI, ignoring cached responses"
+    )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help="Print the summary while OpenAI generates it"
+    )
+    args = parser.parse_args()
+    
+    # Load environment variables
+    load_dotenv()
+    if args.no_cache:
+        os.environ['LLM_CACHE'] = 'False'
+    if args.stream:
+        os.environ['OPENAI_STREAM'] = 'True'
+    
+    # Setup logging
+    logger = setup_logging()
+    
+    # Get i18n instance
+    i18n = get_i18n()
+    
+    logger.info("=" * 80)
+    logger.info(i18n.t('log_startup'))
+    logger.info("=" * 80)
+    
+    reset_metrics()
+    try:
+        start = time.perf_counter()
+        if args.use_async:
+            import asyncio
+            task_count = asyncio.run(run_pipeline_async(logger, i18n))
+        else:
+            task_count = run_pipeline(logger, i18n)
+        logger.info(f"Pipeline completed in {time.perf_counter() - start:.2f}s")
+        status = run_status(task_count)
+        export_metrics(logger, status)
         
     except Exception as e:
         logger.error(f"❌ {i18n.t('log_error')}: {str(e)}", exc_info=True)
+        export_metrics(logger, 'failed')
+        sys.exit(1)
+    
+    # Undelivered summaries are visible to cron as well as to the metrics
+    if status == 'email_dropped':
         sys.exit(1)
+    if status == 'email_queued':
+        sys.exit(EXIT_EMAIL_QUEUED)
 
 
 if __name__ == "__main__":
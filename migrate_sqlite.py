@@ -0,0 +1,28 @@
+"""
+Todoist AI Summary - SQLite migration
+Imports the JSON summaries archive into the SQLite database
+"""
+
+import sys
+import logging
+from dotenv import load_dotenv
+
+from src.storage import StorageManager
+
+
+def main():
+    """Migration entry point"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger(__name__)
+    
+    try:
+        imported = StorageManager().migrate_to_sqlite()
+        logger.info(f"✓ {imported} summaries imported. Set STORAGE_BACKEND=sqlite in .env to use them.")
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
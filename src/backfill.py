@@ -0,0 +1,445 @@
+"""
+Regeneration of past weeks: one OpenAI Batch API job, or parallel
+synchronous calls under a rate-limited scheduler
+"""
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import List, Dict, Any, Tuple, Optional
+from src.summarizer import WeeklySummarizer
+from src.storage import StorageManager
+from src.metrics import get_metrics
+from src.task_model import Task, OrganizedTasks
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBackfill:
+    """
+    Regenerates many weeks with one Batch API job
+    
+    The prompts of all weeks are written to a JSONL file, uploaded and
+    submitted as one batch (results within 24h, at half the price of
+    synchronous calls). Each job is recorded in DATA_DIR/backfill/<batch_id>.json
+    with its requests, so an interrupted run can wait for and collect the
+    results later (--resume). Weeks whose prompt is already in the response
+    cache are saved straight away and not submitted.
+    
+    Prompts are built in one go, so their history comes from the summaries
+    already stored before each week, not from the ones this job produces.
+    """
+    
+    ENDPOINT = "/v1/chat/completions"
+    
+    # Batch API results are billed at half price
+    PRICE_FACTOR = 0.5
+    
+    TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+    
+    def __init__(
+        self,
+        summarizer: WeeklySummarizer = None,
+        storage: StorageManager = None,
+        todoist=None,
+        jobs_dir: Path = None
+    ):
+        self.summarizer = summarizer or WeeklySummarizer()
+        self.storage = storage or StorageManager()
+        self._todoist = todoist
+        self.jobs_dir = Path(jobs_dir) if jobs_dir else Path(os.getenv('DATA_DIR', 'data')) / "backfill"
+        self.context_weeks = int(os.getenv('WEEKS_OF_CONTEXT', '4'))
+    
+    @property
+    def todoist(self):
+        """Todoist client, created when tasks are first needed"""
+        if self._todoist is None:
+            from src.todoist_client import TodoistClient
+            self._todoist = TodoistClient()
+        return self._todoist
+    
+    @staticmethod
+    def _custom_id(week_start: date) -> str:
+        return f"week-{week_start.strftime('%Y%m%d')}"
+    
+    def _job_path(self, batch_id: str) -> Path:
+        return self.jobs_dir / f"{batch_id}.json"
+    
+    def _write_job(self, job: Dict[str, Any]) -> None:
+        """Write a job file atomically"""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        path = self._job_path(job['batch_id'])
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    
+    def _organized_tasks(self, week_start: date, week_end: date) -> OrganizedTasks:
+        return self.todoist.organize_tasks_by_category(
+            self.todoist.iter_completed_tasks(week_start, week_end)
+        )
+    
+    def prepare(self, weeks: List[Tuple[date, date]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Build the request of every week to regenerate
+        
+        Weeks without tasks are skipped; weeks served by the response cache
+        are saved immediately.
+        
+        Returns:
+            Tuple (items to submit: custom_id, week_start, week_end, request;
+            number of weeks saved from the cache)
+        """
+        items = []
+        saved = 0
+        for week_start, week_end in weeks:
+            organized_tasks = self._organized_tasks(week_start, week_end)
+            if not organized_tasks:
+                logger.info(f"  {week_start}: no tasks, skipped")
+                continue
+            
+            previous_summaries = self.storage.load_previous_summaries(
+                weeks=self.context_weeks,
+                before=week_start
+            )
+            request = self.summarizer._build_request(
+                organized_tasks, week_start, week_end, previous_summaries
+            )
+            
+            cached = self.summarizer._cached_summary(request)
+            if cached is not None:
+                self.storage.save_summary(cached, organized_tasks, week_start, week_end)
+                saved += 1
+                continue
+            
+            items.append({
+                'custom_id': self._custom_id(week_start),
+                'week_start': week_start.isoformat(),
+                'week_end': week_end.isoformat(),
+                'request': request
+            })
+        return items, saved
+    
+    def submit(self, items: List[Dict[str, Any]]) -> str:
+        """
+        Upload the requests as JSONL and create the batch
+        
+        Returns:
+            The batch id
+        """
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        input_path = self.jobs_dir / f"input_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps({
+                    'custom_id': item['custom_id'],
+                    'method': 'POST',
+                    'url': self.ENDPOINT,
+                    'body': item['request']
+                }, ensure_ascii=False) + "\n")
+        
+        client = self.summarizer.client
+        with get_metrics().span('openai_batch_submit'):
+            with open(input_path, 'rb') as f:
+                input_file = client.files.create(file=f, purpose='batch')
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=self.ENDPOINT,
+                completion_window='24h',
+                metadata={'job': 'todoist-summary-backfill'}
+            )
+        
+        self._write_job({
+            'batch_id': batch.id,
+            'input_file_id': input_file.id,
+            'created_at': datetime.now().isoformat(),
+            'status': batch.status,
+            'items': items
+        })
+        input_path.unlink(missing_ok=True)
+        logger.info(f"Batch {batch.id} submitted: {len(items)} weeks")
+        return batch.id
+    
+    def wait(self, batch_id: str, poll_interval: float = 60):
+        """Poll the batch until it reaches a terminal status"""
+        client = self.summarizer.client
+        with get_metrics().span('openai_batch_wait'):
+            while True:
+                batch = client.batches.retrieve(batch_id)
+                counts = batch.request_counts
+                progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+                logger.info(f"  Batch {batch_id}: {batch.status}{progress}")
+                if batch.status in self.TERMINAL_STATUSES:
+                    return batch
+                time.sleep(poll_interval)
+    
+    def _download(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Download and parse a JSONL result file"""
+        if not file_id:
+            return []
+        content = self.summarizer.client.files.content(file_id).text
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+    
+    def collect(self, batch) -> Dict[str, int]:
+        """
+        Save the summaries returned by a finished batch
+        
+        Returns:
+            Number of weeks saved and failed
+        """
+        job = json.loads(self._job_path(batch.id).read_text(encoding='utf-8'))
+        items = {item['custom_id']: item for item in job['items']}
+        counts = {'saved': 0, 'failed': 0}
+        
+        for result in self._download(batch.output_file_id) + self._download(batch.error_file_id):
+            item = items.pop(result['custom_id'], None)
+            if item is None:
+                continue
+            response = result.get('response') or {}
+            if result.get('error') or response.get('status_code') != 200:
+                error = result.get('error') or response.get('body', {}).get('error')
+                logger.error(f"  {item['week_start']}: request failed: {error}")
+                counts['failed'] += 1
+                continue
+            
+            body = response['body']
+            summary = body['choices'][0]['message']['content'].strip()
+            usage = SimpleNamespace(**body['usage']) if body.get('usage') else None
+            self.summarizer._record_usage(item['request'], summary, usage, price_factor=self.PRICE_FACTOR)
+            
+            week_start = date.fromisoformat(item['week_start'])
+            week_end = date.fromisoformat(item['week_end'])
+            self.storage.save_summary(summary, self._organized_tasks(week_start, week_end), week_start, week_end)
+            counts['saved'] += 1
+        
+        # Requests the batch never answered (expired, cancelled)
+        for item in items.values():
+            logger.error(f"  {item['week_start']}: no result (batch {batch.status})")
+            counts['failed'] += 1
+        
+        job['status'] = batch.status
+        job['collected_at'] = datetime.now().isoformat()
+        self._write_job(job)
+        return counts
+    
+    def run(self, weeks: List[Tuple[date, date]], poll_interval: float = 60) -> Dict[str, int]:
+        """
+        Prepare, submit, wait for and collect a backfill of the given weeks
+        
+        Returns:
+            Number of weeks saved (from the cache included) and failed
+        """
+        items, from_cache = self.prepare(weeks)
+        no_tasks = len(weeks) - len(items) - from_cache
+        if not items:
+            logger.info(f"Nothing to submit ({from_cache} weeks served from cache, {no_tasks} without tasks)")
+            return {'saved': from_cache, 'failed': 0}
+        logger.info(f"{len(items)} weeks to submit ({from_cache} served from cache, {no_tasks} without tasks)")
+        batch_id = self.submit(items)
+        counts = self.resume(batch_id, poll_interval)
+        counts['saved'] += from_cache
+        return counts
+    
+    def resume(self, batch_id: str, poll_interval: float = 60) -> Dict[str, int]:
+        """Wait for and collect a batch submitted earlier"""
+        if not self._job_path(batch_id).exists():
+            raise FileNotFoundError(f"Unknown backfill job: {self._job_path(batch_id)}")
+        batch = self.wait(batch_id, poll_interval)
+        return self.collect(batch)
+
+
+class DependencyScheduler:
+    """
+    Runs jobs on named thread pools as soon as their dependencies allow
+    
+    A job starts when every job in `requires` succeeded and every job in
+    `after` finished (successfully or not); a failed requirement fails its
+    dependents without running them. Each stage has its own pool, so a long
+    queue of jobs in one stage (e.g. fetches) never delays the ready jobs
+    of another (e.g. the summary chain).
+    """
+    
+    def __init__(self, pools: Dict[str, int]):
+        self.pools = pools
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+    
+    def add(self, key: str, func, pool: str, requires=(), after=()) -> None:
+        """Register a job; dependencies must be added before it"""
+        self._jobs[key] = {'func': func, 'pool': pool, 'requires': list(requires), 'after': list(after)}
+    
+    def run(self) -> Dict[str, Tuple[bool, Any]]:
+        """
+        Run every job
+        
+        Returns:
+            Dict job key -> (succeeded, result or exception)
+        """
+        results: Dict[str, Tuple[bool, Any]] = {}
+        waiting = {key: len(job['requires']) + len(job['after']) for key, job in self._jobs.items()}
+        dependents: Dict[str, List[str]] = {}
+        for key, job in self._jobs.items():
+            for dependency in job['requires'] + job['after']:
+                dependents.setdefault(dependency, []).append(key)
+        
+        executors = {name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+                     for name, size in self.pools.items()}
+        running = {}
+        
+        def submit(key: str) -> None:
+            job = self._jobs[key]
+            failed = [dep for dep in job['requires'] if not results[dep][0]]
+            if failed:
+                finish(key, False, RuntimeError(f"dependency {failed[0]} failed"))
+                return
+            running[executors[job['pool']].submit(job['func'])] = key
+        
+        def finish(key: str, ok: bool, value: Any) -> None:
+            results[key] = (ok, value)
+            for dependent in dependents.get(key, ()):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    submit(dependent)
+        
+        try:
+            for key in [key for key, count in waiting.items() if count == 0]:
+                submit(key)
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    error = future.exception()
+                    finish(key, error is None, error if error is not None else future.result())
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+        return results
+
+
+class ParallelBackfill:
+    """
+    Regenerates a range of weeks with synchronous calls, in parallel
+    
+    Per week, three jobs: fetch (Todoist), summarize (OpenAI) and save.
+    Fetches all run ahead on their own pool, throttled by the Todoist
+    client's shared rate limiter; OpenAI calls share an OpenAIQuota. The
+    summary of week N uses weeks N-1..N-k as history (k = WEEKS_OF_CONTEXT),
+    so it waits for the saves of those weeks when they are part of the
+    backfill, while other fetches and saves keep going. With
+    stored_history, history is read once from the summaries stored before
+    the backfill and all weeks are summarized in parallel.
+    """
+    
+    TODOIST_CONCURRENCY = 4
+    
+    def __init__(
+        self,
+        summarizer: WeeklySummarizer = None,
+        storage: StorageManager = None,
+        todoist=None,
+        workers: int = 4,
+        stored_history: bool = False
+    ):
+        from src.rate_limit import OpenAIQuota
+        self.summarizer = summarizer or WeeklySummarizer()
+        self.summarizer.quota = self.summarizer.quota or OpenAIQuota()
+        self.storage = storage or StorageManager()
+        if todoist is None:
+            from src.todoist_client import TodoistClient
+            todoist = TodoistClient()
+        self.todoist = todoist
+        self.workers = workers
+        self.stored_history = stored_history
+        self.context_weeks = int(os.getenv('WEEKS_OF_CONTEXT', '4'))
+    
+    def _fetch(self, week_start: date, week_end: date) -> List[Task]:
+        # Every Todoist request is throttled by the client's shared limiter.
+        # Weeks are stored as they are fetched: the task store marks each
+        # day, so a failed week simply stays missing
+        return list(self.todoist.iter_completed_tasks(week_start, week_end))
+    
+    def _summarize(
+        self,
+        week_start: date,
+        week_end: date,
+        organized_tasks: OrganizedTasks,
+        history: Optional[List[Dict[str, Any]]]
+    ) -> Optional[str]:
+        if not organized_tasks:
+            logger.info(f"  {week_start}: no tasks, skipped")
+            return None
+        if history is None:
+            # The weeks this one depends on are saved by now
+            history = self.storage.load_previous_summaries(weeks=self.context_weeks, before=week_start)
+        return self.summarizer.generate_summary(organized_tasks, week_start, week_end, history)
+    
+    def run(self, weeks: List[Tuple[date, date]]) -> Dict[str, int]:
+        """
+        Regenerate the given weeks (oldest first)
+        
+        Returns:
+            Number of weeks saved, without tasks and failed
+        """
+        if not weeks:
+            raise ValueError("No weeks to regenerate: the range is empty")
+        
+        # Resolve projects once, before concurrent fetches use them
+        self.todoist.get_projects_and_sections(set(), set())
+        
+        stored_history = {}
+        if self.stored_history:
+            for week_start, _ in weeks:
+                stored_history[week_start] = self.storage.load_previous_summaries(
+                    weeks=self.context_weeks, before=week_start
+                )
+        
+        scheduler = DependencyScheduler({
+            'todoist': self.TODOIST_CONCURRENCY,
+            'openai': self.workers,
+            # One writer: saves never overlap (summary index, versions)
+            'storage': 1
+        })
+        fetched: Dict[date, List[Task]] = {}
+        summaries: Dict[date, Tuple[OrganizedTasks, Optional[str]]] = {}
+        
+        def fetch(week_start, week_end):
+            fetched[week_start] = self._fetch(week_start, week_end)
+        
+        def summarize(week_start, week_end):
+            organized_tasks = self.todoist.organize_tasks_by_category(fetched[week_start])
+            summary = self._summarize(week_start, week_end, organized_tasks, stored_history.get(week_start))
+            summaries[week_start] = (organized_tasks, summary)
+        
+        def save(week_start, week_end):
+            organized_tasks, summary = summaries[week_start]
+            if summary is None:
+                return False
+            self.storage.save_summary(summary, organized_tasks, week_start, week_end)
+            return True
+        
+        for index, (week_start, week_end) in enumerate(weeks):
+            week = week_start.isoformat()
+            previous_saves = [] if self.stored_history else [
+                f"save:{weeks[i][0].isoformat()}" for i in range(max(0, index - self.context_weeks), index)
+            ]
+            scheduler.add(f"fetch:{week}", lambda ws=week_start, we=week_end: fetch(ws, we), 'todoist')
+            scheduler.add(f"summarize:{week}", lambda ws=week_start, we=week_end: summarize(ws, we), 'openai',
+                          requires=[f"fetch:{week}"], after=previous_saves)
+            scheduler.add(f"save:{week}", lambda ws=week_start, we=week_end: save(ws, we), 'storage',
+                          requires=[f"summarize:{week}"])
+        
+        results = scheduler.run()
+        
+        counts = {'saved': 0, 'no_tasks': 0, 'failed': 0}
+        for week_start, _ in weeks:
+            ok, value = results[f"save:{week_start.isoformat()}"]
+            if not ok:
+                logger.error(f"  {week_start}: failed: {value}")
+                counts['failed'] += 1
+            else:
+                counts['saved' if value else 'no_tasks'] += 1
+        return counts
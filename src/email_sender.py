@@ -5,10 +5,15 @@ Email sender module
 import os
 import logging
 import smtplib
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from src.i18n import get_i18n
+from src.rendering import get_locale_formats, markdown_to_html
+from src.metrics import get_metrics
+from src.outbox import Outbox
 
 logger = logging.getLogger(__name__)
 
@@ -21,124 +26,220 @@ class EmailSender:
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.email_from = os.getenv('EMAIL_FROM')
         self.email_to = os.getenv('EMAIL_TO')
+        self.recipients = [r.strip() for r in (self.email_to or '').split(',') if r.strip()]
         self.smtp_password = os.getenv('SMTP_PASSWORD')
+        self.smtp_starttls = os.getenv('SMTP_STARTTLS', 'True').lower() == 'true'
+        self.smtp_timeout = float(os.getenv('SMTP_TIMEOUT', '30'))
+        # direct: send now (failures go to the outbox), queue: outbox only
+        self.delivery = os.getenv('EMAIL_DELIVERY', 'direct').lower()
+        self.outbox = Outbox()
         self.i18n = get_i18n()
         
         # Validate configuration
-        if not all([self.email_from, self.email_to, self.smtp_password]):
+        if not all([self.email_from, self.recipients, self.smtp_password]):
             raise ValueError(
                 "Incomplete email configuration. Check EMAIL_FROM, "
                 "EMAIL_TO and SMTP_PASSWORD in .env"
             )
         
-        logger.info(f"Email configuration: {self.email_from} -> {self.email_to}")
-    
-    def _markdown_to_html(self, markdown_text: str) -> str:
-        """
-        Convert Markdown to HTML (simple conversion for email)
-        Handles: ##, ###, paragraphs, line breaks
-        """
-        html = ""
-        lines = markdown_text.split('\n')
-        in_paragraph = False
-        current_paragraph = []
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            # H2 heading (##)
-            if stripped.startswith('## ') and not stripped.startswith('### '):
-                if in_paragraph:
-                    html += f"<p>{'<br>'.join(current_paragraph)}</p>\n"
-                    current_paragraph = []
-                    in_paragraph = False
-                heading_text = stripped[3:].strip()
-                html += f'<h2 style="color: #667eea; margin-top: 25px; margin-bottom: 15px; font-size: 20px;">{heading_text}</h2>\n'
-            
-            # H3 heading (###)
-            elif stripped.startswith('### '):
-                if in_paragraph:
-                    html += f"<p>{'<br>'.join(current_paragraph)}</p>\n"
-                    current_paragraph = []
-                    in_paragraph = False
-                heading_text = stripped[4:].strip()
-                html += f'<h3 style="color: #764ba2; margin-top: 20px; margin-bottom: 10px; font-size: 18px;">{heading_text}</h3>\n'
-            
-            # Empty line = end of paragraph
-            elif not stripped:
-                if in_paragraph:
-                    html += f"<p>{'<br>'.join(current_paragraph)}</p>\n"
-                    current_paragraph = []
-                    in_paragraph = False
-            
-            # Regular text line
-            else:
-                in_paragraph = True
-                current_paragraph.append(stripped)
-        
-        # Close last paragraph if any
-        if in_paragraph:
-            html += f"<p>{'<br>'.join(current_paragraph)}</p>\n"
-        
-        return html
+        logger.info(f"Email configuration: {self.email_from} -> {', '.join(self.recipients)}")
     
     def send_summary(
         self,
         summary: str,
         week_start: datetime.date,
         week_end: datetime.date
-    ) -> None:
+    ) -> Dict[str, int]:
         """
-        Send the summary via email
+        Send the summary via email to every recipient
+        
+        All recipients are served over one authenticated connection, after
+        the outbox entries that are due. Messages that cannot be delivered
+        are stored in the outbox instead of being lost. With
+        EMAIL_DELIVERY=queue, messages are only stored, for a later bulk
+        delivery (batch.py --bulk-email).
         
         Args:
             summary: The summary to send
             week_start: Week start date
             week_end: Week end date
+        
+        Returns:
+            Dict with the number of emails sent, queued for retry and dropped
         """
-        # Format dates based on language
-        if self.i18n.language == 'fr':
-            start_str = week_start.strftime('%d/%m')
-            end_str = week_end.strftime('%d/%m/%Y')
-        else:
-            start_str = week_start.strftime('%m/%d')
-            end_str = week_end.strftime('%m/%d/%Y')
+        formats = get_locale_formats(self.i18n.language)
+        start_str = week_start.strftime(formats.day_month)
+        end_str = week_end.strftime(formats.date)
         
         subject = self.i18n.t('email_subject', start=start_str, end=end_str)
         
-        # Build message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = self.email_from
-        msg['To'] = self.email_to
-        msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z')
-        
         # Text version
         text_body = self._format_text_body(summary, week_start, week_end)
         
         # HTML version (prettier)
         html_body = self._format_html_body(summary, week_start, week_end)
         
+        # One message per recipient (recipients do not see each other)
+        entries = [
+            {
+                'sender': self.email_from,
+                'recipient': recipient,
+                'subject': subject,
+                'message': self._build_message(subject, recipient, text_body, html_body)
+            }
+            for recipient in self.recipients
+        ]
+        
+        if self.delivery == 'queue':
+            for entry in entries:
+                self.outbox.enqueue(**entry)
+            logger.info(f"  {len(entries)} emails queued for bulk delivery")
+            return {'sent': 0, 'queued': len(entries), 'dropped': 0}
+        
+        return self._deliver(entries)
+    
+    def _build_message(self, subject: str, recipient: str, text_body: str, html_body: str) -> str:
+        """Build the MIME message for one recipient"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.email_from
+        msg['To'] = recipient
+        msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z')
+        
         # Attach both versions
-        part1 = MIMEText(text_body, 'plain', 'utf-8')
-        part2 = MIMEText(html_body, 'html', 'utf-8')
+        msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+        return msg.as_string()
+    
+    @property
+    def connection_key(self) -> Tuple[str, int, str, bool]:
+        """Senders with the same key can share one SMTP connection"""
+        return (self.smtp_server, self.smtp_port, self.email_from, self.smtp_starttls)
+    
+    @contextmanager
+    def connect(self) -> Iterator[smtplib.SMTP]:
+        """Open an authenticated SMTP connection"""
+        logger.info(f"Connecting to {self.smtp_server}:{self.smtp_port}...")
+        with get_metrics().span('smtp_connect', server=self.smtp_server):
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.smtp_timeout)
+            try:
+                if self.smtp_starttls:
+                    server.starttls()
+                server.login(self.email_from, self.smtp_password)
+            except Exception:
+                server.close()
+                raise
+        try:
+            yield server
+        finally:
+            try:
+                server.quit()
+            except smtplib.SMTPException:
+                server.close()
+    
+    def flush_outbox(self, server: Optional[smtplib.SMTP] = None) -> Dict[str, int]:
+        """
+        Deliver the outbox entries that are due
         
-        msg.attach(part1)
-        msg.attach(part2)
+        Args:
+            server: Connection to reuse (one is opened if None and needed)
+        
+        Returns:
+            Dict with the number of emails sent, queued for retry and dropped
+        """
+        due = self.outbox.due()
+        if not due:
+            return {'sent': 0, 'queued': 0, 'dropped': 0}
+        logger.info(f"  Retrying {len(due)} emails from the outbox")
+        return self._deliver([], server=server, queued_entries=due)
+    
+    def fail_outbox(self, error: str) -> Dict[str, int]:
+        """
+        Record a failed attempt for every due outbox entry
+        
+        For callers that could not open the connection flush_outbox would
+        have used: the entries are rescheduled with backoff (or dropped
+        once out of attempts) as if each send had failed.
+        
+        Returns:
+            Dict with the number of emails sent, queued for retry and dropped
+        """
+        result = {'sent': 0, 'queued': 0, 'dropped': 0}
+        for entry in self.outbox.due():
+            self._failed(result, entry, error, permanent=False, from_outbox=True)
+        return result
+    
+    def _failed(
+        self,
+        result: Dict[str, int],
+        entry: Dict[str, Any],
+        error: str,
+        permanent: bool,
+        from_outbox: bool
+    ) -> None:
+        """Queue (or drop) an entry that was not delivered and count it in result"""
+        if from_outbox:
+            retried = self.outbox.mark_failed(entry, error, permanent=permanent)
+        else:
+            self.outbox.enqueue(**entry, error=error, permanent=permanent)
+            retried = not permanent
+        result['queued' if retried else 'dropped'] += 1
+        get_metrics().inc('smtp_failures', permanent=permanent, server=self.smtp_server)
+        logger.warning(f"  Email to {entry['recipient']} not delivered "
+                       f"({'dropped' if not retried else 'queued in outbox'}): {error}")
+    
+    def _deliver(
+        self,
+        entries: List[Dict[str, Any]],
+        server: Optional[smtplib.SMTP] = None,
+        queued_entries: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, int]:
+        """
+        Send new entries and due outbox entries over one connection
+        
+        Temporary failures (connection errors, 4xx) go to the outbox to be
+        retried with backoff; permanent ones (5xx) are moved to its dead/
+        directory.
+        """
+        if queued_entries is None:
+            queued_entries = self.outbox.due()
+            if queued_entries:
+                logger.info(f"  Retrying {len(queued_entries)} emails from the outbox")
+        result = {'sent': 0, 'queued': 0, 'dropped': 0}
+        metrics = get_metrics()
+        
+        pending = [(entry, True) for entry in queued_entries] + [(entry, False) for entry in entries]
+        if not pending:
+            return result
         
-        # Send
         try:
-            logger.info(f"Connecting to {self.smtp_server}:{self.smtp_port}...")
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_from, self.smtp_password)
-                server.send_message(msg)
-            
-            logger.info(f"  Email sent successfully to {self.email_to}")
-            
-        except Exception as e:
+            with self.connect() if server is None else nullcontext(server) as connection:
+                while pending:
+                    entry, from_outbox = pending[0]
+                    try:
+                        with metrics.span('smtp_send', server=self.smtp_server):
+                            connection.sendmail(entry['sender'], [entry['recipient']],
+                                                entry['message'].encode('utf-8'))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        code = max(code for code, _ in e.recipients.values())
+                        self._failed(result, entry, f"{code} {e.recipients}", code >= 500, from_outbox)
+                    except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        self._failed(result, entry, f"{e.smtp_code} {e.smtp_error!r}", e.smtp_code >= 500, from_outbox)
+                    else:
+                        if from_outbox:
+                            self.outbox.mark_sent(entry)
+                        result['sent'] += 1
+                        metrics.inc('smtp_messages', server=self.smtp_server)
+                        metrics.inc('smtp_bytes', len(entry['message']), server=self.smtp_server)
+                        logger.info(f"  Email sent successfully to {entry['recipient']}")
+                    pending.pop(0)
+        except (smtplib.SMTPException, OSError) as e:
+            # Connection-level failure: everything not sent yet is kept
             logger.error(f"Error sending email: {str(e)}")
-            raise
+            for entry, from_outbox in pending:
+                self._failed(result, entry, f"{type(e).__name__}: {str(e)}", False, from_outbox)
+        
+        return result
     
     def _format_text_body(
         self,
@@ -147,15 +248,10 @@ class EmailSender:
         week_end: datetime.date
     ) -> str:
         """Format email body as plain text"""
-        # Format dates based on language
-        if self.i18n.language == 'fr':
-            start_str = week_start.strftime('%d/%m/%Y')
-            end_str = week_end.strftime('%d/%m/%Y')
-            date_str = datetime.now().strftime('%d/%m/%Y à %H:%M')
-        else:
-            start_str = week_start.strftime('%m/%d/%Y')
-            end_str = week_end.strftime('%m/%d/%Y')
-            date_str = datetime.now().strftime('%m/%d/%Y at %I:%M %p')
+        formats = get_locale_formats(self.i18n.language)
+        start_str = week_start.strftime(formats.date)
+        end_str = week_end.strftime(formats.date)
+        date_str = datetime.now().strftime(formats.generated_at_12h)
         
         return f"""{self.i18n.t('email_greeting')}
 
@@ -176,22 +272,15 @@ class EmailSender:
     ) -> str:
         """Format email body as HTML"""
         
-        # Format dates based on language
-        if self.i18n.language == 'fr':
-            start_str = week_start.strftime('%d/%m/%Y')
-            end_str = week_end.strftime('%d/%m/%Y')
-            date_str = datetime.now().strftime('%d/%m/%Y à %H:%M')
-            header_start = week_start.strftime('%d/%m')
-            header_end = end_str
-        else:
-            start_str = week_start.strftime('%m/%d/%Y')
-            end_str = week_end.strftime('%m/%d/%Y')
-            date_str = datetime.now().strftime('%m/%d/%Y at %I:%M %p')
-            header_start = week_start.strftime('%m/%d')
-            header_end = end_str
+        formats = get_locale_formats(self.i18n.language)
+        start_str = week_start.strftime(formats.date)
+        end_str = week_end.strftime(formats.date)
+        date_str = datetime.now().strftime(formats.generated_at_12h)
+        header_start = week_start.strftime(formats.day_month)
+        header_end = end_str
         
         # Convert Markdown to HTML
-        html_content = self._markdown_to_html(summary)
+        html_content = markdown_to_html(summary)
         
         return f"""
 <!DOCTYPE html>
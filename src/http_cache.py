@@ -0,0 +1,181 @@
+"""
+Persistent HTTP cache with conditional requests (ETag / Last-Modified)
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from src.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache:
+    """
+    On-disk store of GET responses that carry a validator
+    
+    One JSON file per URL (and credentials), holding the body and the
+    ETag / Last-Modified to revalidate it with. Entries are never served
+    without asking the server first, so they do not expire; the least
+    recently used ones are evicted once the cache exceeds HTTP_CACHE_MAX_MB.
+    """
+    
+    KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+    
+    def __init__(self, cache_dir: Path = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(os.getenv('DATA_DIR', 'data')) / "http_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(float(os.getenv('HTTP_CACHE_MAX_MB', '5')) * 1024 * 1024)
+    
+    @staticmethod
+    def key(request) -> str:
+        """Hash of the URL and the credentials of a prepared request"""
+        payload = f"{request.url}\n{request.headers.get('Authorization', '')}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        """Path of a cache entry"""
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for key, or None if missing"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"  Unable to read HTTP cache entry {path.name}: {str(e)}")
+            return None
+    
+    def touch(self, key: str) -> None:
+        """Mark an entry as recently used"""
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+    
+    def put(self, key: str, response) -> None:
+        """Store a response with its validators, then evict excess entries"""
+        path = self._path(key)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': response.url,
+                'stored_at': time.time(),
+                'headers': {name: response.headers[name] for name in self.KEPT_HEADERS
+                            if name in response.headers},
+                'body': base64.b64encode(response.content).decode('ascii')
+            }, f)
+        os.replace(tmp_path, path)
+        self.evict()
+    
+    def evict(self) -> None:
+        """Drop the least recently used entries above the size limit"""
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        
+        if evicted:
+            logger.info(f"  HTTP cache: {evicted} entries evicted")
+
+
+class CachingAdapter(BaseAdapter):
+    """
+    Transport adapter revalidating cached GET responses
+    
+    Wraps another adapter (retries, rate limiting). A GET whose URL is in
+    the cache is sent with If-None-Match / If-Modified-Since; on a 304 the
+    stored body is returned as a 200, so callers never see the difference.
+    That response has from_cache set, with the status and body size of the
+    304 in wire_status and wire_bytes for the metrics hook. Responses with a
+    validator (and without Cache-Control: no-store) are stored. Counted in
+    the http_cache metric, by result (hit, miss).
+    """
+    
+    def __init__(self, adapter: BaseAdapter, cache: HTTPCache = None):
+        super().__init__()
+        self.adapter = adapter
+        self.cache = cache or HTTPCache()
+    
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or 'If-None-Match' in request.headers \
+                or 'If-Modified-Since' in request.headers:
+            return self.adapter.send(request, **kwargs)
+        
+        key = self.cache.key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if 'ETag' in entry['headers']:
+                request.headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                request.headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        
+        response = self.adapter.send(request, **kwargs)
+        url = urlparse(request.url)
+        labels = {'host': url.hostname, 'endpoint': url.path}
+        
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            get_metrics().inc('http_cache', result='hit', **labels)
+            return self._cached_response(entry, response)
+        
+        get_metrics().inc('http_cache', result='miss', **labels)
+        cacheable = ('ETag' in response.headers or 'Last-Modified' in response.headers) \
+            and 'no-store' not in response.headers.get('Cache-Control', '')
+        if response.status_code == 200 and cacheable:
+            try:
+                self.cache.put(key, response)
+            except OSError as e:
+                logger.warning(f"  Unable to write HTTP cache entry: {str(e)}")
+        return response
+    
+    def _cached_response(self, entry: Dict[str, Any], not_modified: Response) -> Response:
+        """Build a 200 response from a cache entry and the server's 304"""
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # Validators may have been refreshed by the 304
+        for name in ('ETag', 'Last-Modified'):
+            if name in not_modified.headers:
+                response.headers[name] = not_modified.headers[name]
+        response._content = base64.b64decode(entry['body'])
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.raw = not_modified.raw
+        response.elapsed = not_modified.elapsed
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.connection = self
+        # What actually went over the wire, for record_http_response
+        response.from_cache = True
+        response.wire_status = not_modified.status_code
+        response.wire_bytes = len(not_modified.content or b'')
+        return response
+    
+    def close(self):
+        self.adapter.close()
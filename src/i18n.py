@@ -1,162 +1,126 @@
 """
 Internationalization (i18n) module for multi-language support
-Supports: French (fr), English (en)
+Catalogs live in src/locales/<language>.json (fr, en, ...)
 """
 
 import os
+import json
+import string
 import logging
-from typing import Dict, Any
+from pathlib import Path
+from functools import lru_cache
+from typing import Dict, FrozenSet
 
 logger = logging.getLogger(__name__)
 
+LOCALES_DIR = Path(__file__).resolve().parent / "locales"
+DEFAULT_LANGUAGE = 'en'
+
+
+class Message:
+    """
+    A translation string compiled once into literal and field segments
+    
+    Formatting joins the segments instead of parsing the template again on
+    every call. Templates with fields str.format supports but the segments
+    do not (attributes, indexes, nested specs) fall back to format_map.
+    """
+    
+    __slots__ = ('template', 'fields', '_segments')
+    
+    _CONVERSIONS = {'s': str, 'r': repr, 'a': ascii}
+    
+    def __init__(self, template: str):
+        self.template = template
+        segments = []
+        for literal, field_name, spec, conversion in string.Formatter().parse(template):
+            if field_name is not None and (not field_name.isidentifier() or '{' in spec):
+                segments = None
+                break
+            segments.append((literal, field_name, spec, self._CONVERSIONS.get(conversion)))
+        self._segments = tuple(segments) if segments is not None else None
+        self.fields: FrozenSet[str] = frozenset(
+            field_name.split('.')[0].split('[')[0]
+            for _, field_name, _, _ in string.Formatter().parse(template)
+            if field_name
+        )
+    
+    def format(self, key: str, kwargs: Dict) -> str:
+        """Format with kwargs, or return the raw template if an argument is missing"""
+        try:
+            if self._segments is None:
+                return self.template.format_map(kwargs)
+            out = []
+            for literal, field_name, spec, convert in self._segments:
+                out.append(literal)
+                if field_name is not None:
+                    value = kwargs[field_name]
+                    if convert is not None:
+                        value = convert(value)
+                    out.append(format(value, spec))
+            return ''.join(out)
+        except KeyError as e:
+            logger.error(f"Missing format argument for key '{key}': {e.args[0]}")
+            return self.template
+
+
+class Catalog:
+    """Messages and date formats of one language, English used for missing keys"""
+    
+    def __init__(self, language: str, messages: Dict[str, Message], date_formats: Dict[str, str]):
+        self.language = language
+        self.messages = messages
+        self.date_formats = date_formats
+
+
+@lru_cache(maxsize=None)
+def available_languages() -> FrozenSet[str]:
+    """Languages with a catalog file"""
+    return frozenset(path.stem for path in LOCALES_DIR.glob("*.json"))
+
+
+@lru_cache(maxsize=None)
+def load_catalog(language: str) -> Catalog:
+    """
+    Load and compile the catalog of a language (once per process)
+    
+    Raises:
+        FileNotFoundError: If the language has no catalog file
+    """
+    with open(LOCALES_DIR / f"{language}.json", 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    messages = {key: Message(template) for key, template in data['messages'].items()}
+    date_formats = data.get('date_formats', {})
+    if language != DEFAULT_LANGUAGE:
+        # Fallback to English, merged once instead of on every lookup
+        fallback = load_catalog(DEFAULT_LANGUAGE)
+        messages = {**fallback.messages, **messages}
+        date_formats = {**fallback.date_formats, **date_formats}
+    return Catalog(language, messages, date_formats)
+
 
 class I18n:
     """Handles translations for the application"""
     
-    # Translation dictionaries
-    TRANSLATIONS = {
-        'en': {
-            # Email subjects and bodies
-            'email_subject': '📊 Weekly Summary - Week of {start} to {end}',
-            'email_greeting': 'Hello,',
-            'email_intro': 'Here is your weekly summary for the week of {start} to {end}.',
-            'email_footer': 'This summary was automatically generated by Todoist AI Summary.',
-            'email_generated_at': 'Generated on {date}',
-            
-            # Log messages
-            'log_startup': 'Starting Todoist AI Summary script',
-            'log_period': 'Analysis period: {start} to {end}',
-            'log_step': 'Step {step}/{total}: {action}...',
-            'log_connecting_todoist': 'Connecting to Todoist',
-            'log_tasks_found': '{count} completed tasks retrieved',
-            'log_organizing_tasks': 'Organizing tasks',
-            'log_generating_summary': 'Generating AI summary',
-            'log_context_loaded': 'Context loaded: {count} previous weeks',
-            'log_summary_generated': 'Summary generated successfully',
-            'log_saving_local': 'Saving locally',
-            'log_summary_saved': 'Summary saved locally',
-            'log_sending_email': 'Sending email',
-            'log_email_sent': 'Email sent successfully',
-            'log_script_complete': 'Script completed successfully!',
-            'log_no_tasks': 'No completed tasks this week. Stopping script.',
-            'log_error': 'Error during execution',
-            
-            # Markdown labels
-            'md_weekly_summary': 'Weekly Summary - Week of {start} to {end}',
-            'md_generated_on': 'Generated on {date}',
-            'md_summary_title': '📝 Summary',
-            'md_stats_title': '📊 Statistics',
-            'md_total_tasks': '**Total completed tasks**: {count}',
-            'md_tasks_detail': '📋 Task Details',
-            'md_category': '{category}',
-            
-            # Email categories (displayed in emails/markdown)
-            'category_display_work': '💼 Work',
-            'category_display_personal': '🏠 Personal',
-            'category_display_tinker': '🔧 Tinker',
-            'category_display_other': '📌 Other',
-            
-            # Prompt instructions for AI
-            'prompt_system': 'You are an assistant that helps write personal weekly summaries in a factual and structured manner.',
-            'prompt_period': 'PERIOD: Week of {start} to {end}',
-            'prompt_context': 'CONTEXT (previous weeks):',
-            'prompt_tasks': 'COMPLETED TASKS THIS WEEK:',
-            'prompt_subproject': '[Subproject: {name}]',
-            'prompt_instructions': 'INSTRUCTIONS',
-            'prompt_instruction_text': 'Write a summary of my week based ONLY on the completed tasks above.',
-            'prompt_format': 'REQUIRED FORMAT (MARKDOWN STRUCTURE):',
-            'prompt_style': 'STYLE:',
-            'prompt_style_rules': '''- Factual and professional but natural tone
-- First person ("I...", "I focused on...")
-- No bullet points, only fluid paragraphs in complete sentences
-- DO NOT extrapolate emotions or feelings (example: avoid "that was annoying", "spent a lot of time", etc.)
-- Stay strictly factual: describe what was done, not how I felt
-- If you have context from previous weeks, ensure natural narrative continuity
-- Use EXACTLY the titles ## and ### as indicated above''',
-            'prompt_important': 'IMPORTANT:',
-            'prompt_important_rules': '''- Use Markdown titles (##) for each main category
-- Use subtitles (###) ONLY for subprojects that exist
-- If a category has no subprojects (just a category name), write the paragraph directly without subtitle ###
-- Each subproject must have its own distinct paragraph under its ### title
-- Start directly with Markdown titles, no introduction''',
-            'prompt_request': 'Now write the summary following EXACTLY this structure:',
-        },
-        'fr': {
-            # Email subjects and bodies
-            'email_subject': '📊 Résumé hebdomadaire - Semaine du {start} au {end}',
-            'email_greeting': 'Bonjour,',
-            'email_intro': 'Voici ton résumé hebdomadaire pour la semaine du {start} au {end}.',
-            'email_footer': 'Ce résumé a été généré automatiquement par Todoist AI Summary.',
-            'email_generated_at': 'Généré le {date}',
-            
-            # Log messages
-            'log_startup': 'Démarrage du script Todoist AI Summary',
-            'log_period': 'Période analysée : {start} au {end}',
-            'log_step': 'Étape {step}/{total} : {action}...',
-            'log_connecting_todoist': 'Connexion à Todoist',
-            'log_tasks_found': '{count} tâches complétées récupérées',
-            'log_organizing_tasks': 'Organisation des tâches',
-            'log_generating_summary': 'Génération du résumé IA',
-            'log_context_loaded': 'Contexte chargé : {count} semaines précédentes',
-            'log_summary_generated': 'Résumé généré avec succès',
-            'log_saving_local': 'Sauvegarde locale',
-            'log_summary_saved': 'Résumé sauvegardé localement',
-            'log_sending_email': 'Envoi par email',
-            'log_email_sent': 'Email envoyé avec succès',
-            'log_script_complete': 'Script terminé avec succès !',
-            'log_no_tasks': 'Aucune tâche complétée cette semaine. Arrêt du script.',
-            'log_error': 'Erreur lors de l\'exécution',
-            
-            # Markdown labels
-            'md_weekly_summary': 'Résumé hebdomadaire - Semaine du {start} au {end}',
-            'md_generated_on': 'Généré le {date}',
-            'md_summary_title': '📝 Résumé',
-            'md_stats_title': '📊 Statistiques',
-            'md_total_tasks': '**Total de tâches complétées** : {count}',
-            'md_tasks_detail': '📋 Détail des tâches',
-            'md_category': '{category}',
-            
-            # Email categories (displayed in emails/markdown)
-            'category_display_work': '💼 Travail',
-            'category_display_personal': '🏠 Personnel',
-            'category_display_tinker': '🔧 Tinker',
-            'category_display_other': '📌 Autres',
-            
-            # Prompt instructions for AI
-            'prompt_system': 'Tu es un assistant qui aide à rédiger des résumés hebdomadaires personnels de manière factuelle et structurée.',
-            'prompt_period': 'PÉRIODE : Semaine du {start} au {end}',
-            'prompt_context': 'CONTEXTE (semaines précédentes) :',
-            'prompt_tasks': 'TÂCHES COMPLÉTÉES CETTE SEMAINE :',
-            'prompt_subproject': '[Sous-projet: {name}]',
-            'prompt_instructions': 'INSTRUCTIONS',
-            'prompt_instruction_text': 'Rédige un résumé de ma semaine en te basant UNIQUEMENT sur les tâches complétées ci-dessus.',
-            'prompt_format': 'FORMAT REQUIS (STRUCTURE MARKDOWN) :',
-            'prompt_style': 'STYLE :',
-            'prompt_style_rules': '''- Ton factuel et professionnel mais naturel
-- À la 1ère personne ("J'ai...", "Je me suis concentré sur...")
-- Pas de liste à puces, uniquement des paragraphes fluides en phrases complètes
-- NE PAS extrapoler d'émotions ou de ressentis (exemple : éviter "qui m'agaçait", "pas mal de temps", etc.)
-- Rester strictement factuel : décrire ce qui a été fait, pas comment je me suis senti
-- Si tu as le contexte des semaines précédentes, assure une continuité narrative naturelle
-- Utiliser EXACTEMENT les titres ## et ### comme indiqué ci-dessus''',
-            'prompt_important': 'IMPORTANT :',
-            'prompt_important_rules': '''- Utilise les titres Markdown (##) pour chaque catégorie principale
-- Utilise les sous-titres (###) UNIQUEMENT pour les sous-projets qui existent
-- Si une catégorie n'a pas de sous-projets (juste un nom de catégorie), écris directement le paragraphe sans sous-titre ###
-- Chaque sous-projet doit avoir son propre paragraphe distinct sous son titre ###
-- Commence directement par les titres Markdown, sans introduction''',
-            'prompt_request': 'Rédige maintenant le résumé en suivant EXACTEMENT cette structure :',
-        }
-    }
-    
     def __init__(self):
         """Initialize i18n with language from environment"""
-        self.language = os.getenv('LANGUAGE', 'en').lower()
+        self.language = os.getenv('LANGUAGE', DEFAULT_LANGUAGE).lower()
         
         # Validate language
-        if self.language not in self.TRANSLATIONS:
+        if self.language not in available_languages():
             logger.warning(f"Language '{self.language}' not supported, falling back to 'en'")
-            self.language = 'en'
+            self.language = DEFAULT_LANGUAGE
+        
+        self._messages = load_catalog(self.language).messages
+        
+        # Category prefix -> translation key, resolved once
+        self._category_keys = {
+            os.getenv('WORK_PREFIX', 'Work'): 'category_display_work',
+            os.getenv('PERSONAL_PREFIX', 'Perso'): 'category_display_personal',
+            os.getenv('TINKER_PREFIX', 'Tinker'): 'category_display_tinker',
+        }
+        self._category_names: Dict[str, str] = {}
         
         logger.info(f"Language set to: {self.language}")
     
@@ -171,24 +135,15 @@ class I18n:
         Returns:
             Translated and formatted string
         """
-        translation = self.TRANSLATIONS.get(self.language, {}).get(key)
-        
-        if translation is None:
-            # Fallback to English
-            translation = self.TRANSLATIONS.get('en', {}).get(key)
-            if translation is None:
-                logger.warning(f"Translation key '{key}' not found")
-                return key
+        message = self._messages.get(key)
+        if message is None:
+            logger.warning(f"Translation key '{key}' not found")
+            return key
         
         # Format the string if kwargs provided
-        if kwargs:
-            try:
-                return translation.format(**kwargs)
-            except KeyError as e:
-                logger.error(f"Missing format argument for key '{key}': {e}")
-                return translation
-        
-        return translation
+        if kwargs and message.fields:
+            return message.format(key, kwargs)
+        return message.template
     
     def get_category_display_name(self, category: str) -> str:
         """
@@ -200,15 +155,11 @@ class I18n:
         Returns:
             Translated category display name
         """
-        # Map category to translation key
-        category_map = {
-            os.getenv('WORK_PREFIX', 'Work'): 'category_display_work',
-            os.getenv('PERSONAL_PREFIX', 'Perso'): 'category_display_personal',
-            os.getenv('TINKER_PREFIX', 'Tinker'): 'category_display_tinker',
-        }
-        
-        key = category_map.get(category, 'category_display_other')
-        return self.t(key)
+        name = self._category_names.get(category)
+        if name is None:
+            key = self._category_keys.get(category, 'category_display_other')
+            name = self._category_names[category] = self.t(key)
+        return name
 
 
 # Global instance
@@ -219,4 +170,9 @@ def get_i18n() -> I18n:
     global _i18n_instance
     if _i18n_instance is None:
         _i18n_instance = I18n()
-    return _i18n_instance
\ No newline at end of file
+    return _i18n_instance
+
+def reset_i18n() -> None:
+    """Drop the global i18n instance so the next get_i18n() re-reads LANGUAGE"""
+    global _i18n_instance
+    _i18n_instance = None
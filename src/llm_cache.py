@@ -0,0 +1,126 @@
+"""
+Content-addressed cache of OpenAI responses
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Persistent cache of chat completions, keyed by a hash of the request
+    (model, messages, temperature, max_tokens)
+    
+    Entries whose created_at is older than LLM_CACHE_MAX_AGE_DAYS are
+    ignored and evicted; the oldest entries are also evicted once the cache
+    exceeds LLM_CACHE_MAX_MB. Each file's mtime is set to its created_at,
+    so eviction sorts entries by stat alone.
+    """
+    
+    KEY_FIELDS = ('model', 'messages', 'temperature', 'max_tokens')
+    
+    # Above the size limit, evict down to this fraction of it, so the next
+    # scans are not needed until the cache has grown again
+    EVICT_TO = 0.9
+    
+    def __init__(self, cache_dir: Path = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(os.getenv('DATA_DIR', 'data')) / "llm_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age = float(os.getenv('LLM_CACHE_MAX_AGE_DAYS', '30')) * 86400
+        self.max_bytes = int(float(os.getenv('LLM_CACHE_MAX_MB', '50')) * 1024 * 1024)
+        self._total_bytes = None
+    
+    @classmethod
+    def key(cls, request: Dict[str, Any]) -> str:
+        """Hash of the request fields that determine the response"""
+        payload = json.dumps(
+            {field: request.get(field) for field in cls.KEY_FIELDS},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        """Path of a cache entry"""
+        return self.cache_dir / f"{key}.json"
+    
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        """True if the entry was created more than max_age ago"""
+        return now - float(entry.get('created_at', 0)) > self.max_age
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for key, or None if missing or expired
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self._expired(entry, time.time()):
+                path.unlink(missing_ok=True)
+                return None
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"  Unable to read cache entry {path.name}: {str(e)}")
+            return None
+    
+    def put(self, key: str, summary: str, usage: Dict[str, int]) -> None:
+        """Store a response, then evict expired and excess entries if needed"""
+        path = self._path(key)
+        tmp_path = path.with_suffix('.tmp')
+        created_at = time.time()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': created_at,
+                'summary': summary,
+                'usage': usage
+            }, f, ensure_ascii=False)
+        # The mtime mirrors created_at, so evict() never has to open entries
+        os.utime(tmp_path, (created_at, created_at))
+        os.replace(tmp_path, path)
+        
+        # Total size is scanned once, then kept up to date: the directory is
+        # only scanned again when the limit is exceeded
+        if self._total_bytes is None:
+            self.evict()
+        else:
+            self._total_bytes += path.stat().st_size
+            if self._total_bytes > self.max_bytes:
+                self.evict()
+    
+    def evict(self) -> None:
+        """Drop expired entries, then the oldest ones above the size limit"""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.EVICT_TO if total > self.max_bytes else total
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        self._total_bytes = total
+        
+        if evicted:
+            logger.info(f"  LLM cache: {evicted} entries evicted")
@@ -0,0 +1,265 @@
+"""
+Run instrumentation: timing spans, counters and their export
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Dict, Any, List, Tuple, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    """Hashable, ordered label set"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """
+    Collects the spans and counters of one pipeline run
+    
+    Thread-safe: spans are recorded from the worker threads of the map-reduce
+    summary and of the async pipeline. Durations are aggregated per name and
+    label set (count and sum) and every span is also kept for the run report.
+    """
+    
+    PREFIX = "todoist_summary"
+    
+    # Run statuses exported as run_success 0
+    FAILED_STATUSES = ('failed', 'email_dropped')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.info: Dict[str, Any] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._durations: Dict[Tuple[str, Labels], List[float]] = {}
+    
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to a counter"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def record_span(self, name: str, duration: float, error: bool = False, **labels) -> None:
+        """Record a span whose duration is already known"""
+        key = (name, _labels(labels))
+        with self._lock:
+            count_sum = self._durations.setdefault(key, [0, 0.0])
+            count_sum[0] += 1
+            count_sum[1] += duration
+            self.spans.append({
+                'name': name,
+                'labels': dict(key[1]),
+                'start_s': round(time.perf_counter() - self._start - duration, 4),
+                'duration_s': round(duration, 4),
+                'error': error
+            })
+    
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record_span(name, time.perf_counter() - start, error=error, **labels)
+    
+    def timed_iter(self, iterable: Iterable, name: str, **labels) -> 'TimedIterator':
+        """Wrap an iterable, recording the time spent producing its items as one span"""
+        return TimedIterator(self, iterable, name, labels)
+    
+    def annotate(self, **info) -> None:
+        """Attach run information (week, task count...) to the report"""
+        with self._lock:
+            self.info.update(info)
+    
+    def record_http_response(self, response, *args, **kwargs) -> None:
+        """
+        requests response hook: one span per HTTP call, plus request,
+        byte and retry counters per endpoint
+        
+        A response served from the HTTP cache (from_cache) is counted with
+        the status and size of the 304 the server sent; its cached body
+        goes to http_cached_response_bytes instead.
+        """
+        url = urlparse(response.url)
+        labels = {'host': url.hostname, 'endpoint': url.path}
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', ()) or ()
+        body = response.request.body or b''
+        if getattr(response, 'from_cache', False):
+            status, received = response.wire_status, response.wire_bytes
+            self.inc('http_cached_response_bytes', len(response.content), **labels)
+        else:
+            status, received = response.status_code, len(response.content)
+        
+        self.record_span('http_request', response.elapsed.total_seconds(),
+                         error=status >= 400, **labels)
+        self.inc('http_requests', status=status, **labels)
+        self.inc('http_response_bytes', received, **labels)
+        self.inc('http_request_bytes', len(body), **labels)
+        if retries:
+            self.inc('http_retries', len(retries), **labels)
+    
+    # Export
+    
+    def report(self, status: str) -> Dict[str, Any]:
+        """Run report as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+                'duration_s': round(time.perf_counter() - self._start, 4),
+                'status': status,
+                'info': dict(self.info),
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                'durations': [
+                    {'name': name, 'labels': dict(labels), 'count': count, 'sum_s': round(total, 4)}
+                    for (name, labels), (count, total) in sorted(self._durations.items())
+                ],
+                'spans': list(self.spans)
+            }
+    
+    def prometheus(self, status: str) -> str:
+        """Metrics of the run in the Prometheus text exposition format"""
+        prefix = self.PREFIX
+        lines = []
+        
+        def sample(name: str, labels: Labels, value: float) -> None:
+            label_str = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+        
+        with self._lock:
+            counters = sorted(self._counters.items())
+            durations = sorted(self._durations.items())
+        
+        for metric in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for (name, labels), value in counters:
+                if name == metric:
+                    sample(f"{prefix}_{metric}", labels, value)
+        
+        for metric in sorted({name for (name, _), _ in durations}):
+            lines.append(f"# TYPE {prefix}_{metric}_duration_seconds summary")
+            for (name, labels), (count, total) in durations:
+                if name == metric:
+                    sample(f"{prefix}_{metric}_duration_seconds_sum", labels, round(total, 6))
+                    sample(f"{prefix}_{metric}_duration_seconds_count", labels, count)
+        
+        lines.append(f"# TYPE {prefix}_run_duration_seconds gauge")
+        sample(f"{prefix}_run_duration_seconds", (), round(time.perf_counter() - self._start, 6))
+        lines.append(f"# TYPE {prefix}_run_success gauge")
+        sample(f"{prefix}_run_success", (('status', status),), 0 if status in self.FAILED_STATUSES else 1)
+        lines.append(f"# TYPE {prefix}_run_timestamp_seconds gauge")
+        sample(f"{prefix}_run_timestamp_seconds", (), int(self.started_at))
+        if 'tasks' in self.info:
+            lines.append(f"# TYPE {prefix}_run_tasks gauge")
+            sample(f"{prefix}_run_tasks", (), self.info['tasks'])
+        return "\n".join(lines) + "\n"
+    
+    def export(self, status: str) -> Tuple[Path, Path]:
+        """
+        Write the Prometheus textfile and the JSON run report
+        
+        The textfile (METRICS_TEXTFILE, default DATA_DIR/metrics/todoist_summary.prom)
+        is replaced atomically, as the node_exporter textfile collector
+        expects. Reports are kept per run in METRICS_DIR (default
+        DATA_DIR/metrics).
+        
+        Returns:
+            Tuple (textfile path, report path)
+        """
+        metrics_dir = Path(os.getenv('METRICS_DIR', Path(os.getenv('DATA_DIR', 'data')) / "metrics"))
+        textfile = Path(os.getenv('METRICS_TEXTFILE', metrics_dir / f"{self.PREFIX}.prom"))
+        report_file = metrics_dir / f"run_report_{datetime.fromtimestamp(self.started_at).strftime('%Y%m%d_%H%M%S')}.json"
+        
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        textfile.parent.mkdir(parents=True, exist_ok=True)
+        
+        tmp_path = textfile.with_name(textfile.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(status))
+        os.replace(tmp_path, textfile)
+        
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report(status), f, ensure_ascii=False, indent=2)
+        
+        logger.info(f"Metrics written to {textfile} and {report_file.name}")
+        return textfile, report_file
+
+
+class TimedIterator:
+    """
+    Iterator that accumulates the time spent in next() on the wrapped one
+    
+    Used for streamed stages (e.g. the Todoist fetch consumed while tasks are
+    organized), where the producer's share cannot be timed as a block. The
+    span is recorded once the iterator is exhausted.
+    """
+    
+    def __init__(self, metrics: Metrics, iterable: Iterable, name: str, labels: Dict[str, Any]):
+        self._metrics = metrics
+        self._iterator = iter(iterable)
+        self._name = name
+        self._labels = labels
+        self._recorded = False
+        self.elapsed = 0.0
+    
+    def __iter__(self) -> 'TimedIterator':
+        return self
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            if not self._recorded:
+                self._recorded = True
+                self._metrics.record_span(self._name, self.elapsed + time.perf_counter() - start,
+                                          **self._labels)
+            raise
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+# Global instance (one run per process at a time)
+_metrics_instance = None
+
+def get_metrics() -> Metrics:
+    """Get the metrics of the current run (singleton pattern)"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = Metrics()
+    return _metrics_instance
+
+def reset_metrics() -> Metrics:
+    """Start collecting a new run"""
+    global _metrics_instance
+    _metrics_instance = Metrics()
+    return _metrics_instance
+
+def record_http_response(response, *args, **kwargs) -> None:
+    """requests response hook recording into the current run"""
+    get_metrics().record_http_response(response)
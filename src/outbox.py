@@ -0,0 +1,129 @@
+"""
+On-disk outbox for emails that could not be delivered
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Queue of undelivered emails, one JSON file per message and recipient
+    
+    A message that fails with a temporary error is retried on later runs,
+    waiting OUTBOX_RETRY_MINUTES, then twice as long after each new failure
+    (capped at a day). After OUTBOX_MAX_ATTEMPTS failures, or on a permanent
+    SMTP error (5xx), it is moved to the dead/ sub-directory and kept for
+    inspection.
+    """
+    
+    MAX_BACKOFF = 86400
+    
+    def __init__(self, outbox_dir: Path = None):
+        self.outbox_dir = Path(outbox_dir) if outbox_dir else Path(os.getenv('DATA_DIR', 'data')) / "outbox"
+        self.dead_dir = self.outbox_dir / "dead"
+        self.retry_base = float(os.getenv('OUTBOX_RETRY_MINUTES', '5')) * 60
+        self.max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+    
+    def _write(self, path: Path, entry: Dict[str, Any]) -> None:
+        """Write an entry atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    
+    def _backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, after attempts failures"""
+        return min(self.retry_base * 2 ** (attempts - 1), self.MAX_BACKOFF)
+    
+    def enqueue(
+        self,
+        sender: str,
+        recipient: str,
+        message: str,
+        subject: str = "",
+        error: Optional[str] = None,
+        permanent: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Store a message for one recipient
+        
+        Args:
+            sender: Envelope sender
+            recipient: Envelope recipient
+            message: Full message (headers + body) as a string
+            subject: Subject, for logs
+            error: Error of the failed attempt (None if not attempted yet)
+            permanent: The error is permanent, do not retry
+        
+        Returns:
+            The stored entry
+        """
+        now = time.time()
+        attempts = 1 if error else 0
+        entry = {
+            'id': f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
+            'created_at': now,
+            'sender': sender,
+            'recipient': recipient,
+            'subject': subject,
+            'attempts': attempts,
+            'next_attempt_at': now + self._backoff(attempts) if attempts else now,
+            'last_error': error,
+            'message': message
+        }
+        if permanent:
+            self._write(self.dead_dir / f"{entry['id']}.json", entry)
+        else:
+            self._write(self.outbox_dir / f"{entry['id']}.json", entry)
+        return entry
+    
+    def pending(self) -> List[Dict[str, Any]]:
+        """All queued entries, oldest first"""
+        entries = []
+        for path in sorted(self.outbox_dir.glob("*.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries.append(json.load(f))
+            except Exception as e:
+                logger.warning(f"  Unable to read outbox entry {path.name}: {str(e)}")
+        entries.sort(key=lambda entry: entry['created_at'])
+        return entries
+    
+    def due(self) -> List[Dict[str, Any]]:
+        """Queued entries whose retry time has come, oldest first"""
+        now = time.time()
+        return [entry for entry in self.pending() if entry['next_attempt_at'] <= now]
+    
+    def mark_sent(self, entry: Dict[str, Any]) -> None:
+        """Remove a delivered entry"""
+        (self.outbox_dir / f"{entry['id']}.json").unlink(missing_ok=True)
+    
+    def mark_failed(self, entry: Dict[str, Any], error: str, permanent: bool = False) -> bool:
+        """
+        Record a failed attempt of a queued entry
+        
+        Returns:
+            True if the entry will be retried, False if it was moved to dead/
+        """
+        entry['attempts'] += 1
+        entry['last_error'] = error
+        path = self.outbox_dir / f"{entry['id']}.json"
+        if permanent or entry['attempts'] >= self.max_attempts:
+            self._write(self.dead_dir / path.name, entry)
+            path.unlink(missing_ok=True)
+            logger.warning(f"  Giving up on email to {entry['recipient']} after "
+                           f"{entry['attempts']} attempts: {error}")
+            return False
+        entry['next_attempt_at'] = time.time() + self._backoff(entry['attempts'])
+        self._write(path, entry)
+        return True
@@ -0,0 +1,242 @@
+"""
+Client-side rate limiting for the Todoist and OpenAI APIs
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from src.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def rate_from_env(name: str, default: str) -> float:
+    """Read a per-minute rate from the environment, rejecting values <= 0"""
+    value = os.getenv(name, default)
+    try:
+        rate = float(value)
+    except ValueError:
+        rate = 0.0
+    if not rate > 0:
+        raise ValueError(f"{name} must be a number greater than 0, got {value!r}")
+    return rate
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously
+    
+    Holds up to `burst` tokens (default: one minute's worth) and gains
+    per_minute / 60 tokens per second. acquire() blocks until the requested
+    amount is available, so callers sharing a bucket share its rate.
+    """
+    
+    def __init__(self, per_minute: float, burst: float = None, name: str = "bucket"):
+        if not per_minute > 0:
+            raise ValueError(f"{name}: rate must be greater than 0 per minute, got {per_minute}")
+        self.rate = per_minute / 60
+        self.capacity = burst if burst is not None else per_minute
+        self.name = name
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def set_rate(self, per_minute: float) -> None:
+        """Change the refill rate (tokens already in the bucket are kept)"""
+        with self._lock:
+            self._refill()
+            self.rate = per_minute / 60
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Take amount tokens, waiting for them if needed
+        
+        An amount above the capacity is capped to it, so one oversized
+        request waits for a full bucket instead of forever.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    break
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+        
+        if waited:
+            get_metrics().record_span('rate_limit_wait', waited, limiter=self.name)
+        return waited
+
+
+class OpenAIQuota:
+    """
+    Requests-per-minute and tokens-per-minute limits of the OpenAI account
+    
+    Configured with OPENAI_RPM and OPENAI_TPM (defaults: 500 and 200000,
+    the first usage tier of gpt-4o-mini). A call reserves its prompt tokens
+    plus max_tokens, the amount OpenAI counts against the quota.
+    """
+    
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests = TokenBucket(
+            requests_per_minute or rate_from_env('OPENAI_RPM', '500'), name='openai_requests'
+        )
+        self.tokens = TokenBucket(
+            tokens_per_minute or rate_from_env('OPENAI_TPM', '200000'), name='openai_tokens'
+        )
+    
+    def acquire(self, request: Dict[str, Any], prompt_tokens: int) -> float:
+        """Wait until the request fits both quotas; returns seconds waited"""
+        waited = self.requests.acquire(1)
+        waited += self.tokens.acquire(prompt_tokens + request.get('max_tokens', 0))
+        return waited
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket that follows what the server says about its quota
+    
+    - 429 with Retry-After: every caller pauses until the given time (or a
+      default delay), and the rate is halved
+    - X-RateLimit-Remaining / X-RateLimit-Reset: the rate is lowered so the
+      remaining requests are spread over the time left in the window, and
+      the bucket never holds more tokens than requests remaining
+    - Other responses: the rate climbs back by a twentieth of the
+      configured rate, never above it
+    """
+    
+    DEFAULT_PAUSE = 10.0
+    MIN_RATE_FACTOR = 0.1
+    SAFETY_MARGIN = 0.9
+    
+    def __init__(self, per_minute: float, burst: float = None, name: str = "bucket"):
+        super().__init__(per_minute, burst, name)
+        self.max_per_minute = per_minute
+        self._paused_until = 0.0
+    
+    @property
+    def per_minute(self) -> float:
+        return self.rate * 60
+    
+    def acquire(self, amount: float = 1) -> float:
+        """Wait for a pause to end, then take tokens"""
+        waited = 0.0
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            get_metrics().record_span('rate_limit_wait', waited, limiter=self.name, reason='retry_after')
+        return waited + super().acquire(amount)
+    
+    def _adjust(self, per_minute: float) -> None:
+        per_minute = min(self.max_per_minute, max(self.max_per_minute * self.MIN_RATE_FACTOR, per_minute))
+        if abs(per_minute - self.per_minute) > 1e-9:
+            self.set_rate(per_minute)
+    
+    def observe(self, response) -> None:
+        """Adapt to the status and rate limit headers of a response"""
+        metrics = get_metrics()
+        if response.status_code == 429:
+            pause = parse_retry_after(response.headers.get('Retry-After'))
+            pause = self.DEFAULT_PAUSE if pause is None else pause
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._adjust(self.per_minute / 2)
+            metrics.inc('rate_limit_throttled', limiter=self.name)
+            logger.warning(f"  {self.name}: rate limited, pausing {pause:.1f}s "
+                           f"(now {self.per_minute:.1f} requests/min)")
+            return
+        
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is not None and reset is not None:
+            try:
+                remaining, reset = float(remaining), float(reset)
+            except ValueError:
+                remaining = None
+            if remaining is not None:
+                # Reset is either seconds left or an epoch timestamp
+                seconds_left = reset - time.time() if reset > 10 ** 9 else reset
+                if seconds_left > 0:
+                    with self._lock:
+                        # Never burst past what the server still allows
+                        self._refill()
+                        self._tokens = min(self._tokens, remaining)
+                    self._adjust(remaining / seconds_left * 60 * self.SAFETY_MARGIN)
+                    return
+        
+        self._adjust(self.per_minute + self.max_per_minute / 20)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter sending every request through an AdaptiveRateLimiter
+    
+    429 responses are retried here (up to max_throttle_retries) after the
+    limiter's pause, so concurrent callers sharing the limiter slow down
+    together instead of each retrying on its own.
+    """
+    
+    def __init__(self, limiter: AdaptiveRateLimiter, max_throttle_retries: int = 5, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.max_throttle_retries = max_throttle_retries
+    
+    def send(self, request, **kwargs):
+        for attempt in range(self.max_throttle_retries + 1):
+            self.limiter.acquire()
+            response = super().send(request, **kwargs)
+            self.limiter.observe(response)
+            if response.status_code != 429 or attempt == self.max_throttle_retries:
+                return response
+            # Drain the body so the connection goes back to the pool
+            response.content
+            response.close()
+        return response
+
+
+_shared_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_shared_lock = threading.Lock()
+
+def shared_limiter(key: str, per_minute: float, burst: float = None, name: str = "bucket") -> AdaptiveRateLimiter:
+    """
+    Limiter shared by every client of the process using the same key
+    (e.g. one per API account)
+    """
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _shared_limiters[key] = AdaptiveRateLimiter(per_minute, burst, name)
+        return limiter
@@ -0,0 +1,368 @@
+"""
+Shared rendering helpers for the prompt, Markdown and email bodies
+"""
+
+import re
+import unicodedata
+from html import escape
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+from src.i18n import DEFAULT_LANGUAGE, available_languages, load_catalog
+
+
+class LocaleFormats:
+    """strftime patterns of one language (date_formats of its catalog)"""
+    
+    __slots__ = ('date', 'day_month', 'generated_at', 'generated_at_12h', 'task_completed')
+    
+    def __init__(
+        self,
+        date: str,
+        day_month: str,
+        generated_at: str,
+        generated_at_12h: str,
+        task_completed: str
+    ):
+        self.date = date                          # Full date (week bounds)
+        self.day_month = day_month                # Short date (email subject)
+        self.generated_at = generated_at          # Markdown "generated on"
+        self.generated_at_12h = generated_at_12h  # Email "generated on"
+        self.task_completed = task_completed      # Task completion time
+
+
+@lru_cache(maxsize=None)
+def get_locale_formats(language: str) -> LocaleFormats:
+    """Date formats of a language, from its catalog (English for unknown languages)"""
+    if language not in available_languages():
+        language = DEFAULT_LANGUAGE
+    return LocaleFormats(**load_catalog(language).date_formats)
+
+
+class RenderBuffer:
+    """
+    Collects output fragments and joins them once
+    
+    Building long documents with repeated str += copies the text built so
+    far on every step; appending to a list and joining at the end keeps
+    rendering linear in the output size.
+    """
+    
+    __slots__ = ('_parts', 'write')
+    
+    def __init__(self):
+        self._parts: List[str] = []
+        self.write = self._parts.append
+    
+    def writelines(self, lines: List[str], suffix: str = "\n") -> None:
+        """Append each line followed by suffix"""
+        for line in lines:
+            self._parts.append(line)
+            self._parts.append(suffix)
+    
+    def getvalue(self) -> str:
+        """Return the rendered text"""
+        return "".join(self._parts)
+
+
+def format_completed_at(completed: datetime, formats: LocaleFormats) -> str:
+    """Format a task's completion time (Task.completed, UTC) for display"""
+    return completed.strftime(formats.task_completed)
+
+
+H2_STYLE = "color: #667eea; margin-top: 25px; margin-bottom: 15px; font-size: 20px;"
+H3_STYLE = "color: #764ba2; margin-top: 20px; margin-bottom: 10px; font-size: 18px;"
+LIST_STYLE = "margin: 0 0 15px 0; padding-left: 25px;"
+LINK_STYLE = "color: #667eea;"
+CODE_STYLE = "background: #eceef1; padding: 1px 4px; border-radius: 3px; font-family: monospace;"
+PRE_STYLE = "background: #eceef1; padding: 12px; border-radius: 6px; overflow-x: auto;"
+QUOTE_STYLE = "margin: 0 0 15px 0; padding-left: 12px; border-left: 3px solid #764ba2; color: #555;"
+
+HEADING_TAGS = {
+    2: f'<h2 style="{H2_STYLE}">',
+    3: f'<h3 style="{H3_STYLE}">'
+}
+
+# Block-level line patterns, tried once per line
+BLOCK_LINE = re.compile(
+    r'(?P<fence>```)'
+    r'|(?P<heading>#{1,6})[ \t]+(?P<heading_text>.*)$'
+    r'|(?P<rule>(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})$'
+    r'|(?P<bullet>[-*+]|\d{1,9}[.)])[ \t]+(?P<item_text>.*)$'
+    r'|>[ \t]?(?P<quote_text>.*)$'
+)
+
+# Inline tokens, in priority order. Every alternative stops at the next
+# delimiter of its kind, so one finditer pass over a line stays linear
+INLINE_TOKEN = re.compile(
+    r'\\(?P<escaped>[\\`*_\[\]()#+\-.!>])'
+    r'|`(?P<code>[^`]+)`'
+    r'|\[(?P<label>[^\[\]]*)\]\((?P<url>[^()\s]*)\)'
+    r'|(?P<delim>\*+|_+)'
+)
+
+SAFE_URL_SCHEMES = ('http', 'https', 'mailto')
+URL_SCHEME = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+
+EMPHASIS_TAGS = {1: ('<em>', '</em>'), 2: ('<strong>', '</strong>')}
+
+
+def _is_safe_url(url: str) -> bool:
+    """Relative URLs and http(s)/mailto links only (no javascript: etc.)"""
+    scheme = URL_SCHEME.match(url)
+    return scheme is None or scheme.group(1).lower() in SAFE_URL_SCHEMES
+
+
+def _is_punctuation(char: str) -> bool:
+    """Unicode punctuation or symbol, as CommonMark's flanking rules define it"""
+    return unicodedata.category(char)[0] in 'PS'
+
+
+def render_inline(text: str) -> str:
+    """
+    Render inline Markdown (emphasis, code, links, escapes) as escaped HTML
+    
+    Emphasis follows CommonMark's delimiter algorithm: each * or _ run is
+    written literally and pushed on a stack; a closing run matches the
+    nearest opener of the same character (skipping those the "rule of 3"
+    forbids), using two delimiters (<strong>) when both runs have two or
+    more left, else one (<em>), until it is used up. Tags go on the inner
+    side of the runs, what is left of a run stays literal, and openers left
+    between a matched pair stay literal, so the output is always well
+    nested.
+    """
+    out: List[str] = []
+    write = out.append
+    # Openers: [character, delimiters left, index of the run in out,
+    # original run length, can also close, tags opened (outermost first)],
+    # and the positions of the * and _ openers in that stack
+    openers: List[list] = []
+    by_char = {'*': [], '_': []}
+    # Per kind of closer (character, can open, length % 3), the out index
+    # of the first opener that may still match it, so that openers the
+    # rule of 3 skipped are not scanned again by each following closer
+    openers_bottom = {}
+    position = 0
+    
+    for match in INLINE_TOKEN.finditer(text):
+        start, end = match.span()
+        if start > position:
+            write(escape(text[position:start], quote=False))
+        position = end
+        kind = match.lastgroup
+        
+        if kind == 'escaped':
+            write(escape(match.group('escaped'), quote=False))
+        elif kind == 'code':
+            write(f'<code style="{CODE_STYLE}">{escape(match.group("code"), quote=False)}</code>')
+        elif kind == 'url':
+            label = render_inline(match.group('label'))
+            url = match.group('url')
+            if _is_safe_url(url):
+                write(f'<a href="{escape(url)}" style="{LINK_STYLE}">{label}</a>')
+            else:
+                write(label)
+        else:
+            run = match.group('delim')
+            char, length = run[0], len(run)
+            before = text[start - 1] if start else ' '
+            after = text[end] if end < len(text) else ' '
+            # CommonMark flanking rules (line edges count as whitespace)
+            left = not after.isspace() and (
+                not _is_punctuation(after) or before.isspace() or _is_punctuation(before))
+            right = not before.isspace() and (
+                not _is_punctuation(before) or after.isspace() or _is_punctuation(after))
+            if char == '_':
+                # No intraword emphasis with underscores (snake_case)
+                can_open = left and (not right or _is_punctuation(before))
+                can_close = right and (not left or _is_punctuation(after))
+            else:
+                can_open, can_close = left, right
+            
+            closed = []
+            positions = by_char[char]
+            while can_close and length:
+                # Nearest opener allowed by the rule of 3 (a run that can
+                # both open and close only pairs with lengths not summing
+                # to a multiple of 3, unless both are multiples of 3)
+                closer = (char, can_open, len(run) % 3)
+                bottom = openers_bottom.get(closer, 0)
+                slot = len(positions) - 1
+                while slot >= 0 and openers[positions[slot]][2] >= bottom:
+                    opener = openers[positions[slot]]
+                    if not ((opener[4] or can_open) and (opener[3] + len(run)) % 3 == 0
+                            and (opener[3] % 3 or len(run) % 3)):
+                        break
+                    slot -= 1
+                if slot < 0 or openers[positions[slot]][2] < bottom:
+                    openers_bottom[closer] = len(out)
+                    break
+                top = positions[slot]
+                # Openers above this one were never closed: they stay literal
+                del openers[top + 1:]
+                for other in by_char.values():
+                    while other and other[-1] > top:
+                        other.pop()
+                opener = openers[top]
+                used = 2 if opener[1] >= 2 and length >= 2 else 1
+                opener[1] -= used
+                opener[5].insert(0, EMPHASIS_TAGS[used][0])
+                out[opener[2]] = char * opener[1] + "".join(opener[5])
+                if not opener[1]:
+                    openers.pop()
+                    positions.pop()
+                closed.append(EMPHASIS_TAGS[used][1])
+                length -= used
+            if closed:
+                write("".join(closed))
+            if length and can_open:
+                positions.append(len(openers))
+                openers.append([char, length, len(out), len(run), can_close, []])
+                write(char * length)
+            elif length:
+                write(char * length)
+    
+    if position < len(text):
+        write(escape(text[position:], quote=False))
+    return "".join(out)
+
+
+class MarkdownRenderer:
+    """
+    Line-driven state machine converting Markdown to email HTML
+    
+    Each line is classified once (fence, heading, rule, list item, quote,
+    text) and updates the open blocks: paragraph, blockquote, code block and
+    a stack of nested lists keyed by indentation. Output fragments go to a
+    RenderBuffer, so conversion is linear in the input size.
+    """
+    
+    def __init__(self):
+        self.out = RenderBuffer()
+        self.paragraph: List[str] = []
+        self.quote: List[str] = []
+        self.code: Optional[List[str]] = None
+        # (indentation, tag) of the open lists, each with an open <li>
+        self.lists: List[tuple] = []
+        self.blank_in_list = False
+    
+    def _flush_paragraph(self) -> None:
+        if self.paragraph:
+            self.out.write(f"<p>{'<br>'.join(self.paragraph)}</p>\n")
+            self.paragraph = []
+    
+    def _flush_quote(self) -> None:
+        if self.quote:
+            self.out.write(f'<blockquote style="{QUOTE_STYLE}">{"<br>".join(self.quote)}</blockquote>\n')
+            self.quote = []
+    
+    def _close_lists(self, indent: int = -1) -> None:
+        """Close the lists nested deeper than indent"""
+        while self.lists and self.lists[-1][0] > indent:
+            _, tag = self.lists.pop()
+            self.out.write(f"</li></{tag}>\n" if not self.lists else f"</li></{tag}>")
+        self.blank_in_list = False
+    
+    def _close_blocks(self) -> None:
+        self._flush_paragraph()
+        self._flush_quote()
+        self._close_lists()
+    
+    def _list_item(self, indent: int, tag: str, text: str) -> None:
+        self._flush_paragraph()
+        self._flush_quote()
+        self._close_lists(indent)
+        write = self.out.write
+        if self.lists and self.lists[-1][0] == indent and self.lists[-1][1] == tag:
+            write("</li><li>")
+        else:
+            if self.lists and self.lists[-1][0] == indent:
+                # Same level, other list type: end the previous list
+                self._close_lists(indent - 1)
+            attrs = f' style="{LIST_STYLE}"' if not self.lists else ""
+            write(f"<{tag}{attrs}><li>")
+            self.lists.append((indent, tag))
+        write(render_inline(text))
+        self.blank_in_list = False
+    
+    def feed(self, line: str) -> None:
+        """Process one line"""
+        if self.code is not None:
+            if line.strip().startswith('```'):
+                code = escape("\n".join(self.code), quote=False)
+                self.out.write(f'<pre style="{PRE_STYLE}"><code>{code}</code></pre>\n')
+                self.code = None
+            else:
+                self.code.append(line)
+            return
+        
+        stripped = line.strip()
+        
+        # Empty line = end of paragraph (a list may go on after it)
+        if not stripped:
+            self._flush_paragraph()
+            self._flush_quote()
+            if self.lists:
+                self.blank_in_list = True
+            return
+        
+        indent = len(line) - len(line.lstrip())
+        match = BLOCK_LINE.match(stripped)
+        kind = match.lastgroup if match else None
+        
+        if kind == 'item_text':
+            bullet = match.group('bullet')
+            self._list_item(indent, 'ul' if bullet in '-*+' else 'ol', match.group('item_text'))
+            return
+        
+        if self.lists and kind is None and (indent > self.lists[-1][0] or not self.blank_in_list):
+            # Continuation of the current item
+            self.out.write(f"<br>{render_inline(stripped)}")
+            return
+        
+        if kind == 'fence':
+            self._close_blocks()
+            self.code = []
+        elif kind == 'heading_text':
+            self._close_blocks()
+            level = len(match.group('heading'))
+            text = match.group('heading_text').rstrip()
+            # Optional closing sequence: "## Title ##"
+            without_closing = text.rstrip('#')
+            if not without_closing or without_closing[-1] in ' \t':
+                text = without_closing.rstrip()
+            open_tag = HEADING_TAGS.get(level, f"<h{level}>")
+            self.out.write(f"{open_tag}{render_inline(text)}</h{level}>\n")
+        elif kind == 'rule':
+            self._close_blocks()
+            self.out.write("<hr>\n")
+        elif kind == 'quote_text':
+            self._flush_paragraph()
+            self._close_lists()
+            self.quote.append(render_inline(match.group('quote_text')))
+        else:
+            # Regular text line
+            self._flush_quote()
+            self._close_lists()
+            self.paragraph.append(render_inline(stripped))
+    
+    def close(self) -> str:
+        """Close the open blocks and return the HTML"""
+        if self.code is not None:
+            # Unterminated fence: render what was collected
+            self.feed('```')
+        self._close_blocks()
+        return self.out.getvalue()
+
+
+def markdown_to_html(markdown_text: str) -> str:
+    """
+    Convert Markdown to HTML for the email body
+    Handles: headings, paragraphs and line breaks, bullet and numbered
+    lists (nested by indentation), **bold**, *italic*, `code`, code blocks,
+    [links](url), > quotes and rules. Text is HTML-escaped.
+    """
+    renderer = MarkdownRenderer()
+    for line in markdown_text.split('\n'):
+        renderer.feed(line)
+    return renderer.close()
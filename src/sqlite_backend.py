@@ -0,0 +1,312 @@
+"""
+SQLite storage backend for summaries
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from datetime import date, datetime
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from src.task_model import Task, OrganizedTasks, organized_from_dicts
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    generated_at TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    week_end TEXT NOT NULL,
+    total_tasks INTEGER NOT NULL,
+    source_file TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_runs_week ON runs (week_start, generated_at);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    week_start TEXT NOT NULL,
+    week_end TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_week ON summaries (week_start);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    week_start TEXT NOT NULL,
+    category TEXT NOT NULL,
+    subproject TEXT,
+    task_id TEXT,
+    content TEXT,
+    completed_at TEXT,
+    project_id TEXT,
+    section_id TEXT,
+    project_name TEXT,
+    section_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks (run_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_week_category ON tasks (week_start, category);
+
+CREATE TABLE IF NOT EXISTS subproject_counts (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    week_start TEXT NOT NULL,
+    category TEXT NOT NULL,
+    subproject TEXT,
+    task_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_counts_week_category ON subproject_counts (week_start, category);
+"""
+
+
+class SQLiteBackend:
+    """Stores runs, summaries, tasks and per-subproject counts in SQLite"""
+    
+    def __init__(self, db_path: Path = None):
+        self.db_path = Path(db_path) if db_path else Path(os.getenv('DATA_DIR', 'data')) / "summaries.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the worker threads of the async pipeline and the parallel
+        # backfill: every use of the connection holds _lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        logger.info(f"SQLite database: {self.db_path.absolute()}")
+    
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self.conn.close()
+    
+    def _insert_run(
+        self,
+        data: Dict[str, Any],
+        source_file: Optional[str] = None
+    ) -> int:
+        """Insert one run (summary + tasks + counts) without committing (caller holds _lock)"""
+        week_start = data['week_start']
+        organized_tasks = data.get('tasks', {})
+        total = sum(len(tasks) for sp in organized_tasks.values() for tasks in sp.values())
+        
+        cursor = self.conn.execute(
+            "INSERT INTO runs (generated_at, week_start, week_end, total_tasks, source_file) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (data['generated_at'], week_start, data['week_end'], total, source_file)
+        )
+        run_id = cursor.lastrowid
+        
+        self.conn.execute(
+            "INSERT INTO summaries (run_id, week_start, week_end, summary) VALUES (?, ?, ?, ?)",
+            (run_id, week_start, data['week_end'], data['summary'])
+        )
+        
+        self.conn.executemany(
+            "INSERT INTO tasks (run_id, week_start, category, subproject, task_id, content, "
+            "completed_at, project_id, section_id, project_name, section_name) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (run_id, week_start, category, _subproject_key(subproject),
+                 task.id, task.content, task.completed_at,
+                 task.project_id, task.section_id,
+                 task.project_name, task.section_name)
+                for category, subprojects in organized_tasks.items()
+                for subproject, tasks in subprojects.items()
+                for task in tasks
+            )
+        )
+        
+        self.conn.executemany(
+            "INSERT INTO subproject_counts (run_id, week_start, category, subproject, task_count) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (run_id, week_start, category, _subproject_key(subproject), len(tasks))
+                for category, subprojects in organized_tasks.items()
+                for subproject, tasks in subprojects.items()
+            )
+        )
+        return run_id
+    
+    def save_run(
+        self,
+        summary: str,
+        organized_tasks: OrganizedTasks,
+        week_start: datetime.date,
+        week_end: datetime.date,
+        keep_versions: bool = True
+    ) -> int:
+        """
+        Save a run in one transaction
+        
+        Every run is kept as a version of its week; history loads only use
+        the latest one per week. Without keep_versions, previous runs of the
+        week are deleted in the same transaction (upsert).
+        
+        Returns:
+            The new run ID
+        """
+        with self._lock, self.conn:
+            if not keep_versions:
+                self.conn.execute(
+                    "DELETE FROM runs WHERE week_start = ?", (week_start.isoformat(),)
+                )
+            return self._insert_run({
+                'generated_at': datetime.now().isoformat(),
+                'week_start': week_start.isoformat(),
+                'week_end': week_end.isoformat(),
+                'summary': summary,
+                'tasks': organized_tasks
+            })
+    
+    def load_previous_summaries(
+        self,
+        weeks: int = 4,
+        before: datetime.date = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Load the latest summary of each of the last N weeks, oldest first
+        
+        Args:
+            weeks: Number of distinct weeks to load
+            before: Only load weeks starting before this date
+        """
+        cutoff = before.isoformat() if before is not None else "9999-12-31"
+        # SQLite returns the bare columns of the MAX(generated_at) row
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT s.week_start, s.week_end, s.summary, MAX(r.generated_at) FROM summaries s "
+                "JOIN runs r ON r.id = s.run_id "
+                "WHERE s.week_start < ? "
+                "GROUP BY s.week_start ORDER BY s.week_start DESC LIMIT ?",
+                (cutoff, weeks)
+            ).fetchall()
+        return [
+            {'week_start': row[0], 'week_end': row[1], 'summary': row[2]}
+            for row in reversed(rows)
+        ]
+    
+    def load_run(self, week_start: datetime.date) -> Optional[Tuple[Dict[str, Any], OrganizedTasks]]:
+        """
+        Load the latest run of a week with its organized tasks
+        
+        Returns:
+            Tuple (run row as dict incl. summary, organized_tasks), or None
+        """
+        with self._lock:
+            run = self.conn.execute(
+                "SELECT r.*, s.summary FROM runs r JOIN summaries s ON s.run_id = r.id "
+                "WHERE r.week_start = ? ORDER BY r.generated_at DESC LIMIT 1",
+                (week_start.isoformat(),)
+            ).fetchone()
+            if run is None:
+                return None
+            rows = self.conn.execute(
+                "SELECT * FROM tasks WHERE run_id = ? ORDER BY rowid", (run['id'],)
+            ).fetchall()
+        
+        organized_tasks: OrganizedTasks = {}
+        for row in rows:
+            subproject = row['subproject'] or None
+            organized_tasks.setdefault(row['category'], {}).setdefault(subproject, []).append(Task(
+                row['task_id'],
+                row['content'],
+                row['completed_at'],
+                row['project_id'],
+                row['section_id'],
+                row['project_name'],
+                row['section_name']
+            ))
+        return dict(run), organized_tasks
+    
+    def import_json_archive(self, json_files: Iterable[Path], keep_versions: bool = True) -> int:
+        """
+        Bulk-import summary JSON files in a single transaction
+        
+        Each file is validated before anything is written and imported
+        under its own savepoint, so a file that fails leaves the database
+        as it was (previous runs of its week included).
+        
+        A file is imported unless a run of the same week with the same
+        generated_at is already in the database, so a week regenerated
+        since the last import (same file name, new content) is imported
+        again. Like save_run, its previous runs are kept as versions, or
+        deleted without keep_versions.
+        
+        Returns:
+            Number of runs imported
+        """
+        imported = 0
+        with self._lock, self.conn:
+            known = {
+                (row[0], row[1]) for row in self.conn.execute(
+                    "SELECT week_start, generated_at FROM runs"
+                )
+            }
+            for file_path in json_files:
+                try:
+                    data = _read_archive_file(file_path)
+                except Exception as e:
+                    logger.warning(f"  Unable to import {file_path.name}: {str(e)}")
+                    continue
+                if (data['week_start'], data['generated_at']) in known:
+                    continue
+                
+                # One savepoint per file: a failed file leaves no trace
+                self.conn.execute("SAVEPOINT import_file")
+                try:
+                    if keep_versions:
+                        # source_file is unique: it moves to the new run
+                        self.conn.execute(
+                            "UPDATE runs SET source_file = NULL WHERE source_file = ?", (file_path.name,)
+                        )
+                    else:
+                        self.conn.execute(
+                            "DELETE FROM runs WHERE week_start = ?", (data['week_start'],)
+                        )
+                    self._insert_run(data, source_file=file_path.name)
+                except Exception as e:
+                    self.conn.execute("ROLLBACK TO import_file")
+                    logger.warning(f"  Unable to import {file_path.name}: {str(e)}")
+                    continue
+                finally:
+                    self.conn.execute("RELEASE import_file")
+                known.add((data['week_start'], data['generated_at']))
+                imported += 1
+        logger.info(f"  {imported} summaries imported into {self.db_path.name}")
+        return imported
+
+
+def _read_archive_file(file_path: Path) -> Dict[str, Any]:
+    """
+    Read and validate one summary JSON file before anything is written
+    
+    Raises:
+        ValueError: A field is missing or malformed
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("not a summary object")
+    for field in ('week_start', 'week_end'):
+        date.fromisoformat(str(data.get(field)))
+    datetime.fromisoformat(str(data.get('generated_at')))
+    if not isinstance(data.get('summary'), str):
+        raise ValueError("missing summary")
+    tasks = data.get('tasks', {})
+    if not isinstance(tasks, dict) or not all(
+        isinstance(subprojects, dict) and all(isinstance(t, list) for t in subprojects.values())
+        for subprojects in tasks.values()
+    ):
+        raise ValueError("malformed tasks")
+    data['tasks'] = organized_from_dicts(tasks)
+    return data
+
+
+def _subproject_key(subproject: Optional[str]) -> str:
+    """None subprojects are stored as '' (JSON archives store them as 'null')"""
+    if subproject is None or subproject == 'null':
+        return ''
+    return subproject
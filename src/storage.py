@@ -4,32 +4,143 @@ Local storage manager for summaries
 
 import os
 import json
+import shutil
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from src.i18n import get_i18n
+from src.rendering import RenderBuffer, format_completed_at, get_locale_formats
+from src.task_model import OrganizedTasks, organized_to_dicts
 
 logger = logging.getLogger(__name__)
 
+
+class SummaryIndex:
+    """
+    Compact sidecar index of saved summaries (index.jsonl)
+    
+    One JSON line per summary file with its week range and summary text,
+    kept sorted by file name (i.e. by week), so recent history is read
+    from the end of the index without opening the full archives.
+    """
+    
+    FILE_NAME = "index.jsonl"
+    READ_BLOCK = 64 * 1024
+    
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.path = data_dir / self.FILE_NAME
+    
+    def exists(self) -> bool:
+        """True if the index file is present"""
+        return self.path.exists()
+    
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Add or replace the entry of a file, appending when it sorts last
+        (the usual case)
+        
+        Args:
+            entry: Dict with file, week_start, week_end, generated_at, summary
+        """
+        last = next(self.iter_backwards(), None)
+        if last is None or entry['file'] > last['file']:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            return
+        
+        # Rerun of a week or older week saved late (backfill): rewrite in order
+        entries = [e for e in self.iter_backwards() if e['file'] != entry['file']]
+        entries.append(entry)
+        entries.sort(key=lambda e: e['file'])
+        self._write(entries)
+    
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        """Rewrite the whole index atomically"""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+    
+    def iter_backwards(self) -> Iterator[Dict[str, Any]]:
+        """Yield index entries from the newest week to the oldest"""
+        if not self.path.exists():
+            return
+        
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b""
+            while position > 0:
+                size = min(self.READ_BLOCK, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b"\n")
+                # First line may be incomplete until the previous block is read
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield json.loads(line)
+            if remainder.strip():
+                yield json.loads(remainder)
+    
+    def rebuild(self) -> None:
+        """Rebuild the index from the summary files (one-time full scan)"""
+        entries = []
+        for file_path in sorted(self.data_dir.glob("summary_*.json")):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                entries.append({
+                    'file': file_path.name,
+                    'week_start': data['week_start'],
+                    'week_end': data['week_end'],
+                    'generated_at': data.get('generated_at'),
+                    'summary': data['summary']
+                })
+            except Exception as e:
+                logger.warning(f"  Unable to index {file_path.name}: {str(e)}")
+        
+        self._write(entries)
+        logger.info(f"  Summary index rebuilt: {len(entries)} entries")
+
+
 class StorageManager:
     """Manages saving and loading of summaries"""
     
-    def __init__(self):
-        self.data_dir = Path("data/summaries")
+    def __init__(self, data_dir: Path = None):
+        self.data_dir = Path(data_dir) if data_dir else Path(os.getenv('DATA_DIR', 'data')) / "summaries"
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.i18n = get_i18n()
+        self.index = SummaryIndex(self.data_dir)
+        
+        # Previous versions of a week are moved here when it is regenerated
+        self.versions_dir = self.data_dir / "versions"
+        self.keep_versions = os.getenv('KEEP_SUMMARY_VERSIONS', 'True').lower() == 'true'
         logger.info(f"Storage directory: {self.data_dir.absolute()}")
+        
+        # Optional SQLite backend (STORAGE_BACKEND=sqlite): replaces the JSON
+        # archive, Markdown files are still written as a readable view
+        self.backend = None
+        if os.getenv('STORAGE_BACKEND', 'files').lower() == 'sqlite':
+            from src.sqlite_backend import SQLiteBackend  # sqlite3 only when used
+            self.backend = SQLiteBackend()
     
     def save_summary(
         self,
         summary: str,
-        organized_tasks: Dict[str, Dict[str, List[Dict[str, Any]]]],
+        organized_tasks: OrganizedTasks,
         week_start: datetime.date,
         week_end: datetime.date
     ) -> None:
         """
-        Save the summary in JSON and Markdown format
+        Save the summary in JSON (or SQLite) and Markdown format
+        
+        Files are keyed by week: a rerun replaces the week's files
+        atomically, after moving the previous ones to versions/ when
+        KEEP_SUMMARY_VERSIONS is enabled.
         
         Args:
             summary: The generated summary
@@ -37,7 +148,6 @@ class StorageManager:
             week_start: Week start date
             week_end: Week end date
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         week_str = f"{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}"
         
         # Calculate statistics
@@ -49,18 +159,12 @@ class StorageManager:
             'week_start': week_start.isoformat(),
             'week_end': week_end.isoformat(),
             'summary': summary,
-            'tasks': organized_tasks,
+            'tasks': organized_to_dicts(organized_tasks),
             'stats': stats
         }
         
-        # Save JSON
-        json_file = self.data_dir / f"summary_{week_str}_{timestamp}.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"  Saved: {json_file.name}")
-        
         # Save Markdown (more readable)
-        md_file = self.data_dir / f"summary_{week_str}_{timestamp}.md"
+        md_file = self.data_dir / f"summary_{week_str}.md"
         markdown_content = self._generate_markdown(
             summary=summary,
             organized_tasks=organized_tasks,
@@ -69,13 +173,111 @@ class StorageManager:
             stats=stats
         )
         
-        with open(md_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        if self.backend is not None:
+            run_id = self.backend.save_run(
+                summary, organized_tasks, week_start, week_end,
+                keep_versions=self.keep_versions
+            )
+            logger.info(f"  Saved: run {run_id} in {self.backend.db_path.name}")
+        else:
+            self._save_json(data, f"summary_{week_str}.json")
+        
+        self._archive_version(md_file)
+        self._write_atomic(md_file, markdown_content)
         logger.info(f"  Saved: {md_file.name}")
+        
+        # The streamed draft is superseded by the final files
+        self.partial_path(week_start, week_end).unlink(missing_ok=True)
+    
+    def partial_path(self, week_start: datetime.date, week_end: datetime.date) -> Path:
+        """File receiving a summary while it is streamed (removed once saved)"""
+        return self.data_dir / f"summary_{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}.partial.md"
+    
+    @staticmethod
+    def _write_atomic(path: Path, content: str) -> None:
+        """Write a file through a temporary file and an atomic rename"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    
+    def _archive_version(self, path: Path) -> None:
+        """Keep a copy of an existing file in versions/ before it is replaced"""
+        if not self.keep_versions or not path.exists():
+            return
+        self.versions_dir.mkdir(exist_ok=True)
+        saved_at = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y%m%d_%H%M%S")
+        shutil.copy2(path, self.versions_dir / f"{path.stem}_{saved_at}{path.suffix}")
+    
+    def _save_json(self, data: Dict[str, Any], file_name: str) -> None:
+        """Save (upsert) the JSON archive of a week and index it"""
+        json_file = self.data_dir / file_name
+        self._archive_version(json_file)
+        self._write_atomic(json_file, json.dumps(data, ensure_ascii=False, indent=2))
+        logger.info(f"  Saved: {json_file.name}")
+        
+        # Index it (history loads read the index, not the archive)
+        if not self.index.exists():
+            self.index.rebuild()
+        else:
+            self.index.add({
+                'file': json_file.name,
+                'week_start': data['week_start'],
+                'week_end': data['week_end'],
+                'generated_at': data['generated_at'],
+                'summary': data['summary']
+            })
+    
+    def export_markdown(self, week_start: datetime.date) -> Path:
+        """
+        Regenerate the Markdown view of a week from the SQLite backend
+        
+        Args:
+            week_start: Week start date
+        
+        Returns:
+            Path of the written Markdown file
+        """
+        if self.backend is None:
+            raise ValueError("Markdown export requires STORAGE_BACKEND=sqlite")
+        
+        loaded = self.backend.load_run(week_start)
+        if loaded is None:
+            raise ValueError(f"No summary stored for week of {week_start}")
+        run, organized_tasks = loaded
+        
+        week_end = datetime.fromisoformat(run['week_end']).date()
+        md_file = self.data_dir / f"summary_{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}.md"
+        with open(md_file, 'w', encoding='utf-8') as f:
+            f.write(self._generate_markdown(
+                summary=run['summary'],
+                organized_tasks=organized_tasks,
+                week_start=week_start,
+                week_end=week_end,
+                stats=self._calculate_stats(organized_tasks)
+            ))
+        logger.info(f"  Exported: {md_file.name}")
+        return md_file
+    
+    def migrate_to_sqlite(self) -> int:
+        """
+        Import the existing JSON archive into the SQLite database
+        
+        Safe to run several times: summaries already imported are skipped,
+        weeks regenerated since are imported again.
+        
+        Returns:
+            Number of summaries imported
+        """
+        from src.sqlite_backend import SQLiteBackend
+        backend = self.backend or SQLiteBackend()
+        json_files = sorted(self.data_dir.glob("summary_*.json"))
+        logger.info(f"Importing {len(json_files)} JSON summaries into {backend.db_path.name}...")
+        return backend.import_json_archive(json_files, keep_versions=self.keep_versions)
     
     def _calculate_stats(
         self,
-        organized_tasks: Dict[str, Dict[str, List[Dict[str, Any]]]]
+        organized_tasks: OrganizedTasks
     ) -> Dict[str, Any]:
         """Calculate task statistics"""
         stats = {
@@ -103,105 +305,121 @@ class StorageManager:
     def _generate_markdown(
         self,
         summary: str,
-        organized_tasks: Dict[str, Dict[str, List[Dict[str, Any]]]],
+        organized_tasks: OrganizedTasks,
         week_start: datetime.date,
         week_end: datetime.date,
         stats: Dict[str, Any]
     ) -> str:
         """Generate Markdown content of the summary"""
         
-        # Format dates based on language
-        if self.i18n.language == 'fr':
-            start_str = week_start.strftime('%d/%m/%Y')
-            end_str = week_end.strftime('%d/%m/%Y')
-            date_str = datetime.now().strftime('%d/%m/%Y à %H:%M')
-        else:
-            start_str = week_start.strftime('%m/%d/%Y')
-            end_str = week_end.strftime('%m/%d/%Y')
-            date_str = datetime.now().strftime('%m/%d/%Y at %H:%M')
+        t = self.i18n.t
+        formats = get_locale_formats(self.i18n.language)
+        start_str = week_start.strftime(formats.date)
+        end_str = week_end.strftime(formats.date)
+        date_str = datetime.now().strftime(formats.generated_at)
         
-        md = f"""# {self.i18n.t('md_weekly_summary', start=start_str, end=end_str)}
+        out = RenderBuffer()
+        write = out.write
+        write(f"""# {t('md_weekly_summary', start=start_str, end=end_str)}
 
-*{self.i18n.t('md_generated_on', date=date_str)}*
+*{t('md_generated_on', date=date_str)}*
 
 ---
 
-## {self.i18n.t('md_summary_title')}
+## {t('md_summary_title')}
 
 {summary}
 
 ---
 
-## {self.i18n.t('md_stats_title')}
+## {t('md_stats_title')}
+
+{t('md_total_tasks', count=stats['total_tasks'])}
+""")
 
-{self.i18n.t('md_total_tasks', count=stats['total_tasks'])}
-"""
-        
         # Statistics by category
         for category, count in stats['by_category'].items():
-            md += f"- **{category}**: {count} tasks\n"
+            write(f"- **{category}**: {count} tasks\n")
             
             # Subprojects if available
-            if category in stats['by_subproject'] and stats['by_subproject'][category]:
-                for subproject, subcount in stats['by_subproject'][category].items():
-                    md += f"  - {subproject}: {subcount} tasks\n"
+            for subproject, subcount in stats['by_subproject'].get(category, {}).items():
+                write(f"  - {subproject}: {subcount} tasks\n")
         
-        md += f"\n---\n\n## {self.i18n.t('md_tasks_detail')}\n\n"
+        write(f"\n---\n\n## {t('md_tasks_detail')}\n\n")
         
         # Task list by category and subproject
         for category, subprojects in organized_tasks.items():
-            md += f"### {category}\n\n"
+            write(f"### {category}\n\n")
             
             for subproject_name, tasks in subprojects.items():
                 if subproject_name:
-                    md += f"#### {subproject_name}\n\n"
+                    write(f"#### {subproject_name}\n\n")
                 
                 for task in tasks:
-                    section = f" *({task['section_name']})*" if task.get('section_name') else ""
-                    completed = datetime.fromisoformat(task['completed_at'].replace('Z', '+00:00'))
-                    
-                    if self.i18n.language == 'fr':
-                        date_str = completed.strftime('%d/%m à %H:%M')
-                    else:
-                        date_str = completed.strftime('%m/%d at %I:%M %p')
-                    
-                    md += f"- {task['content']}{section} - ✓ {date_str}\n"
+                    section = f" *({task.section_name})*" if task.section_name else ""
+                    completed_str = format_completed_at(task.completed, formats)
+                    write(f"- {task.content}{section} - ✓ {completed_str}\n")
                 
-                md += "\n"
+                write("\n")
         
-        return md
+        return out.getvalue()
     
-    def load_previous_summaries(self, weeks: int = 4) -> List[Dict[str, Any]]:
+    def load_previous_summaries(
+        self,
+        weeks: int = 4,
+        before: datetime.date = None
+    ) -> List[Dict[str, Any]]:
         """
         Load the last N summaries to provide context
         
         Args:
             weeks: Number of weeks to load
+            before: Only load weeks starting before this date, so a rerun
+                does not feed the week being summarized back as context
         
         Returns:
             List of summaries sorted from oldest to newest
         """
-        json_files = sorted(self.data_dir.glob("summary_*.json"))
+        if self.backend is not None:
+            summaries = self.backend.load_previous_summaries(weeks, before)
+            logger.info(f"  {len(summaries)} previous summaries loaded")
+            return summaries
         
-        if not json_files:
-            logger.info("  No previous summaries found")
-            return []
+        if not self.index.exists():
+            self.index.rebuild()
         
-        # Load last N files
-        recent_files = json_files[-weeks:] if len(json_files) > weeks else json_files
+        cutoff = f"summary_{before.strftime('%Y%m%d')}" if before is not None else None
         
+        # Walk the index from the newest week, stop after N distinct weeks
         summaries = []
-        for file_path in recent_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    summaries.append({
-                        'week_start': data['week_start'],
-                        'week_end': data['week_end'],
-                        'summary': data['summary']
-                    })
-            except Exception as e:
-                logger.warning(f"  Unable to load {file_path.name}: {str(e)}")
+        for entry in self.index.iter_backwards():
+            # File names start with the week start: summary_YYYYMMDD-...
+            if cutoff is not None and entry['file'] >= cutoff:
+                continue
+            
+            summary = {
+                'week_start': entry['week_start'],
+                'week_end': entry['week_end'],
+                'summary': entry['summary'],
+                'generated_at': entry.get('generated_at') or ''
+            }
+            if summaries and summaries[-1]['week_start'] == summary['week_start']:
+                # Several files for one week (legacy timestamped names): newest wins
+                if summary['generated_at'] > summaries[-1]['generated_at']:
+                    summaries[-1] = summary
+                continue
+            
+            if len(summaries) >= weeks:
+                break
+            summaries.append(summary)
+        
+        for summary in summaries:
+            del summary['generated_at']
+        
+        if not summaries:
+            logger.info("  No previous summaries found")
+            return []
         
+        summaries.reverse()
         logger.info(f"  {len(summaries)} previous summaries loaded")
-        return summaries
\ No newline at end of file
+        return summaries
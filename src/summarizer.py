@@ -3,166 +3,305 @@ AI summary generator with OpenAI
 """
 
 import os
+import sys
+import time
+import asyncio
 import logging
-from typing import List, Dict, Any
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, TextIO
 from datetime import datetime
-import openai
-from openai import OpenAI
 from src.i18n import get_i18n
+from src.token_budget import PromptBudget
+from src.llm_cache import ResponseCache
+from src.rendering import RenderBuffer, get_locale_formats
+from src.metrics import get_metrics
+from src.task_model import OrganizedTasks
 
 logger = logging.getLogger(__name__)
 
 
+class StreamCollector:
+    """
+    Accumulates a streamed completion
+    
+    Each content delta is echoed to the console and appended to the partial
+    file as it arrives, so an interactive run shows the summary while it is
+    written and a crash leaves what was received on disk. Records the
+    time to first token and keeps the usage sent in the last chunk.
+    """
+    
+    def __init__(self, model: str, partial_path: Optional[Path] = None, console: Optional[TextIO] = None):
+        self.model = model
+        self.console = console
+        self.partial_path = partial_path
+        self.partial_file = None
+        if partial_path is not None:
+            partial_path.parent.mkdir(parents=True, exist_ok=True)
+            self.partial_file = open(partial_path, 'w', encoding='utf-8')
+        self.parts: List[str] = []
+        self.usage = None
+        self.started = time.perf_counter()
+        self.first_token_s: Optional[float] = None
+    
+    def feed(self, chunk) -> None:
+        """Process one chat.completion.chunk"""
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return
+        content = chunk.choices[0].delta.content
+        if not content:
+            return
+        if self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - self.started
+            logger.info(f"  First token after {self.first_token_s:.2f}s")
+            get_metrics().record_span('openai_first_token', self.first_token_s, model=self.model)
+        self.parts.append(content)
+        if self.console is not None:
+            self.console.write(content)
+            self.console.flush()
+        if self.partial_file is not None:
+            self.partial_file.write(content)
+            self.partial_file.flush()
+    
+    def close(self) -> str:
+        """Finish the output and return the full completion"""
+        if self.console is not None and self.parts:
+            self.console.write("\n")
+            self.console.flush()
+        if self.partial_file is not None:
+            self.partial_file.close()
+        return "".join(self.parts).strip()
+
+
 class WeeklySummarizer:
     """Generates weekly summaries with OpenAI"""
     
-    def __init__(self):
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+    # Max parallel OpenAI calls in map-reduce mode
+    MAP_CONCURRENCY = 4
+    
+    def __init__(self, use_async: bool = False):
+        self.api_key = os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
             raise ValueError("OPENAI_API_KEY missing in .env")
         
-        self.client = OpenAI(api_key=api_key)
+        # Async pipeline uses AsyncOpenAI through generate_summary_async
+        self.use_async = use_async
+        self._client = None
         self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
         self.i18n = get_i18n()
+        self.budget = PromptBudget(self.model)
+        
+        # Above this many tasks, categories are summarized separately
+        self.map_reduce_threshold = int(os.getenv('MAP_REDUCE_THRESHOLD', '300'))
+        
+        # Response cache (LLM_CACHE=False bypasses it)
+        use_cache = os.getenv('LLM_CACHE', 'True').lower() == 'true'
+        self.cache = ResponseCache() if use_cache else None
+        
+        # Stream single-request summaries to the console (OPENAI_STREAM=True)
+        self.stream = os.getenv('OPENAI_STREAM', 'False').lower() == 'true'
+        
+        # Optional OpenAIQuota shared by concurrent callers (backfills)
+        self.quota = None
         
         logger.info(f"Initializing OpenAI with model {self.model}")
     
+    @property
+    def client(self):
+        """
+        OpenAI client, created on first API call
+        
+        The openai package is slow to import; runs fully served from the
+        response cache never load it.
+        """
+        if self._client is None:
+            from openai import OpenAI, AsyncOpenAI
+            client_class = AsyncOpenAI if self.use_async else OpenAI
+            self._client = client_class(api_key=self.api_key)
+        return self._client
+    
     def _build_prompt(
         self,
-        organized_tasks: Dict[str, Dict[str, List[Dict[str, Any]]]],
+        organized_tasks: OrganizedTasks,
         week_start: datetime.date,
         week_end: datetime.date,
         previous_summaries: List[Dict[str, Any]]
     ) -> str:
         """Build the prompt for OpenAI"""
         
-        # Format dates based on language
-        if self.i18n.language == 'fr':
-            start_str = week_start.strftime('%d/%m/%Y')
-            end_str = week_end.strftime('%d/%m/%Y')
-        else:
-            start_str = week_start.strftime('%m/%d/%Y')
-            end_str = week_end.strftime('%m/%d/%Y')
+        t = self.i18n.t
         
         # Header
-        prompt = f"{self.i18n.t('prompt_system')}\n\n"
-        prompt += f"{self.i18n.t('prompt_period', start=start_str, end=end_str)}\n\n"
+        head = self._prompt_head(week_start, week_end)
         
-        # Context from previous weeks (if available)
-        if previous_summaries:
-            prompt += f"{self.i18n.t('prompt_context')}\n"
-            for summary in previous_summaries[-4:]:  # Max 4 weeks
-                week_info = f"{summary['week_start']} to {summary['week_end']}"
-                prompt += f"\n--- Week of {week_info} ---\n"
-                prompt += summary['summary'] + "\n"
-            prompt += "\n"
+        # Generation instructions
+        tail = self._format_instructions(organized_tasks, t('prompt_instruction_text'))
         
-        # Completed tasks this week
-        prompt += f"{self.i18n.t('prompt_tasks')}\n\n"
+        # Completed tasks this week, condensed if they exceed the budget
+        fixed_tokens = self.budget.count(head) + self.budget.count(tail)
+        task_lines = {
+            category: {
+                subproject_name: [
+                    f"- {task.content} (section: {task.section_name})"
+                    if task.section_name else f"- {task.content}"
+                    for task in tasks
+                ]
+                for subproject_name, tasks in subprojects.items()
+            }
+            for category, subprojects in organized_tasks.items()
+        }
+        task_lines, _ = self.budget.fit_task_lines(
+            task_lines, self.budget.input_budget - fixed_tokens
+        )
+        
+        out = RenderBuffer()
+        write = out.write
+        write(f"{t('prompt_tasks')}\n\n")
         
         # For each category (Work, Perso, Tinker...)
-        for category, subprojects in organized_tasks.items():
-            prompt += f"=== {category.upper()} ===\n"
+        for category, subprojects in task_lines.items():
+            write(f"=== {category.upper()} ===\n")
             
             # For each subproject
-            for subproject_name, tasks in subprojects.items():
+            for subproject_name, lines in subprojects.items():
                 if subproject_name:
-                    prompt += f"\n{self.i18n.t('prompt_subproject', name=subproject_name)}\n"
+                    write(f"\n{t('prompt_subproject', name=subproject_name)}\n")
                 
-                for task in tasks:
-                    section = f" (section: {task['section_name']})" if task.get('section_name') else ""
-                    prompt += f"- {task['content']}{section}\n"
+                out.writelines(lines)
                 
                 if not subproject_name:
                     # If no subproject, add blank line
-                    prompt += "\n"
+                    write("\n")
             
-            prompt += "\n"
+            write("\n")
+        tasks_block = out.getvalue()
         
-        # Generation instructions
-        prompt += f"\n{self.i18n.t('prompt_instructions')}:\n"
-        prompt += f"{self.i18n.t('prompt_instruction_text')}\n\n"
-        prompt += f"{self.i18n.t('prompt_format')}\n"
+        # Context from previous weeks (if available), in what is left
+        tasks_tokens = self.budget.count(tasks_block)
+        history = self.budget.fit_history(
+            previous_summaries[-4:],  # Max 4 weeks
+            self.budget.input_budget - fixed_tokens - tasks_tokens
+        )
+        
+        out = RenderBuffer()
+        if history:
+            out.write(f"{t('prompt_context')}\n")
+            for summary in history:
+                out.write(f"\n--- Week of {summary['week_start']} to {summary['week_end']} ---\n")
+                out.write(summary['summary'] + "\n")
+            out.write("\n")
+        context = out.getvalue()
+        
+        logger.info(f"  Prompt tokens - Fixed: {fixed_tokens}, Tasks: {tasks_tokens}, "
+                    f"History: {self.budget.count(context)} "
+                    f"(budget: {self.budget.input_budget})")
+        
+        return "".join((head, context, tasks_block, tail))
+    
+    def _prompt_head(self, week_start: datetime.date, week_end: datetime.date) -> str:
+        """System line and period of a week's prompt"""
+        t = self.i18n.t
+        formats = get_locale_formats(self.i18n.language)
+        start_str = week_start.strftime(formats.date)
+        end_str = week_end.strftime(formats.date)
+        return f"{t('prompt_system')}\n\n{t('prompt_period', start=start_str, end=end_str)}\n\n"
+    
+    def _format_instructions(self, organized_tasks: OrganizedTasks, instruction_text: str) -> str:
+        """Instructions and expected ## category / ### subproject structure"""
+        t = self.i18n.t
+        out = RenderBuffer()
+        write = out.write
+        write(f"\n{t('prompt_instructions')}:\n")
+        write(f"{instruction_text}\n\n")
+        write(f"{t('prompt_format')}\n")
         
         # Dynamically build expected structure
-        for category in organized_tasks.keys():
-            prompt += f"\n## {category}\n"
-            
-            subprojects = organized_tasks[category]
-            has_subprojects = any(sp is not None for sp in subprojects.keys())
+        for category, subprojects in organized_tasks.items():
+            write(f"\n## {category}\n")
             
-            if has_subprojects:
-                prompt += "\nFor each subproject with tasks:\n"
+            if any(sp is not None for sp in subprojects.keys()):
+                write("\nFor each subproject with tasks:\n")
                 for subproject_name in subprojects.keys():
                     if subproject_name:
-                        prompt += f"### {subproject_name}\n"
-                        prompt += "[Paragraph describing tasks for this subproject]\n\n"
+                        write(f"### {subproject_name}\n")
+                        write("[Paragraph describing tasks for this subproject]\n\n")
             else:
-                prompt += "[Paragraph describing tasks]\n\n"
-        
-        prompt += f"\n{self.i18n.t('prompt_style')}\n"
-        prompt += f"{self.i18n.t('prompt_style_rules')}\n\n"
-        
-        prompt += f"{self.i18n.t('prompt_important')}\n"
-        prompt += f"{self.i18n.t('prompt_important_rules')}\n\n"
-        
-        prompt += f"{self.i18n.t('prompt_request')}\n"
+                write("[Paragraph describing tasks]\n\n")
         
-        return prompt
+        write(f"\n{t('prompt_style')}\n")
+        write(f"{t('prompt_style_rules')}\n\n")
+        write(f"{t('prompt_important')}\n")
+        write(f"{t('prompt_important_rules')}\n\n")
+        write(f"{t('prompt_request')}\n")
+        return out.getvalue()
     
-    def generate_summary(
+    def _build_request(
         self,
-        organized_tasks: Dict[str, Dict[str, List[Dict[str, Any]]]],
+        organized_tasks: OrganizedTasks,
         week_start: datetime.date,
         week_end: datetime.date,
-        previous_summaries: List[Dict[str, Any]] = None
-    ) -> str:
-        """
-        Generate the weekly summary
-        
-        Args:
-            organized_tasks: Tasks organized by category and subproject
-            week_start: Week start date
-            week_end: Week end date
-            previous_summaries: Previous weeks' summaries for context
-        
-        Returns:
-            The generated summary
-        """
-        if previous_summaries is None:
-            previous_summaries = []
-        
+        previous_summaries: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the chat completion parameters for a week"""
         logger.info("Building prompt...")
         prompt = self._build_prompt(
             organized_tasks=organized_tasks,
             week_start=week_start,
             week_end=week_end,
-            previous_summaries=previous_summaries
+            previous_summaries=previous_summaries or []
         )
         
-        logger.info(f"Calling OpenAI API (model: {self.model})...")
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self.i18n.t('prompt_system')
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.5,  # Reduced for more factuality
-                max_tokens=2000
+        return {
+            'model': self.model,
+            'messages': [
+                {
+                    "role": "system",
+                    "content": self.i18n.t('prompt_system')
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            'temperature': 0.5,  # Reduced for more factuality
+            'max_tokens': self.budget.output_tokens(
+                task_count=sum(len(t) for sp in organized_tasks.values() for t in sp.values()),
+                group_count=sum(len(sp) for sp in organized_tasks.values())
             )
-            
-            summary = response.choices[0].message.content.strip()
-            
-            # Log usage stats
-            usage = response.usage
+        }
+    
+    def _cached_summary(self, request: Dict[str, Any]) -> Optional[str]:
+        """Return the cached summary for a request, or None"""
+        if self.cache is None:
+            return None
+        
+        entry = self.cache.get(ResponseCache.key(request))
+        if entry is None:
+            return None
+        
+        logger.info("  Response served from cache (no API call)")
+        get_metrics().inc('llm_cache_hits')
+        return entry['summary']
+    
+    def _handle_response(self, request: Dict[str, Any], response) -> str:
+        """Extract the summary from a completion, log usage stats and cache it"""
+        summary = response.choices[0].message.content.strip()
+        self._record_usage(request, summary, response.usage)
+        return summary
+    
+    def _record_usage(self, request: Dict[str, Any], summary: str, usage, price_factor: float = 1.0) -> None:
+        """
+        Log usage stats and cost, and cache the summary
+        
+        price_factor scales the cost estimate (0.5 for Batch API results)
+        """
+        if usage is None:
+            # Streaming through an endpoint that ignores include_usage
+            logger.warning("  No usage stats in the response, cost not recorded")
+            usage_stats = {}
+        else:
             logger.info(f"  Tokens used - Input: {usage.prompt_tokens}, "
                        f"Output: {usage.completion_tokens}, "
                        f"Total: {usage.total_tokens}")
@@ -170,11 +309,359 @@ class WeeklySummarizer:
             # Cost estimation (approximate prices for gpt-4o-mini)
             input_cost = usage.prompt_tokens * 0.00015 / 1000
             output_cost = usage.completion_tokens * 0.0006 / 1000
-            total_cost = input_cost + output_cost
+            total_cost = (input_cost + output_cost) * price_factor
             logger.info(f"  Estimated cost: ${total_cost:.6f}")
             
+            metrics = get_metrics()
+            metrics.inc('openai_tokens', usage.prompt_tokens, type='prompt', model=self.model)
+            metrics.inc('openai_tokens', usage.completion_tokens, type='completion', model=self.model)
+            metrics.inc('openai_cost_dollars', total_cost, model=self.model)
+            usage_stats = {
+                'prompt_tokens': usage.prompt_tokens,
+                'completion_tokens': usage.completion_tokens,
+                'total_tokens': usage.total_tokens
+            }
+        
+        if self.cache is not None:
+            self.cache.put(ResponseCache.key(request), summary, usage_stats)
+    
+    def _reserve_quota(self, request: Dict[str, Any]) -> None:
+        """Wait for the rate limits before an API call (no-op without quota)"""
+        if self.quota is None:
+            return
+        prompt_tokens = sum(self.budget.count(message['content']) for message in request['messages'])
+        waited = self.quota.acquire(request, prompt_tokens)
+        if waited:
+            logger.info(f"  Waited {waited:.1f}s for the OpenAI rate limits")
+    
+    def _complete(self, request: Dict[str, Any]) -> str:
+        """Run one chat completion, going through the response cache"""
+        cached = self._cached_summary(request)
+        if cached is not None:
+            return cached
+        
+        self._reserve_quota(request)
+        logger.info(f"Calling OpenAI API (model: {self.model})...")
+        
+        try:
+            with get_metrics().span('openai_call', model=self.model):
+                response = self.client.chat.completions.create(**request)
+            return self._handle_response(request, response)
+        
+        except Exception as e:
+            logger.error(f"Error calling OpenAI: {str(e)}")
+            raise
+    
+    async def _complete_async(self, request: Dict[str, Any]) -> str:
+        """Async variant of _complete"""
+        cached = self._cached_summary(request)
+        if cached is not None:
+            return cached
+        
+        await asyncio.to_thread(self._reserve_quota, request)
+        logger.info(f"Calling OpenAI API asynchronously (model: {self.model})...")
+        
+        try:
+            with get_metrics().span('openai_call', model=self.model):
+                response = await self.client.chat.completions.create(**request)
+            return self._handle_response(request, response)
+        
+        except Exception as e:
+            logger.error(f"Error calling OpenAI: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _stream_request(request: Dict[str, Any]) -> Dict[str, Any]:
+        """Same request, streamed, with usage stats in the last chunk"""
+        return {**request, 'stream': True, 'stream_options': {'include_usage': True}}
+    
+    def _complete_stream(self, request: Dict[str, Any], partial_path: Optional[Path] = None) -> str:
+        """
+        Streaming variant of _complete
+        
+        The summary is written to the console and to partial_path as it is
+        generated; the returned value and the cache entry are the same as
+        without streaming.
+        """
+        cached = self._cached_summary(request)
+        if cached is not None:
+            return cached
+        
+        self._reserve_quota(request)
+        logger.info(f"Calling OpenAI API with streaming (model: {self.model})...")
+        
+        try:
+            with get_metrics().span('openai_call', model=self.model):
+                collector = StreamCollector(self.model, partial_path, console=sys.stdout)
+                try:
+                    for chunk in self.client.chat.completions.create(**self._stream_request(request)):
+                        collector.feed(chunk)
+                finally:
+                    summary = collector.close()
+            self._record_usage(request, summary, collector.usage)
             return summary
-            
+        
+        except Exception as e:
+            logger.error(f"Error calling OpenAI: {str(e)}")
+            raise
+    
+    async def _complete_stream_async(self, request: Dict[str, Any], partial_path: Optional[Path] = None) -> str:
+        """Async variant of _complete_stream"""
+        cached = self._cached_summary(request)
+        if cached is not None:
+            return cached
+        
+        await asyncio.to_thread(self._reserve_quota, request)
+        logger.info(f"Calling OpenAI API asynchronously with streaming (model: {self.model})...")
+        
+        try:
+            with get_metrics().span('openai_call', model=self.model):
+                collector = StreamCollector(self.model, partial_path, console=sys.stdout)
+                try:
+                    stream = await self.client.chat.completions.create(**self._stream_request(request))
+                    async for chunk in stream:
+                        collector.feed(chunk)
+                finally:
+                    summary = collector.close()
+            self._record_usage(request, summary, collector.usage)
+            return summary
+        
         except Exception as e:
             logger.error(f"Error calling OpenAI: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _map_units(
+        self,
+        organized_tasks: OrganizedTasks
+    ) -> List[OrganizedTasks]:
+        """
+        Split a heavy week into independently summarized parts
+        
+        Each category is one part; a category above the threshold is split
+        further into groups of subprojects. Weeks under the threshold give
+        a single part (the whole week).
+        
+        Returns:
+            List of single-category subsets of organized_tasks
+        """
+        total = sum(len(t) for sp in organized_tasks.values() for t in sp.values())
+        if total <= self.map_reduce_threshold:
+            return [organized_tasks]
+        
+        units = []
+        for category, subprojects in organized_tasks.items():
+            chunk, chunk_size = {}, 0
+            for subproject_name, tasks in subprojects.items():
+                if chunk and chunk_size + len(tasks) > self.map_reduce_threshold:
+                    units.append({category: chunk})
+                    chunk, chunk_size = {}, 0
+                chunk[subproject_name] = tasks
+                chunk_size += len(tasks)
+            if chunk:
+                units.append({category: chunk})
+        
+        logger.info(f"  Map-reduce mode: {total} tasks split into {len(units)} parts")
+        return units
+    
+    def _map_requests(
+        self,
+        units: List[OrganizedTasks],
+        week_start: datetime.date,
+        week_end: datetime.date,
+        previous_summaries: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Build one request per part, with condensed history for continuity"""
+        context = [
+            {**summary, 'summary': self.budget.condense(summary['summary'])}
+            for summary in previous_summaries or []
+        ]
+        return [
+            self._build_request(unit, week_start, week_end, context)
+            for unit in units
+        ]
+    
+    @staticmethod
+    def _stitch_parts(
+        units: List[OrganizedTasks],
+        parts: List[str]
+    ) -> str:
+        """
+        Stitch part summaries into one ## category / ### subproject document
+        
+        Every category gets exactly one ## title (its own name), even when
+        it was split across several parts. This is the input of the merge
+        call, and the summary itself when that call cannot be made.
+        """
+        merged = []
+        seen = set()
+        for unit, part in zip(units, parts):
+            category = next(iter(unit))
+            lines = part.strip().split('\n')
+            if lines[0].startswith('## '):
+                lines = lines[1:]
+            if category not in seen:
+                lines = [f"## {category}"] + lines
+            seen.add(category)
+            merged.append('\n'.join(lines).strip())
+        return '\n\n'.join(merged)
+    
+    def _reduce_request(
+        self,
+        organized_tasks: OrganizedTasks,
+        stitched: str,
+        week_start: datetime.date,
+        week_end: datetime.date
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the merge request over the stitched part summaries
+        
+        Returns None when the parts do not fit the prompt budget or could
+        not be rewritten within the output limit; the stitched document is
+        then used as is.
+        """
+        t = self.i18n.t
+        prompt = "".join((
+            self._prompt_head(week_start, week_end),
+            f"{t('prompt_parts')}\n\n{stitched}\n",
+            self._format_instructions(organized_tasks, t('prompt_merge_instruction_text'))
+        ))
+        prompt_tokens = self.budget.count(prompt)
+        stitched_tokens = self.budget.count(stitched)
+        if prompt_tokens > self.budget.input_budget or stitched_tokens > self.budget.max_output_tokens:
+            logger.info(f"  Parts too long to merge ({stitched_tokens} tokens), stitched together instead")
+            return None
+        
+        return {
+            'model': self.model,
+            'messages': [
+                {
+                    "role": "system",
+                    "content": t('prompt_system')
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            'temperature': 0.5,
+            'max_tokens': max(stitched_tokens, self.budget.output_tokens(
+                task_count=sum(len(tasks) for sp in organized_tasks.values() for tasks in sp.values()),
+                group_count=sum(len(sp) for sp in organized_tasks.values())
+            ))
+        }
+    
+    def _reduce(
+        self,
+        organized_tasks: OrganizedTasks,
+        units: List[OrganizedTasks],
+        parts: List[str],
+        week_start: datetime.date,
+        week_end: datetime.date
+    ) -> str:
+        """
+        Merge part summaries into the week's summary with one more call
+        
+        Falls back to the stitched parts if the merge request is over
+        budget or fails, so the map calls already paid for are not lost.
+        """
+        stitched = self._stitch_parts(units, parts)
+        request = self._reduce_request(organized_tasks, stitched, week_start, week_end)
+        if request is None:
+            return stitched
+        
+        logger.info(f"  Merging {len(parts)} parts")
+        try:
+            return self._complete(request) or stitched
+        except Exception as e:
+            logger.warning(f"  Merge failed, parts stitched together instead: {str(e)}")
+            return stitched
+    
+    async def _reduce_async(
+        self,
+        organized_tasks: OrganizedTasks,
+        units: List[OrganizedTasks],
+        parts: List[str],
+        week_start: datetime.date,
+        week_end: datetime.date
+    ) -> str:
+        """Async variant of _reduce"""
+        stitched = self._stitch_parts(units, parts)
+        request = self._reduce_request(organized_tasks, stitched, week_start, week_end)
+        if request is None:
+            return stitched
+        
+        logger.info(f"  Merging {len(parts)} parts")
+        try:
+            return await self._complete_async(request) or stitched
+        except Exception as e:
+            logger.warning(f"  Merge failed, parts stitched together instead: {str(e)}")
+            return stitched
+    
+    def generate_summary(
+        self,
+        organized_tasks: OrganizedTasks,
+        week_start: datetime.date,
+        week_end: datetime.date,
+        previous_summaries: List[Dict[str, Any]] = None,
+        partial_path: Optional[Path] = None
+    ) -> str:
+        """
+        Generate the weekly summary
+        
+        Heavy weeks (more than MAP_REDUCE_THRESHOLD tasks) are summarized
+        category by category in parallel, then the parts are merged by one
+        more call (see _reduce). Other weeks are streamed when OPENAI_STREAM
+        is enabled.
+        
+        Args:
+            organized_tasks: Tasks organized by category and subproject
+            week_start: Week start date
+            week_end: Week end date
+            previous_summaries: Previous weeks' summaries for context
+            partial_path: File receiving the summary while it is streamed
+        
+        Returns:
+            The generated summary
+        """
+        units = self._map_units(organized_tasks)
+        if len(units) == 1:
+            request = self._build_request(organized_tasks, week_start, week_end, previous_summaries)
+            if self.stream:
+                return self._complete_stream(request, partial_path)
+            return self._complete(request)
+        
+        requests = self._map_requests(units, week_start, week_end, previous_summaries)
+        with ThreadPoolExecutor(max_workers=min(self.MAP_CONCURRENCY, len(requests))) as executor:
+            parts = list(executor.map(self._complete, requests))
+        return self._reduce(organized_tasks, units, parts, week_start, week_end)
+    
+    async def generate_summary_async(
+        self,
+        organized_tasks: OrganizedTasks,
+        week_start: datetime.date,
+        week_end: datetime.date,
+        previous_summaries: List[Dict[str, Any]] = None,
+        partial_path: Optional[Path] = None
+    ) -> str:
+        """
+        Generate the weekly summary without blocking the event loop
+        
+        Requires a summarizer created with use_async=True. Same arguments
+        and return value as generate_summary.
+        """
+        units = self._map_units(organized_tasks)
+        if len(units) == 1:
+            request = self._build_request(organized_tasks, week_start, week_end, previous_summaries)
+            if self.stream:
+                return await self._complete_stream_async(request, partial_path)
+            return await self._complete_async(request)
+        
+        requests = self._map_requests(units, week_start, week_end, previous_summaries)
+        semaphore = asyncio.Semaphore(self.MAP_CONCURRENCY)
+        
+        async def complete(request):
+            async with semaphore:
+                return await self._complete_async(request)
+        
+        parts = await asyncio.gather(*(complete(r) for r in requests))
+        return await self._reduce_async(organized_tasks, units, parts, week_start, week_end)
@@ -0,0 +1,115 @@
+"""
+Completed task model shared by the pipeline stages
+"""
+
+import sys
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a Todoist timestamp (ISO 8601, UTC with a Z suffix)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Share one copy of strings that repeat across tasks (IDs, names)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Task:
+    """
+    One completed task
+    
+    Built once when tasks are fetched or read from the local store, then
+    passed as is to the summarizer, the storage and the SQLite backend.
+    Slots keep a multi-year history in memory at a fraction of the size of
+    dicts; the completion time is parsed once (completed, aware UTC
+    datetime) while completed_at keeps the original string that is stored
+    and sorted on. Project and section IDs and names are interned, so tasks
+    of the same project share them.
+    """
+    
+    __slots__ = (
+        'id', 'content', 'completed_at', 'completed',
+        'project_id', 'section_id', 'project_name', 'section_name'
+    )
+    
+    # Stored fields, in the order of the JSON archives
+    FIELDS = ('id', 'content', 'completed_at', 'project_id', 'section_id', 'project_name', 'section_name')
+    
+    def __init__(
+        self,
+        id: Optional[str],
+        content: Optional[str],
+        completed_at: str,
+        project_id: Optional[str] = None,
+        section_id: Optional[str] = None,
+        project_name: Optional[str] = None,
+        section_name: Optional[str] = None,
+        completed: Optional[datetime] = None
+    ):
+        self.id = id
+        self.content = content
+        self.completed_at = completed_at
+        self.completed = completed if completed is not None else parse_timestamp(completed_at)
+        self.project_id = _intern(project_id)
+        self.section_id = _intern(section_id)
+        self.project_name = _intern(project_name)
+        self.section_name = _intern(section_name)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Task':
+        """Task from its stored form (task store, JSON archive)"""
+        return cls(
+            data.get('id'),
+            data.get('content'),
+            data['completed_at'],
+            data.get('project_id'),
+            data.get('section_id'),
+            data.get('project_name'),
+            data.get('section_name')
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Stored form of the task"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    def sort_key(self):
+        """Chronological order, ties broken by ID"""
+        return self.completed_at, str(self.id)
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"Task(id={self.id!r}, content={self.content!r}, completed_at={self.completed_at!r})"
+
+
+OrganizedTasks = Dict[str, Dict[Optional[str], List[Task]]]
+
+
+def organized_to_dicts(organized_tasks: OrganizedTasks) -> Dict[str, Dict[Optional[str], List[Dict[str, Any]]]]:
+    """Organized tasks in their stored (JSON-serializable) form"""
+    return {
+        category: {
+            subproject: [task.to_dict() for task in tasks]
+            for subproject, tasks in subprojects.items()
+        }
+        for category, subprojects in organized_tasks.items()
+    }
+
+
+def organized_from_dicts(data: Dict[str, Dict[Optional[str], List[Dict[str, Any]]]]) -> OrganizedTasks:
+    """Organized tasks read back from their stored form"""
+    return {
+        category: {
+            subproject: [Task.from_dict(task) for task in tasks]
+            for subproject, tasks in subprojects.items()
+        }
+        for category, subprojects in data.items()
+    }
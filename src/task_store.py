@@ -0,0 +1,111 @@
+"""
+Local store of completed tasks, partitioned by completion day
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Tuple
+from src.task_model import Task
+
+logger = logging.getLogger(__name__)
+
+
+class CompletedTaskStore:
+    """
+    Stores completed tasks as one JSON file per completion day (UTC).
+    
+    Only past days are stored, since they can no longer change. A day is
+    covered when its file exists (days without tasks are written as empty
+    lists), so the store may hold several disjoint ranges, e.g. a week
+    backfilled from last year next to the recent weeks.
+    """
+    
+    def __init__(self, data_dir: Path = None):
+        self.data_dir = Path(data_dir) if data_dir else Path(os.getenv('DATA_DIR', 'data')) / "tasks"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+    
+    def is_stored(self, day: date) -> bool:
+        """True if the tasks of day are on disk"""
+        return self._day_file(day).exists()
+    
+    def segments(self, start_date: date, end_date: date) -> List[Tuple[date, date, bool]]:
+        """
+        Split [start_date, end_date] into runs of stored and missing days
+        
+        Returns:
+            List of (first_day, last_day, stored), in date order
+        """
+        segments = []
+        day = start_date
+        while day <= end_date:
+            stored = self.is_stored(day)
+            if segments and segments[-1][2] == stored:
+                segments[-1] = (segments[-1][0], day, stored)
+            else:
+                segments.append((day, day, stored))
+            day += timedelta(days=1)
+        return segments
+    
+    @staticmethod
+    def last_complete_day() -> date:
+        """Most recent day (UTC) that can no longer receive completions"""
+        return datetime.now(timezone.utc).date() - timedelta(days=1)
+    
+    def _day_file(self, day: date) -> Path:
+        """Path of the file holding one day of tasks"""
+        return self.data_dir / f"{day.isoformat()}.json"
+    
+    def read_days(self, start_date: date, end_date: date) -> Iterator[Task]:
+        """
+        Yield stored tasks completed between two dates (inclusive)
+        """
+        day = start_date
+        while day <= end_date:
+            day_file = self._day_file(day)
+            if day_file.exists():
+                with open(day_file, 'r', encoding='utf-8') as f:
+                    for data in json.load(f):
+                        yield Task.from_dict(data)
+            day += timedelta(days=1)
+    
+    def write_days(
+        self,
+        tasks: List[Task],
+        start_date: date,
+        end_date: date
+    ) -> None:
+        """
+        Store every day between two dates
+        
+        Days with no tasks are written as empty files so they count as
+        synced. Days after last_complete_day() are skipped.
+        
+        Args:
+            tasks: All tasks completed between start_date and end_date
+            start_date: First fetched day (inclusive)
+            end_date: Last fetched day (inclusive)
+        """
+        end_date = min(end_date, self.last_complete_day())
+        if end_date < start_date:
+            return
+        
+        by_day: Dict[date, List[Dict[str, Any]]] = {}
+        for task in tasks:
+            by_day.setdefault(task.completed.date(), []).append(task.to_dict())
+        
+        day = start_date
+        while day <= end_date:
+            self._write_json(self._day_file(day), by_day.get(day, []))
+            day += timedelta(days=1)
+        logger.info(f"  Task store: {start_date} to {end_date} stored")
+    
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        """Write a JSON file atomically"""
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -3,12 +3,21 @@ Client for interacting with Todoist API
 """
 
 import os
+import json
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Set, Tuple
 import requests
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from src.todoist_mirror import ProjectMirror
+from src.task_store import CompletedTaskStore
+from src.metrics import record_http_response
+from src.rate_limit import RateLimitedAdapter, shared_limiter, rate_from_env
+from src.http_cache import CachingAdapter
+from src.task_model import Task, OrganizedTasks, parse_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +28,18 @@ class TodoistClient:
     BASE_URL = "https://api.todoist.com/sync/v9"
     REST_URL = "https://api.todoist.com/rest/v2"
     
+    # Max parallel REST calls when the Sync API bulk read is unavailable
+    REST_CONCURRENCY = 8
+    
+    # Page size for completed/get_all (API maximum is 200)
+    COMPLETED_PAGE_SIZE = 200
+    
+    # Requests allowed at once before the per-minute rate applies. With the
+    # default 60/min, a bucket never exceeds Todoist's documented 1000
+    # requests per 15 minutes (100 + 15 * 60), while a cold run (a few dozen
+    # requests) is not throttled at all
+    RATE_LIMIT_BURST = 100
+    
     def __init__(self):
         self.api_token = os.getenv('TODOIST_API_TOKEN')
         if not self.api_token:
@@ -28,11 +49,15 @@ class TodoistClient:
             "Authorization": f"Bearer {self.api_token}"
         }
         
+        # API endpoints (overridable, e.g. to point at a local stand-in)
+        self.sync_url = os.getenv('TODOIST_SYNC_URL', self.BASE_URL).rstrip('/')
+        self.rest_url = os.getenv('TODOIST_REST_URL', self.REST_URL).rstrip('/')
+        
         # Project prefix configuration (easily modifiable)
         self.work_prefix = os.getenv('WORK_PREFIX', None)
         self.personal_prefix = os.getenv('PERSONAL_PREFIX', None)
         self.tinker_prefix = os.getenv('TINKER_PREFIX', None)
-
+        
         if self.work_prefix is None and self.personal_prefix is None and self.tinker_prefix is None:
             raise ValueError("No projects prefix set")
         
@@ -41,17 +66,62 @@ class TodoistClient:
         
         # Projects cache
         self._projects_cache = None
+        
+        # Persistent project/section mirror (synced at most once per client)
+        self.mirror = ProjectMirror()
+        self._mirror_synced = False
+        
+        # Local day-partitioned store of completed tasks (optional)
+        use_store = os.getenv('TASK_STORE', 'True').lower() == 'true'
+        self.task_store = CompletedTaskStore() if use_store else None
+        
+        # Project/section metadata resolved so far, shared by the threads of
+        # a parallel backfill (updated under _metadata_lock)
+        self._metadata_lock = threading.Lock()
+        self._projects_map = None
+        self._sections_map = {}
+        self._sections_fetched_for = set()
+        self._metadata_complete = False
     
     def _create_session(self) -> requests.Session:
-        """Create a session with automatic retry"""
+        """
+        Create a session with automatic retry and rate limiting
+        
+        Every request goes through a token bucket shared by all clients of
+        the same account in the process (TODOIST_REQUESTS_PER_MINUTE), which
+        adapts to Retry-After and rate limit headers. 429 responses are
+        retried by the limiter; server errors by urllib3. REST metadata
+        calls are revalidated against a persistent HTTP cache (HTTP_CACHE).
+        
+        The cache deliberately covers REST only, i.e. the metadata fallback
+        used when the Sync API read fails with no mirror yet. Sync API
+        calls get nothing from it: /sync is a POST (not cacheable), and its
+        sync_token already limits the response to what changed. Completed
+        items of past days come from the task store, not from the network.
+        """
         session = requests.Session()
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504]
+            status_forcelist=[500, 502, 503, 504],
+            # 429 (and its Retry-After) is handled by the rate limiter
+            respect_retry_after_header=False
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        account = hashlib.sha256(self.api_token.encode('utf-8')).hexdigest()[:16]
+        limiter = shared_limiter(
+            f"todoist:{account}",
+            per_minute=rate_from_env('TODOIST_REQUESTS_PER_MINUTE', '60'),
+            burst=self.RATE_LIMIT_BURST,
+            name='todoist'
+        )
+        adapter = RateLimitedAdapter(limiter, max_retries=retry_strategy)
         session.mount("https://", adapter)
+        session.mount("http://", adapter)  # Local stand-ins (benchmarks)
+        if os.getenv('HTTP_CACHE', 'True').lower() == 'true':
+            # Longest prefix wins: only REST calls go through the cache (see above)
+            session.mount(f"{self.rest_url}/", CachingAdapter(adapter))
+        # Per-call duration, status, bytes and retries
+        session.hooks['response'].append(record_http_response)
         return session
     
     def get_projects(self) -> List[Dict[str, Any]]:
@@ -61,7 +131,7 @@ class TodoistClient:
         
         logger.info("Fetching project list...")
         response = self.session.get(
-            f"{self.REST_URL}/projects",
+            f"{self.rest_url}/projects",
             headers=self.headers
         )
         response.raise_for_status()
@@ -73,89 +143,321 @@ class TodoistClient:
     def get_sections(self, project_id: str) -> List[Dict[str, Any]]:
         """Fetch sections of a project"""
         response = self.session.get(
-            f"{self.REST_URL}/sections",
+            f"{self.rest_url}/sections",
             headers=self.headers,
             params={"project_id": project_id}
         )
         response.raise_for_status()
         return response.json()
     
-    def get_completed_tasks(
-        self, 
-        start_date: datetime.date, 
-        end_date: datetime.date
-    ) -> List[Dict[str, Any]]:
+    def _sync_resources(
+        self,
+        resource_types: List[str],
+        sync_token: str = "*"
+    ) -> Dict[str, Any]:
         """
-        Fetch completed tasks between two dates
+        Read resources in bulk from the Sync API
         
         Args:
-            start_date: Start date (inclusive)
-            end_date: End date (inclusive)
+            resource_types: Resource types to read (e.g., ["projects", "sections"])
+            sync_token: "*" for a full read, or a previous token for a delta
         
         Returns:
-            List of completed tasks with their project and section
+            Raw Sync API response
         """
-        logger.info(f"Fetching tasks from {start_date} to {end_date}...")
+        response = self.session.post(
+            f"{self.sync_url}/sync",
+            headers=self.headers,
+            data={
+                "sync_token": sync_token,
+                "resource_types": json.dumps(resource_types)
+            }
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def _fetch_sections_concurrently(
+        self,
+        project_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch sections of the given projects over REST, in parallel"""
+        project_ids = list(project_ids)
+        sections_map = {}
+        if not project_ids:
+            return sections_map
         
-        # Fetch all projects
-        projects = self.get_projects()
-        projects_map = {p['id']: p for p in projects}
+        workers = min(self.REST_CONCURRENCY, len(project_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for sections in executor.map(self.get_sections, project_ids):
+                for section in sections:
+                    sections_map[section['id']] = section
+        return sections_map
+    
+    def sync_metadata(self) -> ProjectMirror:
+        """
+        Bring the on-disk project/section mirror up to date
         
-        # Fetch sections for each project
-        sections_map = {}
-        for project in projects:
-            sections = self.get_sections(project['id'])
-            for section in sections:
-                sections_map[section['id']] = section
+        The first run performs a full read; later runs send the stored
+        sync_token and only receive what changed since.
         
-        # Fetch completed tasks via Sync API
-        # Fetch from 8 days ago to ensure we get everything
-        since = (start_date - timedelta(days=1)).isoformat()
+        Returns:
+            The synced mirror
+        """
+        if self._mirror_synced:
+            return self.mirror
         
-        response = self.session.get(
-            f"{self.BASE_URL}/completed/get_all",
-            headers=self.headers,
-            params={"since": since}
-        )
-        response.raise_for_status()
-        data = response.json()
+        mode = "full" if self.mirror.is_empty else "incremental"
+        logger.info(f"Syncing projects and sections ({mode})...")
+        data = self._sync_resources(ProjectMirror.RESOURCE_TYPES, self.mirror.sync_token)
+        self.mirror.apply(data)
+        self.mirror.save()
+        self._mirror_synced = True
+        return self.mirror
+    
+    def get_projects_and_sections(
+        self,
+        section_ids: Set[str],
+        section_project_ids: Set[str]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Resolve projects and the referenced sections in bulk
         
-        # Filter tasks within the desired period
-        completed_tasks = []
-        for item in data.get('items', []):
-            completed_at_str = item.get('completed_at')
-            if not completed_at_str:
-                continue
+        Projects and sections come from the persistent mirror, refreshed with
+        one incremental Sync API read. If that read fails, a previously
+        synced mirror is used as is; with no mirror, fall back to REST: one
+        projects call plus concurrent section calls, limited to the projects
+        that actually hold referenced sections. Results are kept, so later
+        calls only fetch what is still missing. Thread-safe: concurrent
+        callers wait for the one resolving the metadata.
+        
+        Args:
+            section_ids: Section IDs referenced by completed tasks
+            section_project_ids: Projects owning those sections
+        
+        Returns:
+            Tuple (projects_map, sections_map), both keyed by ID
+        """
+        with self._metadata_lock:
+            if self._metadata_complete:
+                return self._projects_map, self._sections_map
+            
+            if self._projects_map is None:
+                try:
+                    self.sync_metadata()
+                except (requests.RequestException, ValueError) as e:
+                    if self.mirror.is_empty:
+                        logger.warning(f"  Sync API read failed ({e}), falling back to REST")
+                        self._projects_map = {p['id']: p for p in self.get_projects()}
+                    else:
+                        logger.warning(f"  Sync API read failed ({e}), using stored mirror")
+            
+                if self._projects_map is None:
+                    self._projects_cache = self.mirror.get_projects()
+                    self._projects_map = self.mirror.projects
+                    self._sections_map = self.mirror.sections
+                    self._metadata_complete = True
+                    logger.info(f"  {len(self._projects_map)} projects, "
+                                f"{len(self._sections_map)} sections resolved")
+                    return self._projects_map, self._sections_map
             
-            # Parse completion date
-            completed_at = datetime.fromisoformat(
-                completed_at_str.replace('Z', '+00:00')
-            ).date()
+            # REST fallback: only fetch sections of projects not seen yet
+            missing_ids = section_ids - self._sections_map.keys()
+            to_fetch = section_project_ids - self._sections_fetched_for if missing_ids else set()
+            if to_fetch:
+                self._sections_map.update(self._fetch_sections_concurrently(to_fetch))
+                self._sections_fetched_for |= to_fetch
+                logger.info(f"  Sections fetched for {len(to_fetch)} projects")
             
-            # Check period
-            if start_date <= completed_at <= end_date:
-                task_data = {
-                    'id': item.get('id'),
-                    'content': item.get('content'),
-                    'completed_at': completed_at_str,
-                    'project_id': item.get('project_id'),
-                    'section_id': item.get('section_id'),
-                    'project_name': None,
-                    'section_name': None
+            return self._projects_map, self._sections_map
+    
+    def _iter_completed_pages(
+        self,
+        since: str,
+        until: str
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of raw completed items between since and until"""
+        offset = 0
+        while True:
+            response = self.session.get(
+                f"{self.sync_url}/completed/get_all",
+                headers=self.headers,
+                params={
+                    "since": since,
+                    "until": until,
+                    "limit": self.COMPLETED_PAGE_SIZE,
+                    "offset": offset
                 }
+            )
+            response.raise_for_status()
+            items = response.json().get('items', [])
+            if items:
+                yield items
+            if len(items) < self.COMPLETED_PAGE_SIZE:
+                return
+            offset += len(items)
+    
+    def _attach_names(self, tasks: List[Task]) -> None:
+        """Fill project_name and section_name of tasks in place"""
+        section_ids = {t.section_id for t in tasks if t.section_id}
+        section_project_ids = {t.project_id for t in tasks if t.section_id}
+        projects_map, sections_map = self.get_projects_and_sections(
+            section_ids, section_project_ids
+        )
+        
+        for task in tasks:
+            # Add project name
+            if task.project_id in projects_map:
+                task.project_name = projects_map[task.project_id]['name']
+            
+            # Add section name
+            if task.section_id and task.section_id in sections_map:
+                task.section_name = sections_map[task.section_id]['name']
+    
+    def _fetch_completed_pages(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date
+    ) -> Iterator[List[Task]]:
+        """
+        Fetch completed tasks from the API, one page of Task at a time
+        
+        Project and section names are left empty.
+        """
+        # Bound the window server-side: [start_date 00:00, end_date + 1 day 00:00)
+        since = f"{start_date.isoformat()}T00:00"
+        until = f"{(end_date + timedelta(days=1)).isoformat()}T00:00"
+        
+        for items in self._iter_completed_pages(since, until):
+            page_tasks = []
+            for item in items:
+                completed_at_str = item.get('completed_at')
+                if not completed_at_str:
+                    continue
                 
-                # Add project name
-                if item.get('project_id') in projects_map:
-                    task_data['project_name'] = projects_map[item['project_id']]['name']
-                
-                # Add section name
-                if item.get('section_id') and item['section_id'] in sections_map:
-                    task_data['section_name'] = sections_map[item['section_id']]['name']
+                # Parse completion date (once, kept on the task)
+                completed = parse_timestamp(completed_at_str)
                 
-                completed_tasks.append(task_data)
+                # Check period
+                if start_date <= completed.date() <= end_date:
+                    page_tasks.append(Task(
+                        item.get('id'),
+                        item.get('content'),
+                        completed_at_str,
+                        item.get('project_id'),
+                        item.get('section_id'),
+                        completed=completed
+                    ))
+            
+            if page_tasks:
+                yield page_tasks
+    
+    def _fetch_and_store(
+        self,
+        fetch_start: datetime.date,
+        fetch_end: datetime.date,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        store: bool = True
+    ) -> Iterator[List[Task]]:
+        """
+        Fetch [fetch_start, fetch_end] from the API, store it (unless store
+        is False), and yield the pages restricted to [start_date, end_date]
+        """
+        store = store and self.task_store is not None
+        fetched = []
+        for page_tasks in self._fetch_completed_pages(fetch_start, fetch_end):
+            if store:
+                fetched.extend(page_tasks)
+            in_period = [t for t in page_tasks if start_date <= t.completed.date() <= end_date]
+            if in_period:
+                yield in_period
         
-        logger.info(f"  {len(completed_tasks)} tasks in period")
-        return completed_tasks
+        if store:
+            self.task_store.write_days(fetched, fetch_start, fetch_end)
+    
+    def _read_stored_pages(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date
+    ) -> Iterator[List[Task]]:
+        """Read tasks from the local store, grouped in pages"""
+        page_tasks = []
+        for task in self.task_store.read_days(start_date, end_date):
+            page_tasks.append(task)
+            if len(page_tasks) >= self.COMPLETED_PAGE_SIZE:
+                yield page_tasks
+                page_tasks = []
+        if page_tasks:
+            yield page_tasks
+    
+    def _iter_task_pages(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        store: bool = True
+    ) -> Iterator[List[Task]]:
+        """
+        Yield pages of tasks, serving stored days from disk
+        
+        Days of [start_date, end_date] already in the task store are read
+        locally; only the missing runs of days are requested from the API,
+        and stored in turn.
+        """
+        if self.task_store is None:
+            yield from self._fetch_and_store(start_date, end_date, start_date, end_date, store)
+            return
+        
+        for first_day, last_day, stored in self.task_store.segments(start_date, end_date):
+            if stored:
+                logger.info(f"  Reading {first_day} to {last_day} from local store")
+                yield from self._read_stored_pages(first_day, last_day)
+            else:
+                logger.info(f"  Fetching {first_day} to {last_day} from API")
+                yield from self._fetch_and_store(first_day, last_day, start_date, end_date, store)
+    
+    def iter_completed_tasks(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        store: bool = True
+    ) -> Iterator[Task]:
+        """
+        Stream completed tasks between two dates, page by page
+        
+        Args:
+            start_date: Start date (inclusive)
+            end_date: End date (inclusive)
+            store: Write fetched days to the task store
+        
+        Yields:
+            Completed tasks with their project and section
+        """
+        logger.info(f"Fetching tasks from {start_date} to {end_date}...")
+        
+        count = 0
+        for page_tasks in self._iter_task_pages(start_date, end_date, store):
+            self._attach_names(page_tasks)
+            count += len(page_tasks)
+            yield from page_tasks
+        
+        logger.info(f"  {count} tasks in period")
+    
+    def get_completed_tasks(
+        self, 
+        start_date: datetime.date, 
+        end_date: datetime.date
+    ) -> List[Task]:
+        """
+        Fetch completed tasks between two dates
+        
+        Args:
+            start_date: Start date (inclusive)
+            end_date: End date (inclusive)
+        
+        Returns:
+            List of completed tasks with their project and section
+        """
+        return list(self.iter_completed_tasks(start_date, end_date))
     
     def _parse_project_name(self, project_name: str) -> tuple[str, str]:
         """
@@ -175,11 +477,14 @@ class TodoistClient:
     
     def organize_tasks_by_category(
         self, 
-        tasks: List[Dict[str, Any]]
-    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        tasks: Iterable[Task]
+    ) -> OrganizedTasks:
         """
         Organize tasks by category and subproject/section
         
+        Accepts any iterable, so tasks can be consumed straight from
+        iter_completed_tasks without materializing the full list first.
+        
         Returns:
             Dict with structure:
             {
@@ -198,9 +503,10 @@ class TodoistClient:
             }
         """
         organized = {}
+        configured_prefixes = [p for p in [self.work_prefix, self.personal_prefix, self.tinker_prefix] if p is not None]
         
         for task in tasks:
-            project_name = task.get('project_name', '')
+            project_name = task.project_name
             if not project_name:
                 continue
             
@@ -208,8 +514,6 @@ class TodoistClient:
             prefix, subproject = self._parse_project_name(project_name)
             
             # Check if it's a configured prefix
-            configured_prefixes = [p for p in [self.work_prefix, self.personal_prefix, self.tinker_prefix] if p is not None]
-
             if prefix not in configured_prefixes:
                 # Project doesn't match any configured prefix
                 continue
@@ -224,8 +528,8 @@ class TodoistClient:
             # 3. If neither, use None
             if subproject:
                 grouping_key = subproject
-            elif task.get('section_name'):
-                grouping_key = task['section_name']
+            elif task.section_name:
+                grouping_key = task.section_name
             else:
                 grouping_key = None
             
@@ -234,6 +538,12 @@ class TodoistClient:
             
             organized[prefix][grouping_key].append(task)
         
+        # Chronological order, whether tasks came from the API or the local
+        # store, so identical weeks always produce identical prompts
+        for subprojects in organized.values():
+            for tasks_list in subprojects.values():
+                tasks_list.sort(key=Task.sort_key)
+        
         # Log organization
         for prefix, subprojects in organized.items():
             total = sum(len(tasks) for tasks in subprojects.values())
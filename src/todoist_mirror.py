@@ -0,0 +1,90 @@
+"""
+Persistent mirror of Todoist projects and sections
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectMirror:
+    """
+    On-disk copy of Todoist projects and sections, kept up to date with
+    incremental Sync API reads keyed by sync_token
+    """
+    
+    RESOURCE_TYPES = ["projects", "sections"]
+    
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else Path(os.getenv('DATA_DIR', 'data')) / "todoist_mirror.json"
+        self.sync_token = "*"
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self._load()
+    
+    def _load(self) -> None:
+        """Load the mirror from disk if present"""
+        if not self.path.exists():
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.sync_token = data.get('sync_token', '*')
+            self.projects = data.get('projects', {})
+            self.sections = data.get('sections', {})
+            logger.info(f"  Mirror loaded: {len(self.projects)} projects, "
+                        f"{len(self.sections)} sections")
+        except Exception as e:
+            logger.warning(f"  Unable to load {self.path.name}, starting a full sync: {str(e)}")
+            self.sync_token = "*"
+            self.projects = {}
+            self.sections = {}
+    
+    @property
+    def is_empty(self) -> bool:
+        """True until a first sync has been applied"""
+        return self.sync_token == "*"
+    
+    def apply(self, data: Dict[str, Any]) -> None:
+        """
+        Apply a Sync API response (full or incremental)
+        
+        Args:
+            data: Raw Sync API response for RESOURCE_TYPES
+        """
+        if data.get('full_sync', self.is_empty):
+            self.projects = {}
+            self.sections = {}
+        
+        changed = 0
+        for resource, store in (('projects', self.projects), ('sections', self.sections)):
+            for obj in data.get(resource, []):
+                changed += 1
+                if obj.get('is_deleted'):
+                    store.pop(obj['id'], None)
+                else:
+                    store[obj['id']] = obj
+        
+        self.sync_token = data.get('sync_token', self.sync_token)
+        logger.info(f"  Mirror updated: {changed} changes applied")
+    
+    def save(self) -> None:
+        """Write the mirror atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'sync_token': self.sync_token,
+                'projects': self.projects,
+                'sections': self.sections
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def get_projects(self) -> List[Dict[str, Any]]:
+        """Return the mirrored projects"""
+        return list(self.projects.values())
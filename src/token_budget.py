@@ -0,0 +1,195 @@
+"""
+Token budgeting for the summary prompt
+"""
+
+import os
+import re
+import math
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Subproject key -> task lines, per category
+TaskLines = Dict[str, Dict[Optional[str], List[str]]]
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, estimates otherwise"""
+    
+    # Average characters per token for the fallback estimate
+    CHARS_PER_TOKEN = 4
+    
+    def __init__(self, model: str):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return math.ceil(len(text) / self.CHARS_PER_TOKEN)
+
+
+class PromptBudget:
+    """
+    Fits prompt segments into an input token budget and sizes the output
+    
+    Tasks have priority over history: task lines are condensed only when
+    they alone exceed what is left after the fixed instructions, and
+    history gets whatever remains.
+    """
+    
+    # Task lines longer than this are shortened first when over budget
+    MAX_TASK_CHARS = 120
+    
+    def __init__(self, model: str):
+        self.counter = TokenCounter(model)
+        self.input_budget = int(os.getenv('PROMPT_TOKEN_BUDGET', '12000'))
+        self.max_output_tokens = int(os.getenv('MAX_OUTPUT_TOKENS', '2000'))
+        self.min_output_tokens = int(os.getenv('MIN_OUTPUT_TOKENS', '400'))
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        return self.counter.count(text)
+    
+    def fit_task_lines(self, task_lines: TaskLines, max_tokens: int) -> Tuple[TaskLines, int]:
+        """
+        Condense task lines to fit max_tokens
+        
+        Long lines are shortened first; if that is not enough, each
+        subproject keeps only its first N lines (N as large as the budget
+        allows) followed by a "+X more" marker.
+        
+        Returns:
+            Tuple (task lines, number of task lines dropped)
+        """
+        counts = {
+            (category, key): [self.count(line) + 1 for line in lines]
+            for category, groups in task_lines.items()
+            for key, lines in groups.items()
+        }
+        if sum(sum(c) for c in counts.values()) <= max_tokens:
+            return task_lines, 0
+        
+        # 1. Shorten long lines
+        shortened = {
+            category: {
+                key: [self._shorten(line) for line in lines]
+                for key, lines in groups.items()
+            }
+            for category, groups in task_lines.items()
+        }
+        counts = {
+            (category, key): [self.count(line) + 1 for line in lines]
+            for category, groups in shortened.items()
+            for key, lines in groups.items()
+        }
+        if sum(sum(c) for c in counts.values()) <= max_tokens:
+            logger.info("  Prompt budget: long task lines shortened")
+            return shortened, 0
+        
+        # 2. Cap lines per subproject (binary search on the cap)
+        marker_cost = self.count("- … (+000 more)") + 1
+        
+        def cost(cap: int) -> int:
+            total = 0
+            for c in counts.values():
+                total += sum(c[:cap])
+                if len(c) > cap:
+                    total += marker_cost
+            return total
+        
+        low, high = 1, max(len(c) for c in counts.values())
+        while low < high:
+            mid = (low + high + 1) // 2
+            if cost(mid) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        cap = low
+        
+        dropped = 0
+        capped = {}
+        for category, groups in shortened.items():
+            capped[category] = {}
+            for key, lines in groups.items():
+                kept = lines[:cap]
+                if len(lines) > cap:
+                    dropped += len(lines) - cap
+                    kept = kept + [f"- … (+{len(lines) - cap} more)"]
+                capped[category][key] = kept
+        
+        logger.info(f"  Prompt budget: kept {cap} tasks per subproject, {dropped} condensed")
+        return capped, dropped
+    
+    def _shorten(self, line: str) -> str:
+        """Cut a line to MAX_TASK_CHARS"""
+        if len(line) <= self.MAX_TASK_CHARS:
+            return line
+        return line[:self.MAX_TASK_CHARS - 1].rstrip() + "…"
+    
+    def fit_history(
+        self,
+        summaries: List[Dict[str, Any]],
+        max_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep as much history as fits, newest weeks first
+        
+        A week that does not fit in full is condensed to the first sentence
+        of each paragraph; weeks that still do not fit, and every older
+        week, are dropped.
+        
+        Returns:
+            Summaries to include, oldest first
+        """
+        kept = []
+        remaining = max_tokens
+        for summary in reversed(summaries):
+            text = summary['summary']
+            cost = self.count(text) + 20  # Week separator line
+            if cost > remaining:
+                text = self.condense(text)
+                cost = self.count(text) + 20
+                if cost > remaining:
+                    break
+            kept.append({**summary, 'summary': text})
+            remaining -= cost
+        
+        if len(kept) < len(summaries):
+            logger.info(f"  Prompt budget: {len(summaries) - len(kept)} previous weeks dropped")
+        return list(reversed(kept))
+    
+    @staticmethod
+    def condense(text: str) -> str:
+        """Keep Markdown titles and the first sentence of each paragraph"""
+        condensed = []
+        for paragraph in re.split(r'\n\s*\n', text.strip()):
+            paragraph = paragraph.strip()
+            if paragraph.startswith('#'):
+                condensed.append(paragraph)
+            elif paragraph:
+                condensed.append(re.split(r'(?<=[.!?])\s', paragraph, maxsplit=1)[0])
+        return "\n\n".join(condensed)
+    
+    def output_tokens(self, task_count: int, group_count: int) -> int:
+        """
+        Size max_tokens from the task volume
+        
+        Roughly one paragraph per subproject plus a little per task,
+        clamped between MIN_OUTPUT_TOKENS and MAX_OUTPUT_TOKENS.
+        """
+        estimate = 150 + 80 * group_count + 8 * task_count
+        return max(self.min_output_tokens, min(self.max_output_tokens, estimate))
@@ -0,0 +1,182 @@
+"""
+Tests of the parallel backfill scheduling (DependencyScheduler, ParallelBackfill)
+"""
+
+import sys
+import time
+import random
+import threading
+import subprocess
+from pathlib import Path
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backfill import DependencyScheduler, ParallelBackfill  # noqa: E402
+from src.task_model import Task  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class EventLog:
+    """Ordered record of what the fakes did, shared by the worker threads"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, *event) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def index(self, *event) -> int:
+        return self.events.index(event)
+
+
+class FakeTodoist:
+    def __init__(self, log: EventLog, failing=()):
+        self.log = log
+        self.failing = set(failing)
+
+    def get_projects_and_sections(self, section_ids, section_project_ids):
+        return {}, {}
+
+    def iter_completed_tasks(self, week_start, week_end):
+        time.sleep(random.uniform(0, 0.01))
+        if week_start in self.failing:
+            raise RuntimeError(f"fetch of {week_start} failed")
+        self.log.add('fetch', week_start)
+        return iter([Task('1', f"Task of {week_start}", f"{week_start.isoformat()}T10:00:00Z")])
+
+    def organize_tasks_by_category(self, tasks):
+        tasks = list(tasks)
+        return {'Work': {None: tasks}} if tasks else {}
+
+
+class FakeSummarizer:
+    quota = object()
+
+    def __init__(self, log: EventLog):
+        self.log = log
+        self.histories = {}
+
+    def generate_summary(self, organized_tasks, week_start, week_end, previous_summaries):
+        self.log.add('summarize', week_start)
+        self.histories[week_start] = [s['week_start'] for s in previous_summaries]
+        time.sleep(random.uniform(0, 0.01))
+        return f"Summary of {week_start}"
+
+
+class FakeStorage:
+    def __init__(self, log: EventLog):
+        self.log = log
+        self.saved = {}
+
+    def save_summary(self, summary, organized_tasks, week_start, week_end):
+        time.sleep(random.uniform(0, 0.01))
+        self.saved[week_start] = summary
+        self.log.add('saved', week_start)
+
+    def load_previous_summaries(self, weeks=4, before=None):
+        starts = sorted(start for start in self.saved if before is None or start < before)[-weeks:]
+        return [{'week_start': start, 'week_end': start + timedelta(days=6), 'summary': self.saved[start]}
+                for start in starts]
+
+
+def make_weeks(count: int):
+    first = date(2026, 1, 5)
+    return [(first + timedelta(weeks=i), first + timedelta(weeks=i, days=6)) for i in range(count)]
+
+
+def make_backfill(log: EventLog, failing=(), **kwargs):
+    return ParallelBackfill(
+        summarizer=FakeSummarizer(log),
+        storage=FakeStorage(log),
+        todoist=FakeTodoist(log, failing),
+        **kwargs
+    )
+
+
+def test_summary_waits_for_the_saves_of_its_history_weeks(monkeypatch):
+    monkeypatch.setenv('WEEKS_OF_CONTEXT', '2')
+    log = EventLog()
+    backfill = make_backfill(log, workers=4)
+    weeks = make_weeks(6)
+
+    counts = backfill.run(weeks)
+
+    assert counts == {'saved': 6, 'no_tasks': 0, 'failed': 0}
+    for n, (week_start, _) in enumerate(weeks):
+        for k in (1, 2):
+            if n - k >= 0:
+                assert log.index('saved', weeks[n - k][0]) < log.index('summarize', week_start)
+        expected = [start for start, _ in weeks[max(0, n - 2):n]]
+        assert backfill.summarizer.histories[week_start] == expected
+
+
+def test_stored_history_does_not_wait_for_the_backfill(monkeypatch):
+    monkeypatch.setenv('WEEKS_OF_CONTEXT', '2')
+    log = EventLog()
+    backfill = make_backfill(log, stored_history=True)
+
+    counts = backfill.run(make_weeks(4))
+
+    assert counts['saved'] == 4
+    # History was read before any save of the backfill
+    assert all(history == [] for history in backfill.summarizer.histories.values())
+
+
+def test_failed_fetch_fails_its_week_only(monkeypatch):
+    monkeypatch.setenv('WEEKS_OF_CONTEXT', '2')
+    log = EventLog()
+    weeks = make_weeks(4)
+    failing = weeks[1][0]
+    backfill = make_backfill(log, failing=[failing])
+
+    counts = backfill.run(weeks)
+
+    assert counts == {'saved': 3, 'no_tasks': 0, 'failed': 1}
+    assert ('summarize', failing) not in log.events
+    assert failing not in backfill.storage.saved
+    # Later weeks still ran, with the history that could be saved
+    assert backfill.summarizer.histories[weeks[2][0]] == [weeks[0][0]]
+
+
+def test_scheduler_propagates_failures_to_requirements_only():
+    ran = []
+
+    def fail():
+        raise ValueError("boom")
+
+    scheduler = DependencyScheduler({'a': 2, 'b': 1})
+    scheduler.add('first', fail, 'a')
+    scheduler.add('required', lambda: ran.append('required'), 'b', requires=['first'])
+    scheduler.add('chained', lambda: ran.append('chained'), 'b', requires=['required'])
+    scheduler.add('ordered', lambda: ran.append('ordered') or 42, 'b', after=['first'])
+
+    results = scheduler.run()
+
+    assert ran == ['ordered']
+    assert results['first'][0] is False and isinstance(results['first'][1], ValueError)
+    assert results['required'][0] is False and 'first' in str(results['required'][1])
+    assert results['chained'][0] is False and 'required' in str(results['chained'][1])
+    assert results['ordered'] == (True, 42)
+
+
+def test_empty_range():
+    assert DependencyScheduler({'a': 1}).run() == {}
+    with pytest.raises(ValueError, match="No weeks"):
+        make_backfill(EventLog()).run([])
+
+
+@pytest.mark.parametrize('args', [['--weeks', '0'], ['--from', '2026-05-01', '--to', '2026-04-01']])
+def test_cli_rejects_an_empty_range(args):
+    result = subprocess.run(
+        [sys.executable, 'backfill.py'] + args,
+        cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 2
+    assert 'error:' in result.stderr
+    assert 'Traceback' not in result.stderr
@@ -0,0 +1,95 @@
+"""
+Tests of the inline Markdown rendering (emphasis, escapes, code, links)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.rendering import render_inline  # noqa: E402
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('*a*', '<em>a</em>'),
+    ('**a**', '<strong>a</strong>'),
+    ('***a***', '<em><strong>a</strong></em>'),
+    ('****a****', '<strong><strong>a</strong></strong>'),
+    ('_a_ and __b__', '<em>a</em> and <strong>b</strong>'),
+])
+def test_emphasis(text, expected):
+    assert render_inline(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('***a** b*', '<em><strong>a</strong> b</em>'),
+    ('***a* b**', '<strong><em>a</em> b</strong>'),
+    ('*a **b***', '<em>a <strong>b</strong></em>'),
+    ('**a *b* c**', '<strong>a <em>b</em> c</strong>'),
+    ('*a **b** c*', '<em>a <strong>b</strong> c</em>'),
+    ('*a _b_ c*', '<em>a <em>b</em> c</em>'),
+])
+def test_nested_emphasis(text, expected):
+    assert render_inline(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('**a *b** c*', '<em><em>a <em>b</em></em> c</em>'),
+    ('*a _b* c_', '<em>a _b</em> c_'),
+    ('**a*', '*<em>a</em>'),
+    ('*a**', '<em>a</em>*'),
+    ('*foo**bar**baz*', '<em>foo<strong>bar</strong>baz</em>'),
+    ('*foo**bar*', '<em>foo**bar</em>'),
+])
+def test_overlapping_and_unbalanced_emphasis(text, expected):
+    assert render_inline(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('snake_case_name', 'snake_case_name'),
+    ('_a_b_', '<em>a_b</em>'),
+    ('a * b *', 'a * b *'),
+    ('2*3*4', '2<em>3</em>4'),
+    ('*(a)*', '<em>(a)</em>'),
+    ('a*"b"*', 'a*"b"*'),
+])
+def test_flanking(text, expected):
+    assert render_inline(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    (r'\*a*', '*a*'),
+    (r'\**b**', '*<em>b</em>*'),
+    (r'\_a\_', '_a_'),
+    (r'a \\ b', r'a \ b'),
+    ('a < b & c', 'a &lt; b &amp; c'),
+    ('*<b>*', '<em>&lt;b&gt;</em>'),
+])
+def test_escaping(text, expected):
+    assert render_inline(text) == expected
+
+
+def test_code_and_links():
+    code = render_inline('`*a* <b>` *c*')
+    assert code.startswith('<code style=')
+    assert '>*a* &lt;b&gt;</code> <em>c</em>' in code
+
+    link = render_inline('[**a**](https://example.com/?a=1&b=2)')
+    assert 'href="https://example.com/?a=1&amp;b=2"' in link
+    assert '><strong>a</strong></a>' in link
+    assert render_inline('[a](javascript:alert(1))') == '[a](javascript:alert(1))'
+    assert render_inline('[*a*](javascript:x)') == '<em>a</em>'
+
+
+@pytest.mark.parametrize('text', [
+    '*a' * 20000,
+    '(*a' * 20000 + 'a**a' * 20000,
+    'a*' * 20000 + '*a' * 20000,
+])
+def test_many_delimiters_render_in_linear_time(text):
+    start = time.perf_counter()
+    render_inline(text)
+    assert time.perf_counter() - start < 2
@@ -0,0 +1,87 @@
+"""
+Tests of the JSON archive import of the SQLite backend
+"""
+
+import sys
+import json
+from pathlib import Path
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.sqlite_backend import SQLiteBackend  # noqa: E402
+
+
+def write_summary(path: Path, generated_at: str, **fields) -> Path:
+    data = {
+        'week_start': '2024-01-01',
+        'week_end': '2024-01-07',
+        'generated_at': generated_at,
+        'summary': f"Summary generated at {generated_at}",
+        'tasks': {'Work': {'null': [{'id': '1', 'content': 'Task', 'completed_at': '2024-01-02T10:00:00Z'}]}}
+    }
+    data.update(fields)
+    data = {key: value for key, value in data.items() if value is not None}
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return path
+
+
+def table_counts(backend: SQLiteBackend):
+    return [backend.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('runs', 'summaries', 'tasks')]
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(tmp_path / "summaries.db")
+    yield backend
+    backend.close()
+
+
+def test_regenerated_week_is_imported_again(tmp_path, backend):
+    path = write_summary(tmp_path / "summary_20240101-20240107.json", '2024-01-08T09:00:00')
+    assert backend.import_json_archive([path]) == 1
+    assert backend.import_json_archive([path]) == 0
+
+    write_summary(path, '2024-01-09T09:00:00')
+    assert backend.import_json_archive([path]) == 1
+    run, _ = backend.load_run(date(2024, 1, 1))
+    assert run['summary'] == "Summary generated at 2024-01-09T09:00:00"
+
+
+@pytest.mark.parametrize('keep_versions', [True, False])
+@pytest.mark.parametrize('broken', [
+    {'summary': None},
+    {'week_end': 'not a date'},
+    {'tasks': {'Work': [1, 2]}},
+])
+def test_invalid_file_leaves_the_database_unchanged(tmp_path, backend, keep_versions, broken):
+    path = write_summary(tmp_path / "summary_20240101-20240107.json", '2024-01-08T09:00:00')
+    backend.import_json_archive([path])
+    before = table_counts(backend)
+
+    write_summary(path, '2024-01-09T09:00:00', **broken)
+    assert backend.import_json_archive([path], keep_versions=keep_versions) == 0
+
+    assert table_counts(backend) == before
+    run, _ = backend.load_run(date(2024, 1, 1))
+    assert run['source_file'] == path.name
+
+
+def test_failed_insert_is_rolled_back(tmp_path, backend, monkeypatch):
+    path = write_summary(tmp_path / "summary_20240101-20240107.json", '2024-01-08T09:00:00')
+    backend.import_json_archive([path])
+    before = table_counts(backend)
+
+    insert_run = backend._insert_run
+
+    def failing_insert(*args, **kwargs):
+        insert_run(*args, **kwargs)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(backend, '_insert_run', failing_insert)
+    write_summary(path, '2024-01-09T09:00:00')
+    assert backend.import_json_archive([path], keep_versions=False) == 0
+    assert table_counts(backend) == before